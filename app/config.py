@@ -11,6 +11,11 @@ class Settings(BaseSettings):
     # Supabase設定
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
+    # Supabaseへの接続プール設定
+    SUPABASE_MAX_CONNECTIONS: int = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "100"))
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    SUPABASE_KEEPALIVE_EXPIRY: float = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+    SUPABASE_TIMEOUT: float = float(os.getenv("SUPABASE_TIMEOUT", "10"))
     
     # アプリケーション設定
     APP_ENV: str = os.getenv("APP_ENV", "development")
@@ -1,37 +1,112 @@
+import asyncio
 import logging
-from supabase import create_client, Client
+from typing import Any, Dict, Optional
+
+import httpx
+from supabase import AsyncClient, AsyncClientOptions, acreate_client
+
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
-class SupabaseClient:
-    """Supabaseクライアントの管理クラス"""
-    
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            try:
-                logger.debug(f"Initializing Supabase client with URL: {settings.SUPABASE_URL}")
-                cls._instance = super(SupabaseClient, cls).__new__(cls)
-                cls._instance.client = create_client(
-                    settings.SUPABASE_URL, 
-                    settings.SUPABASE_KEY
+
+class SupabaseClientPool:
+    """
+    アプリ全体で共有する非同期Supabaseクライアントの管理クラス。
+    クライアントは最初の利用時に作成し、HTTP接続はコネクションプールでキープアライブして使い回す。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0
+    ):
+        """クライアントプールの初期化"""
+        self.url = url
+        self.key = key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+
+        self._clients: Dict[str, AsyncClient] = {}
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _get(self, name: str) -> AsyncClient:
+        """名前に対応するクライアントを取得する（なければ作成する）"""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+
+        # ロックは実行中のイベントループで作成する
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if name not in self._clients:
+                logger.debug(f"Initializing async Supabase client '{name}' with URL: {self.url}")
+                http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+                options = AsyncClientOptions(
+                    httpx_client=http_client,
+                    postgrest_client_timeout=self.timeout,
+                    # サーバー側ではユーザーのセッションを保持・更新しない
+                    persist_session=False,
+                    auto_refresh_token=False
                 )
-                logger.debug("Supabase client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Supabase client: {str(e)}")
-                raise
-        return cls._instance
-    
-    def get_client(self) -> Client:
-        """Supabaseクライアントを取得"""
-        return self.client
-
-# シングルトンインスタンスを作成
-supabase = SupabaseClient().get_client()
+                self._clients[name] = await acreate_client(self.url, self.key, options=options)
+                self._http_clients[name] = http_client
+        return self._clients[name]
+
+    async def get_client(self) -> AsyncClient:
+        """データベース操作用のクライアントを取得する"""
+        return await self._get("data")
+
+    async def get_auth_client(self) -> AsyncClient:
+        """
+        認証操作（登録・ログイン・トークン確認）用のクライアントを取得する。
+        ログインしたユーザーのセッションがデータベース操作に使われないよう、データベース用とは分ける
+        """
+        return await self._get("auth")
+
+    async def close(self) -> None:
+        """HTTP接続をすべて閉じる"""
+        for http_client in self._http_clients.values():
+            await http_client.aclose()
+        self._clients.clear()
+        self._http_clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """プールの設定と作成済みのクライアントを取得する"""
+        return {
+            "clients": sorted(self._clients),
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "timeout": self.timeout
+        }
+
+
+# シングルトンインスタンスを作成（クライアントは最初の利用時に作成される）
+supabase_pool = SupabaseClientPool(
+    settings.SUPABASE_URL,
+    settings.SUPABASE_KEY,
+    max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+    timeout=settings.SUPABASE_TIMEOUT
+)
 
 # 依存性注入用のファンクション
-def get_supabase_client() -> Client:
+async def get_supabase_client() -> AsyncClient:
     """依存性注入用のSupabaseクライアント取得関数"""
-    return SupabaseClient().get_client()
\ No newline at end of file
+    return await supabase_pool.get_client()
+
+async def get_supabase_auth_client() -> AsyncClient:
+    """依存性注入用の認証用Supabaseクライアント取得関数"""
+    return await supabase_pool.get_auth_client()
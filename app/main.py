@@ -7,7 +7,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # ルーターのインポート
-from .routers import chat
+from .routers import chat, words, auth, review
+from .db.supabase import supabase_pool
+from .utils.tracing import tracer
 
 # アプリケーションの作成
 app = FastAPI(
@@ -34,6 +36,9 @@ app.add_middleware(
 
 # ルーターの追加
 app.include_router(chat.router)
+app.include_router(words.router)
+app.include_router(auth.router)
+app.include_router(review.router)
 
 # 必要なディレクトリを作成
 os.makedirs("data", exist_ok=True)
@@ -55,6 +60,11 @@ async def health_check():
 # 環境変数チェック
 @app.on_event("startup")
 async def startup_event():
+    # 単語検索インデックスの構築をバックグラウンドで開始する
+    words.start_word_index()
+    # レスポンスキャッシュの定期的な保存を開始する
+    chat.start_cache_flush()
+    
     required_env_vars = ["GOOGLE_API_KEY"]
     missing_vars = [var for var in required_env_vars if not os.getenv(var)]
     
@@ -66,3 +76,12 @@ async def startup_event():
         if "GOOGLE_API_KEY" in missing_vars:
             print("\nGOOGLE_API_KEYが必要です。Google AI Studioから取得してください。")
             print("https://makersuite.google.com/app/apikey")
+
+# 終了時に未出力のトレースとキャッシュを保存し、Supabaseと復習スケジュールへの接続を閉じる
+@app.on_event("shutdown")
+async def shutdown_event():
+    words.stop_word_index()
+    await chat.stop_cache_flush()
+    await review.review_scheduler.close()
+    await tracer.shutdown()
+    await supabase_pool.close()
@@ -33,6 +33,8 @@ class ChatRequest(BaseModel):
     user_id: Optional[str] = None
     level: Optional[str] = "intermediate"
     focus: Optional[str] = "conversation"
+    include_corrections: Optional[bool] = False  # ユーザーメッセージの文法チェック結果も返すか（追加のモデル呼び出しが必要なため指定した場合のみ）
+    message_id: Optional[str] = None  # 失敗したターンを再送するときに同じ値を送ると、同じメッセージとして扱う（LangGraph）
 
 
 class ChatResponse(BaseModel):
@@ -57,3 +59,20 @@ class SessionResponse(BaseModel):
     session_id: str
     title: str
     created_at: datetime
+
+
+class GrammarBatchItem(BaseModel):
+    """一括文法チェックの対象テキスト"""
+    id: str
+    text: str
+
+
+class GrammarBatchRequest(BaseModel):
+    """一括文法チェックリクエストモデル"""
+    items: List[GrammarBatchItem] = Field(..., max_items=200)
+
+
+class GrammarDocumentRequest(BaseModel):
+    """長文の文法チェックリクエストモデル"""
+    text: str
+    stream: bool = False  # Trueの場合はチャンクごとの結果をNDJSONで逐次返す
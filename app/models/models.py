@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class WordBase(BaseModel):
@@ -35,4 +35,64 @@ class Word(WordInDB):
 
 class ErrorResponse(BaseModel):
     """エラーレスポンスモデル"""
-    detail: str
\ No newline at end of file
+    detail: str
+
+class AuthenticatedUser(BaseModel):
+    """認証済みユーザーモデル（アクセストークンの検証結果）"""
+    id: str = Field(..., title="id", description="ユーザーID")
+    email: Optional[str] = Field(None, title="email", description="メールアドレス")
+    role: Optional[str] = Field(None, title="role", description="ロール")
+    expires_at: Optional[datetime] = Field(None, title="expires_at", description="トークンの有効期限")
+
+
+class WordPage(BaseModel):
+    """カーソルページネーションの単語一覧モデル"""
+    items: List[Word] = Field(..., title="items", description="単語のリスト")
+    next_cursor: Optional[str] = Field(None, title="next_cursor", description="次のページのカーソル（最後のページではNone）")
+
+
+class WordImportError(BaseModel):
+    """単語の取り込みで失敗した行"""
+    line: int = Field(..., title="line", description="行番号")
+    word: Optional[str] = Field(None, title="word", description="単語")
+    error: str = Field(..., title="error", description="エラー内容")
+
+
+class WordImportReport(BaseModel):
+    """単語の取り込み結果"""
+    total_rows: int = Field(0, title="total_rows", description="読み込んだ行数")
+    inserted: int = Field(0, title="inserted", description="登録した単語数")
+    duplicates: int = Field(0, title="duplicates", description="重複のため登録しなかった単語数")
+    invalid: int = Field(0, title="invalid", description="形式や内容が不正な行数")
+    failed: int = Field(0, title="failed", description="登録に失敗した単語数")
+    errors: List[WordImportError] = Field(default_factory=list, title="errors", description="行ごとのエラー")
+    errors_truncated: bool = Field(False, title="errors_truncated", description="エラーが多いため一部を省略したかどうか")
+
+
+class ReviewCard(BaseModel):
+    """ユーザーごとの単語の復習スケジュール（SM-2）"""
+    word_id: int = Field(..., title="word_id", description="単語のID")
+    ease_factor: float = Field(2.5, title="ease_factor", description="易しさ係数（復習間隔の伸び率）")
+    interval_days: int = Field(0, title="interval_days", description="現在の復習間隔（日）")
+    repetitions: int = Field(0, title="repetitions", description="連続して正解した回数")
+    lapses: int = Field(0, title="lapses", description="忘れた回数")
+    due_at: datetime = Field(..., title="due_at", description="次の復習日時")
+    last_reviewed_at: Optional[datetime] = Field(None, title="last_reviewed_at", description="最後に復習した日時")
+    word: Optional[Word] = Field(None, title="word", description="単語（復習対象の取得時のみ）")
+
+
+class ReviewEnrollRequest(BaseModel):
+    """復習対象に追加する単語"""
+    word_ids: List[int] = Field(..., title="word_ids", description="単語のIDのリスト")
+
+
+class ReviewEnrollResult(BaseModel):
+    """復習対象への追加結果"""
+    enrolled: int = Field(0, title="enrolled", description="追加した単語数")
+    already_enrolled: int = Field(0, title="already_enrolled", description="既に復習対象だった単語数")
+    not_found: List[int] = Field(default_factory=list, title="not_found", description="存在しない単語のID")
+
+
+class ReviewResult(BaseModel):
+    """復習の結果"""
+    quality: int = Field(..., ge=0, le=5, title="quality", description="思い出せた度合い（0: 全く思い出せない 〜 5: 完璧）")
@@ -0,0 +1,117 @@
+"""
+語彙・会話トピックのカタログを事前生成するバッチジョブ
+
+使い方:
+    python -m app.precompute_catalog \
+        --topics travel,business,food --levels beginner,intermediate,advanced \
+        --categories travel,hobbies --counts 5,10
+"""
+import argparse
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .services.catalog_service import CatalogService
+from .services.content_service import ContentService
+from .services.gemini_service import GeminiService
+from .services.response_cache import ResponseCache
+
+DEFAULT_TOPICS = "travel,business,food,shopping,health,work,school,hobbies,technology,environment"
+DEFAULT_LEVELS = "beginner,intermediate,advanced"
+DEFAULT_COUNTS = "5"
+
+
+def _split(value: str) -> List[str]:
+    """カンマ区切りの文字列をリストに変換する"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+async def precompute(
+    content_service: ContentService,
+    catalog: CatalogService,
+    topics: List[str],
+    levels: List[str],
+    categories: List[Optional[str]],
+    counts: List[int],
+    concurrency: int = 4,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """トピック×レベル、カテゴリ×件数の組み合わせのコンテンツを生成してカタログに登録する"""
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {"generated": 0, "skipped": 0, "failed": []}
+
+    async def generate(section: str, key: str, factory) -> None:
+        if not refresh and catalog.get(section, key) is not None:
+            summary["skipped"] += 1
+            return
+        async with semaphore:
+            try:
+                content = await factory()
+            except Exception as e:
+                summary["failed"].append({"section": section, "key": key, "error": str(e)})
+                return
+        if content is None or (isinstance(content, dict) and "message" in content):
+            summary["failed"].append({"section": section, "key": key, "error": "Invalid JSON response"})
+            return
+        catalog.put(section, key, content)
+        summary["generated"] += 1
+        print(f"Generated {section}: {key}")
+
+    jobs = []
+    for topic in topics:
+        for level in levels:
+            jobs.append(generate(
+                "vocabulary",
+                ResponseCache.make_key(topic, level),
+                lambda topic=topic, level=level: content_service.generate_vocabulary(topic, level)
+            ))
+    for category in categories:
+        for count in counts:
+            jobs.append(generate(
+                "topics",
+                ResponseCache.make_key(category, count),
+                lambda category=category, count=count: content_service.generate_topics(category, count)
+            ))
+
+    await asyncio.gather(*jobs)
+    catalog.save()
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """コマンドラインからカタログを生成する"""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="語彙・会話トピックのカタログを事前生成する")
+    parser.add_argument("--topics", default=DEFAULT_TOPICS, help="語彙を生成するトピック（カンマ区切り）")
+    parser.add_argument("--levels", default=DEFAULT_LEVELS, help="語彙を生成するレベル（カンマ区切り）")
+    parser.add_argument("--categories", default="", help="会話トピックのカテゴリ（カンマ区切り。カテゴリなしは常に含む）")
+    parser.add_argument("--counts", default=DEFAULT_COUNTS, help="会話トピックの件数（カンマ区切り）")
+    parser.add_argument("--output", default=os.environ.get("CATALOG_PATH", "data/catalog.json"), help="カタログの保存先")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時に生成するリクエスト数")
+    parser.add_argument("--refresh", action="store_true", help="登録済みのキーも再生成する")
+    args = parser.parse_args(argv)
+
+    catalog = CatalogService(args.output)
+    content_service = ContentService(GeminiService(os.environ.get("GOOGLE_API_KEY")))
+
+    summary = asyncio.run(precompute(
+        content_service,
+        catalog,
+        topics=_split(args.topics),
+        levels=_split(args.levels),
+        categories=[None] + _split(args.categories),
+        counts=[int(count) for count in _split(args.counts)],
+        concurrency=args.concurrency,
+        refresh=args.refresh
+    ))
+
+    print(f"Generated: {summary['generated']}, Skipped: {summary['skipped']}, Failed: {len(summary['failed'])}")
+    for failure in summary["failed"]:
+        print(f"  {failure['section']} {failure['key']}: {failure['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,11 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
+from supabase import AsyncClient
 
-# 環境変数のロード
-load_dotenv()
-
-# Supabaseクライアントの初期化
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+from ..db.supabase import get_supabase_auth_client
+from ..models.models import AuthenticatedUser
+from ..utils.auth import get_current_user as get_authenticated_user
 
 # ルーターの設定
 router = APIRouter(
@@ -46,13 +40,13 @@ class UserResponse(BaseModel):
 
 # ユーザー登録エンドポイント
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate):
+async def register(user: UserCreate, supabase: AsyncClient = Depends(get_supabase_auth_client)):
     try:
         # 登録情報をログ出力
         print(f"Attempting to register user: {user.email}")
         
         # Supabaseでユーザーを作成
-        response = supabase.auth.sign_up({
+        response = await supabase.auth.sign_up({
             "email": user.email,
             "password": user.password,
         })
@@ -66,7 +60,7 @@ async def register(user: UserCreate):
         
         # 作成した後、データが存在するかごく強制的に確認
         try:
-            check_user = supabase.auth.get_user(response.session.access_token)
+            check_user = await supabase.auth.get_user(response.session.access_token)
             print(f"Confirmation - User exists: {check_user.user.email}")
         except Exception as check_error:
             print(f"Warning: Could not verify user after creation: {str(check_error)}")
@@ -88,13 +82,13 @@ async def register(user: UserCreate):
 
 # ログインエンドポイント
 @router.post("/login", response_model=Token)
-async def login(user: UserLogin):
+async def login(user: UserLogin, supabase: AsyncClient = Depends(get_supabase_auth_client)):
     try:
         # ログ出入力値
         print(f"Login attempt for: {user.email}")
         
         # Supabaseでログイン
-        response = supabase.auth.sign_in_with_password({
+        response = await supabase.auth.sign_in_with_password({
             "email": user.email,
             "password": user.password
         })
@@ -123,10 +117,13 @@ async def login(user: UserLogin):
 
 # トークン取得エンドポイント (OAuth2互換)
 @router.post("/token", response_model=Token)
-async def get_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def get_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    supabase: AsyncClient = Depends(get_supabase_auth_client)
+):
     try:
         # Supabaseでログイン
-        response = supabase.auth.sign_in_with_password({
+        response = await supabase.auth.sign_in_with_password({
             "email": form_data.username,  # OAuth2では、emailがusernameフィールドに入る
             "password": form_data.password
         })
@@ -147,10 +144,13 @@ async def get_token(form_data: OAuth2PasswordRequestForm = Depends()):
 
 # ログアウトエンドポイント
 @router.post("/logout", status_code=status.HTTP_200_OK)
-async def logout(token: str = Depends(oauth2_scheme)):
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    supabase: AsyncClient = Depends(get_supabase_auth_client)
+):
     try:
         # Supabaseでログアウト
-        supabase.auth.sign_out()
+        await supabase.auth.sign_out()
         return {"detail": "Successfully logged out"}
     except Exception as e:
         raise HTTPException(
@@ -158,30 +158,23 @@ async def logout(token: str = Depends(oauth2_scheme)):
             detail=f"Logout failed: {str(e)}"
         )
 
-# 現在のユーザー情報を取得するエンドポイント
+# 現在のユーザー情報を取得するエンドポイント（トークンはローカルで検証する）
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        # トークンからユーザー情報を取得
-        user = supabase.auth.get_user(token)
-        
-        return {
-            "id": user.user.id,
-            "email": user.user.email
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+async def get_current_user(current_user: AuthenticatedUser = Depends(get_authenticated_user)):
+    return {
+        "id": current_user.id,
+        "email": current_user.email or ""
+    }
 
 # パスワードリセットメール送信エンドポイント
 @router.post("/reset-password", status_code=status.HTTP_200_OK)
-async def reset_password(email: EmailStr):
+async def reset_password(
+    email: EmailStr,
+    supabase: AsyncClient = Depends(get_supabase_auth_client)
+):
     try:
         # パスワードリセットメールを送信
-        supabase.auth.reset_password_email(email)
+        await supabase.auth.reset_password_email(email)
         return {"detail": "Password reset email sent"}
     except Exception as e:
         # エラーが発生してもユーザーにはエラーを表示しない（セキュリティのため）
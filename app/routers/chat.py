@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Dict, Any, Set
 from datetime import datetime
+import asyncio
+import hashlib
+import json
+import math
 import os
-import google.generativeai as genai
+import time
 
 from ..models.chat import (
     ChatRequest, 
@@ -10,38 +15,294 @@ from ..models.chat import (
     SessionRequest, 
     SessionResponse,
     ChatSession,
-    Message
+    Message,
+    GrammarBatchRequest,
+    GrammarDocumentRequest
 )
 from ..services.gemini_service import GeminiService
 from ..services.session_service import SessionService
-from ..utils.langgraph_chatbot import process_message, convert_to_langchain_format, extract_assistant_message
+from ..services.response_cache import ResponseCache
+from ..services.grammar_service import GrammarService
+from ..services.semantic_cache import SemanticResponseCache
+from ..services.content_service import ContentService
+from ..services.catalog_service import CatalogService
+from ..services.llm_router import LLMRouter, create_providers
+from ..services.model_tiering import ModelTieringPolicy
+from ..services.resilience import LLMUnavailableError, resilience
+from ..services.concurrency_limiter import limiter_stats
+from ..services.idempotency import IdempotencyKeyConflictError, IdempotencyStore
+from ..utils.rate_limit import get_client_identity, rate_limit, rate_limiter
+from ..utils.tracing import tracer
+from ..utils.jwt_verifier import jwt_verifier
+from ..utils.langgraph_chatbot import (
+    process_message,
+    get_thread_messages,
+    convert_to_langchain_format,
+    convert_from_langchain_format,
+    extract_assistant_message,
+    delete_thread
+)
+
+# LangGraphのチェックポイントにメッセージを保存しているセッションの印と、メッセージの作成日時のキー
+LANGGRAPH_MESSAGE_STORE = "langgraph"
+MESSAGE_TIMESTAMPS_KEY = "message_timestamps"
+
+
+async def _load_langgraph_messages(session: ChatSession) -> List[Message]:
+    """LangGraphのチェックポイントからセッションのメッセージを読み込む"""
+    timestamps = (session.metadata or {}).get(MESSAGE_TIMESTAMPS_KEY)
+    return convert_from_langchain_format(await get_thread_messages(session.id), timestamps)
+
+
+async def _delete_langgraph_messages(session: ChatSession) -> None:
+    """LangGraphのチェックポイントからセッションのスレッドを削除する"""
+    await delete_thread(session.id)
+
 
 # セッションサービスの作成
 storage_path = os.environ.get("SESSION_STORAGE_PATH", "data/sessions.json")
-session_service = SessionService(storage_path)
+session_service = SessionService(
+    storage_path,
+    message_loader=_load_langgraph_messages,
+    message_deleter=_delete_langgraph_messages
+)
 
 # GeminiサービスはAPIキーを必要とする
 api_key = os.environ.get("GOOGLE_API_KEY")
 gemini_service = GeminiService(api_key)
 
+# チューター応答用のプロバイダルーター（遅延・エラー率が最も良いプロバイダを選ぶ）
+llm_router = LLMRouter(
+    create_providers(
+        [name.strip() for name in os.environ.get("LLM_PROVIDERS", "gemini").split(",") if name.strip()],
+        gemini_service
+    ),
+    hedge_enabled=os.environ.get("LLM_HEDGE_ENABLED", "false").lower() == "true",
+    hedge_percentile=float(os.environ.get("LLM_HEDGE_PERCENTILE", "95"))
+)
+
+# ターンの複雑さに応じて軽量モデルと標準モデルを振り分けるポリシー
+tiering_policy = ModelTieringPolicy(
+    enabled=os.environ.get("MODEL_TIERING_ENABLED", "true").lower() == "true",
+    light_max_chars=int(os.environ.get("TIER_LIGHT_MAX_CHARS", "120")),
+    light_max_history=int(os.environ.get("TIER_LIGHT_MAX_HISTORY", "8")),
+    light_levels=os.environ.get("TIER_LIGHT_LEVELS", "beginner,intermediate").split(","),
+    standard_focuses=os.environ.get("TIER_STANDARD_FOCUSES", "grammar").split(",")
+)
+
+# 語彙・トピックの生成サービスと、事前生成したカタログ（python -m app.precompute_catalog で作成）
+content_service = ContentService(gemini_service)
+catalog_service = CatalogService(os.environ.get("CATALOG_PATH", "data/catalog.json"))
+
+# 語彙・トピック生成結果のキャッシュ（同じトピック・レベルの繰り返しリクエスト用）
+cache_ttl = float(os.environ.get("RESPONSE_CACHE_TTL", "86400"))
+cache_max_size = int(os.environ.get("RESPONSE_CACHE_MAX_SIZE", "512"))
+cache_dir = os.environ.get("RESPONSE_CACHE_DIR")
+vocabulary_cache = ResponseCache(
+    max_size=cache_max_size,
+    ttl_seconds=cache_ttl,
+    storage_path=os.path.join(cache_dir, "vocabulary_cache.json") if cache_dir else None
+)
+topics_cache = ResponseCache(
+    max_size=cache_max_size,
+    ttl_seconds=cache_ttl,
+    storage_path=os.path.join(cache_dir, "topics_cache.json") if cache_dir else None
+)
+
+# 文法チェック結果の文単位キャッシュ
+grammar_cache = ResponseCache(
+    max_size=int(os.environ.get("GRAMMAR_CACHE_MAX_SIZE", "10000")),
+    ttl_seconds=cache_ttl,
+    storage_path=os.path.join(cache_dir, "grammar_cache.json") if cache_dir else None
+)
+grammar_service = GrammarService(
+    gemini_service,
+    grammar_cache,
+    max_prompt_chars=int(os.environ.get("GRAMMAR_BATCH_MAX_CHARS", "12000")),
+    chunk_chars=int(os.environ.get("GRAMMAR_CHUNK_CHARS", "2000")),
+    max_concurrency=int(os.environ.get("GRAMMAR_MAX_CONCURRENCY", "4"))
+)
+
+# 会話の書き出し（最初のターン）の応答を再利用するセマンティックキャッシュ
+semantic_cache = SemanticResponseCache(
+    threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.97")),
+    max_variants=int(os.environ.get("SEMANTIC_CACHE_VARIANTS", "3")),
+    max_entries=int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "1000")),
+    storage_path=os.path.join(cache_dir, "semantic_cache.json") if cache_dir else None,
+    max_fuzzy_words=int(os.environ.get("SEMANTIC_CACHE_MAX_FUZZY_WORDS", "3"))
+)
+# キャッシュ対象とする直前の会話履歴の最大メッセージ数（0の場合は最初のターンのみ）
+semantic_cache_max_history = int(os.environ.get("SEMANTIC_CACHE_MAX_HISTORY", "0"))
+
+# 永続化するキャッシュは書き込みのたびには保存せず、一定間隔と終了時にまとめて保存する
+cache_flush_interval = float(os.environ.get("RESPONSE_CACHE_FLUSH_INTERVAL", "30"))
+persistent_caches = [vocabulary_cache, topics_cache, grammar_cache, semantic_cache]
+
+
+def start_cache_flush() -> None:
+    """キャッシュの定期的な保存を開始する"""
+    for cache in persistent_caches:
+        cache.start_flush(cache_flush_interval)
+
+
+async def stop_cache_flush() -> None:
+    """キャッシュの定期的な保存を停止し、残っている変更を保存する"""
+    for cache in persistent_caches:
+        await cache.stop_flush()
+
+
+# チャット応答に文法訂正を含める場合の締め切り（秒）。間に合わなければ訂正を省略する
+corrections_deadline = float(os.environ.get("CHAT_CORRECTIONS_DEADLINE", "3.0"))
+
+# Idempotency-Key ヘッダー付きのチャットリクエストの結果を保持するストア（クライアントの再送対策）
+chat_idempotency = IdempotencyStore(
+    ttl_seconds=float(os.environ.get("IDEMPOTENCY_TTL", "3600")),
+    max_size=int(os.environ.get("IDEMPOTENCY_MAX_SIZE", "10000"))
+)
+
 router = APIRouter(
     prefix="/api",
     tags=["chat"]
 )
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+def _service_unavailable(e: LLMUnavailableError) -> HTTPException:
+    """LLMプロバイダの障害や混雑で呼び出せない場合の503エラーを作成する"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"AI service is temporarily unavailable: {str(e)}",
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+
+async def _generate_tutor_reply(session: ChatSession, user_message: str, use_cache: bool = True) -> str:
+    """
+    チューターの応答を生成する。
+    会話の書き出しであれば、同じメッセージへのキャッシュ済み応答を再利用する。
+    文法フォーカスのセッションや文法訂正を返すターンは、メッセージごとに訂正が異なるためキャッシュを使わない。
+    """
+    prompt = gemini_service.create_prompt_for_session(session, user_message)
+    temperature = gemini_service.get_temperature(session.level)
+    tier = tiering_policy.classify(session, user_message)
+    
+    # 最新のユーザーメッセージより前の履歴
+    history = [(msg.role, msg.content) for msg in session.messages[:-1]]
+    if not use_cache or session.focus == "grammar" or len(history) > semantic_cache_max_history:
+        return await llm_router.generate(prompt, temperature=temperature, tier=tier)
+    
+    partition = SemanticResponseCache.partition_key(session.level, session.focus, history)
+    cached = semantic_cache.get(user_message, partition)
+    if cached is not None:
+        return cached
+    
+    ai_response = await llm_router.generate(prompt, temperature=temperature, tier=tier)
+    semantic_cache.add(user_message, partition, ai_response)
+    return ai_response
+
+
+# 締め切り後もバックグラウンドで実行を続けている文法チェック
+_pending_grammar_checks: Set["asyncio.Task[Dict[str, Any]]"] = set()
+
+
+def _forget_grammar_check(task: "asyncio.Task[Dict[str, Any]]") -> None:
+    """完了したバックグラウンドの文法チェックを破棄する"""
+    _pending_grammar_checks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error checking grammar for chat message: {task.exception()}")
+
+
+async def _collect_corrections(
+    grammar_task: Optional["asyncio.Task[Dict[str, Any]]"],
+    started_at: float
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    文法チェックの結果を締め切りまで待って取得する（間に合わなければNone）。
+    間に合わなかったチェックは止めずに最後まで実行し、文ごとの結果をキャッシュに残して同じメッセージの再送に使う
+    """
+    if grammar_task is None:
+        return None
+    
+    remaining = corrections_deadline - (time.monotonic() - started_at)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(grammar_task), timeout=max(remaining, 0))
+    except asyncio.TimeoutError:
+        # 実行中のタスクへの参照を保持し、完了時に例外を取得して「未取得の例外」警告を出さない
+        _pending_grammar_checks.add(grammar_task)
+        grammar_task.add_done_callback(_forget_grammar_check)
+        return None
+    except Exception as e:
+        print(f"Error checking grammar for chat message: {e}")
+        return None
+    return result["corrections"]
+
+
+async def _run_idempotent(
+    scope: str,
+    request: ChatRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str],
+    handler: Callable[[ChatRequest], Awaitable[ChatResponse]]
+) -> ChatResponse:
+    """
+    Idempotency-Key ヘッダーがあれば、同じキーのリクエストを1回だけ処理する。
+    再送されたリクエストには、モデルの呼び出しやセッションへの追加を行わずに最初の応答を返す。
+    """
+    if not idempotency_key:
+        return await handler(request)
+    if len(idempotency_key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key must be at most 255 characters"
+        )
+    
+    # キーはクライアントとエンドポイントごとに区別し、同じキーで内容が異なるリクエストは拒否する
+    identity = await get_client_identity(http_request)
+    key = f"{scope}:{identity}:{idempotency_key}"
+    fingerprint = hashlib.sha256(
+        json.dumps(request.dict(), sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    
+    try:
+        result, replayed = await chat_idempotency.run(key, fingerprint, lambda: handler(request))
+    except IdempotencyKeyConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat"))])
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """チャットメッセージを処理して、AIからの応答を返す"""
+    return await _run_idempotent("chat", request, http_request, response, idempotency_key, _process_chat)
+
+
+async def _process_chat(request: ChatRequest) -> ChatResponse:
+    """チャットメッセージを処理して、AIからの応答を作成する"""
     # セッションIDがある場合はそのセッションを取得、なければ新しく作成
     session = None
     if request.session_id:
-        session = session_service.get_session(request.session_id)
+        session = await session_service.aget_session(request.session_id)
         if not session:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail=f"Session with ID {request.session_id} not found"
             )
+        # LangGraphで続けている会話はチェックポイントに履歴があるため、ここで追加したメッセージは失われる
+        if session_service.has_external_messages(session):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Session with ID {request.session_id} is a LangGraph conversation; use /api/chat/langgraph"
+            )
     else:
         # 新しいセッションを作成
         session = ChatSession(
@@ -63,9 +324,17 @@ async def chat(request: ChatRequest):
         session.title = gemini_service.generate_title(request.message)
         session = session_service.update_session(session)
     
+    # ユーザーメッセージの文法チェックをAIの応答生成と並行して実行
+    started_at = time.monotonic()
+    grammar_task = None
+    if request.include_corrections:
+        grammar_task = asyncio.ensure_future(grammar_service.check(request.message))
+    
     # AIからの応答を生成
     try:
-        ai_response = await gemini_service.generate_response(session, request.message)
+        ai_response = await _generate_tutor_reply(
+            session, request.message, use_cache=not request.include_corrections
+        )
         
         # AIメッセージをセッションに追加
         ai_message = Message(
@@ -74,25 +343,47 @@ async def chat(request: ChatRequest):
         )
         session = session_service.add_message(session.id, ai_message)
         
+        # 文法チェックは締め切りまでに終わった場合のみ含める
+        corrections = await _collect_corrections(grammar_task, started_at)
+        
         # レスポンスを作成
         return ChatResponse(
             message=ai_response,
             session_id=session.id,
-            timestamp=datetime.now()
+            timestamp=datetime.now(),
+            corrections=corrections
         )
+    except LLMUnavailableError as e:
+        if grammar_task is not None:
+            grammar_task.cancel()
+        raise _service_unavailable(e)
     except Exception as e:
+        if grammar_task is not None:
+            grammar_task.cancel()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating AI response: {str(e)}"
         )
 
-@router.post("/chat/langgraph", response_model=ChatResponse)
-async def chat_with_langgraph(request: ChatRequest):
+@router.post("/chat/langgraph", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat"))])
+async def chat_with_langgraph(
+    request: ChatRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """LangGraphを使用したチャットメッセージを処理して、AIからの応答を返す"""
+    return await _run_idempotent(
+        "chat/langgraph", request, http_request, response, idempotency_key, _process_langgraph_chat
+    )
+
+
+async def _process_langgraph_chat(request: ChatRequest) -> ChatResponse:
+    """LangGraphを使用してチャットメッセージを処理し、AIからの応答を作成する"""
     # セッションIDがある場合はそのセッションを取得、なければ新しく作成
     session = None
     if request.session_id:
-        session = session_service.get_session(request.session_id)
+        session = await session_service.aget_session(request.session_id)
         if not session:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
@@ -107,35 +398,40 @@ async def chat_with_langgraph(request: ChatRequest):
         )
         session = session_service.create_session(session)
     
-    # ユーザーメッセージをセッションに追加
+    # 会話の履歴はセッションIDをスレッドIDとするチェックポイントに保存されるため、
+    # セッションサービスにはメッセージを二重に保存しない
     user_message = Message(
         content=request.message,
         role="user"
     )
-    session = session_service.add_message(session.id, user_message)
+    if request.message_id:
+        user_message.id = request.message_id
+    timestamps = dict((session.metadata or {}).get(MESSAGE_TIMESTAMPS_KEY, {}))
+    seed_history = None
+    if not session_service.has_external_messages(session):
+        # 既存のセッションの場合は、これまでの履歴でチェックポイントを1回だけ初期化する
+        seed_history = convert_to_langchain_format(session.messages)
+        timestamps.update({msg.id: msg.timestamp.isoformat() for msg in session.messages})
+    timestamps[user_message.id] = user_message.timestamp.isoformat()
     
     # 最初のメッセージの場合、タイトルを生成
-    if len(session.messages) == 1:
+    if not session.messages:
         session.title = gemini_service.generate_title(request.message)
-        session = session_service.update_session(session)
     
     # LangGraphでの応答を生成
     try:
-        # セッション履歴をLangChainフォーマットに変換
-        history = convert_to_langchain_format(session.messages)
-        
-        # LangGraphで処理
-        result = process_message(request.message, history)
+        # LangGraphで処理（ノード内でAnthropicを非同期に呼び出すため、並行するターンを塞がない）
+        result = await process_message(request.message, session.id, seed_history, user_message.id)
         
         # 応答を抽出
         ai_response = extract_assistant_message(result)
+        if result["messages"] and result["messages"][-1].id:
+            timestamps[result["messages"][-1].id] = datetime.now().isoformat()
         
-        # AIメッセージをセッションに追加
-        ai_message = Message(
-            content=ai_response,
-            role="assistant"
-        )
-        session = session_service.add_message(session.id, ai_message)
+        # チェックポイントの内容をセッションのメッセージとして反映する
+        session.messages = convert_from_langchain_format(result["messages"], timestamps)
+        session.metadata = {**(session.metadata or {}), MESSAGE_TIMESTAMPS_KEY: timestamps}
+        session = session_service.mark_external_messages(session, LANGGRAPH_MESSAGE_STORE)
         
         # レスポンスを作成
         return ChatResponse(
@@ -143,13 +439,36 @@ async def chat_with_langgraph(request: ChatRequest):
             session_id=session.id,
             timestamp=datetime.now()
         )
+    except LLMUnavailableError as e:
+        await _mark_if_checkpointed(session, timestamps)
+        raise _service_unavailable(e)
     except Exception as e:
+        await _mark_if_checkpointed(session, timestamps)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating AI response with LangGraph: {str(e)}"
         )
 
 
+async def _mark_if_checkpointed(session: ChatSession, timestamps: Dict[str, str]) -> None:
+    """
+    応答の生成に失敗したターンでも、チェックポイントに会話が保存されていれば
+    以降はLangGraphの会話として扱う（/api/chat で続けてチェックポイントと食い違わないようにする）
+    """
+    if session_service.has_external_messages(session):
+        return
+    try:
+        if not await get_thread_messages(session.id):
+            return
+    except Exception as e:
+        print(f"Error checking LangGraph checkpoint for session {session.id}: {e}")
+        return
+    # メッセージは次回の取得時にチェックポイントから読み込む
+    session.messages = []
+    session.metadata = {**(session.metadata or {}), MESSAGE_TIMESTAMPS_KEY: timestamps}
+    session_service.mark_external_messages(session, LANGGRAPH_MESSAGE_STORE)
+
+
 @router.post("/sessions", response_model=SessionResponse)
 async def create_session(request: SessionRequest):
     """新しいチャットセッションを作成"""
@@ -175,7 +494,7 @@ async def create_session(request: SessionRequest):
 @router.get("/sessions/{session_id}", response_model=ChatSession)
 async def get_session(session_id: str):
     """指定されたIDのセッション情報を取得"""
-    session = session_service.get_session(session_id)
+    session = await session_service.aget_session(session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -188,15 +507,18 @@ async def get_session(session_id: str):
 async def get_sessions(user_id: Optional[str] = None, limit: int = 10):
     """セッション一覧を取得（ユーザーIDがある場合はそのユーザーのみ）"""
     if user_id:
-        return session_service.get_user_sessions(user_id)
+        sessions = session_service.get_user_sessions(user_id)
     else:
-        return session_service.get_recent_sessions(limit)
+        sessions = session_service.get_recent_sessions(limit)
+    # LangGraphのチェックポイントに保存しているメッセージを読み込む
+    return [await session_service.load_messages(session) for session in sessions]
 
 
 @router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_session(session_id: str):
     """セッションを削除"""
-    success = session_service.delete_session(session_id)
+    # LangGraphのチェックポイントに保存している会話も削除する
+    success = await session_service.adelete_session(session_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -207,7 +529,7 @@ async def delete_session(session_id: str):
 @router.put("/sessions/{session_id}/title", response_model=ChatSession)
 async def update_session_title(session_id: str, title: str):
     """セッションのタイトルを更新"""
-    session = session_service.get_session(session_id)
+    session = await session_service.aget_session(session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -219,47 +541,57 @@ async def update_session_title(session_id: str, title: str):
     return session
 
 
-@router.post("/grammar", response_model=Dict[str, Any])
+@router.post("/grammar", response_model=Dict[str, Any], dependencies=[Depends(rate_limit("grammar"))])
 async def check_grammar(text: str):
     """文法チェックを実行して結果を返す"""
     try:
-        # GeminiモデルでGrammarチェックを行う実装
-        # ここでは簡易的な実装
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        prompt = f"""
-        Please analyze the following English text for grammar errors. 
-        For each error, provide:
-        1. The incorrect part
-        2. The correct version
-        3. A brief explanation of the grammar rule
-
-        Return as a JSON array of objects with fields:
-        - original: the original incorrect text
-        - correction: the corrected text
-        - explanation: explanation of the grammar rule
-        - type: the type of error (e.g., "verb tense", "article", etc.)
-
-        TEXT: {text}
-        """
-        
-        response = model.generate_content(prompt)
-        
-        # 応答をJSONとして解析（エラー処理を追加）
-        try:
-            import json
-            corrections = json.loads(response.text)
-        except:
-            # JSONとして解析できない場合は、テキスト応答をそのまま返す
-            return {
-                "original_text": text,
-                "corrections": [],
-                "message": response.text
-            }
+        # 文単位でキャッシュを確認し、未チェックの文だけをGeminiに送る
+        return await grammar_service.check(text)
+    except LLMUnavailableError as e:
+        raise _service_unavailable(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error checking grammar: {str(e)}"
+        )
+
+
+@router.post("/grammar/batch", response_model=Dict[str, Any], dependencies=[Depends(rate_limit("grammar"))])
+async def check_grammar_batch(request: GrammarBatchRequest):
+    """複数のテキストの文法チェックをまとめて実行して結果を返す"""
+    try:
+        results = await grammar_service.check_batch(
+            [(item.id, item.text) for item in request.items]
+        )
+        return {"results": results}
+    except LLMUnavailableError as e:
+        raise _service_unavailable(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error checking grammar: {str(e)}"
+        )
+
+
+@router.post("/grammar/document", dependencies=[Depends(rate_limit("grammar"))])
+async def check_grammar_document(request: GrammarDocumentRequest):
+    """長文をチャンクに分けて並行に文法チェックを実行して結果を返す"""
+    if request.stream:
+        async def stream_results():
+            try:
+                async for chunk_result in grammar_service.iter_document(request.text):
+                    yield json.dumps(chunk_result, ensure_ascii=False) + "\n"
+                yield json.dumps({"done": True}) + "\n"
+            except Exception as e:
+                # ストリーム開始後はステータスコードを変えられないため、エラー行を送る
+                yield json.dumps({"done": True, "error": f"Error checking grammar: {str(e)}"}) + "\n"
         
-        return {
-            "original_text": text,
-            "corrections": corrections
-        }
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+    
+    try:
+        return await grammar_service.check_document(request.text)
+    except LLMUnavailableError as e:
+        raise _service_unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -267,52 +599,34 @@ async def check_grammar(text: str):
         )
 
 
-@router.get("/vocabulary", response_model=Dict[str, Any])
-async def get_vocabulary(topic: str, level: str = "intermediate"):
+@router.get("/vocabulary", response_model=Dict[str, Any], dependencies=[Depends(rate_limit("vocabulary"))])
+async def get_vocabulary(response: Response, topic: str, level: str = "intermediate"):
     """特定のトピックに関連する語彙を提供"""
+    cache_key = ResponseCache.make_key(topic, level)
+    
+    # 事前生成したカタログにあればそれを返す
+    cataloged = catalog_service.get("vocabulary", cache_key)
+    if cataloged is not None:
+        response.headers["X-Cache"] = "CATALOG"
+        return cataloged
+    
+    # キャッシュにあればLLMを呼ばずに返す
+    cached = vocabulary_cache.get(cache_key)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return cached
+    response.headers["X-Cache"] = "MISS"
+    
     try:
         # Geminiモデルを使用して語彙推奨を取得
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        prompt = f"""
-        Generate a list of useful English vocabulary for {level} level students related to the topic "{topic}".
-        
-        For each word, provide:
-        1. The word itself
-        2. Part of speech (noun, verb, adj, etc.)
-        3. Definition (simple and clear)
-        4. Example sentence using the word
-        5. Any common collocations or phrases with this word
-        
-        Return as a JSON array of objects with fields:
-        - word: the vocabulary word
-        - partOfSpeech: the part of speech
-        - definition: a simple definition
-        - example: an example sentence
-        - collocations: array of common phrases/collocations
-        
-        Include 10 words that would be appropriate for {level} level English learners.
-        """
+        result = await content_service.generate_vocabulary(topic, level)
         
-        response = model.generate_content(prompt)
-        
-        # 応答をJSONとして解析（エラー処理を追加）
-        try:
-            import json
-            vocabulary = json.loads(response.text)
-        except:
-            # JSONとして解析できない場合は、テキスト応答をそのまま返す
-            return {
-                "topic": topic,
-                "level": level,
-                "vocabulary": [],
-                "message": response.text
-            }
-        
-        return {
-            "topic": topic,
-            "level": level,
-            "vocabulary": vocabulary
-        }
+        # JSONとして解析できなかった応答（messageを含む）はキャッシュしない
+        if "message" not in result:
+            vocabulary_cache.set(cache_key, result)
+        return result
+    except LLMUnavailableError as e:
+        raise _service_unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -320,43 +634,137 @@ async def get_vocabulary(topic: str, level: str = "intermediate"):
         )
 
 
-@router.get("/topics", response_model=List[Dict[str, Any]])
-async def get_conversation_topics(category: Optional[str] = None, count: int = 5):
+@router.get("/topics", response_model=List[Dict[str, Any]], dependencies=[Depends(rate_limit("vocabulary"))])
+async def get_conversation_topics(response: Response, category: Optional[str] = None, count: int = 5):
     """会話トピックの推奨を提供"""
+    cache_key = ResponseCache.make_key(category, count)
+    
+    # 事前生成したカタログにあればそれを返す
+    cataloged = catalog_service.get("topics", cache_key)
+    if cataloged is not None:
+        response.headers["X-Cache"] = "CATALOG"
+        return cataloged
+    
+    # キャッシュにあればLLMを呼ばずに返す
+    cached = topics_cache.get(cache_key)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return cached
+    response.headers["X-Cache"] = "MISS"
+    
     try:
-        # カテゴリがある場合はそれに関連するトピックを、なければ一般的なトピックを提供
-        category_prompt = f"related to {category}" if category else "for general conversation practice"
-        
         # Geminiモデルを使用してトピックを取得
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        prompt = f"""
-        Generate {count} interesting conversation topics {category_prompt} for English language learners.
-        
-        For each topic, provide:
-        1. A title/question for the topic
-        2. A brief description of the topic
-        3. 3 sample questions to get the conversation started
+        topics = await content_service.generate_topics(category, count)
         
-        Return as a JSON array of objects with fields:
-        - title: the conversation topic title/question
-        - description: a brief description of why this is a good conversation topic
-        - questions: array of 3 starter questions
-        - category: the category this topic belongs to
-        """
-        
-        response = model.generate_content(prompt)
-        
-        # 応答をJSONとして解析（エラー処理を追加）
-        try:
-            import json
-            topics = json.loads(response.text)
-        except:
-            # JSONとして解析できない場合は、空のトピックリストを返す
+        # JSONとして解析できない場合は、空のトピックリストを返す（キャッシュしない）
+        if topics is None:
             return []
         
+        topics_cache.set(cache_key, topics)
         return topics
+    except LLMUnavailableError as e:
+        raise _service_unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating conversation topics: {str(e)}"
         )
+
+
+def _stream_content_items(
+    stored_items: Optional[List[Dict[str, Any]]],
+    generate: Optional[Callable[[], AsyncIterator[Dict[str, Any]]]],
+    on_complete: Optional[Callable[[List[Dict[str, Any]]], None]],
+    cache_status: str
+) -> StreamingResponse:
+    """
+    語彙・トピックを1件ずつNDJSONで返すレスポンスを作成する。
+    カタログやキャッシュにある場合はすぐにすべて返し、なければ生成された順に返す。
+    """
+    async def stream_items():
+        if stored_items is not None:
+            for index, item in enumerate(stored_items):
+                yield json.dumps({"index": index, "item": item}, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True, "count": len(stored_items)}) + "\n"
+            return
+        
+        items: List[Dict[str, Any]] = []
+        try:
+            async for item in generate():
+                yield json.dumps({"index": len(items), "item": item}, ensure_ascii=False) + "\n"
+                items.append(item)
+        except Exception as e:
+            # ストリーム開始後はステータスコードを変えられないため、エラー行を送る
+            yield json.dumps({"done": True, "count": len(items), "error": f"Error generating content: {str(e)}"}) + "\n"
+            return
+        # 最後まで生成できた場合のみキャッシュする
+        on_complete(items)
+        yield json.dumps({"done": True, "count": len(items)}) + "\n"
+    
+    return StreamingResponse(
+        stream_items(),
+        media_type="application/x-ndjson",
+        headers={"X-Cache": cache_status}
+    )
+
+
+@router.get("/vocabulary/stream", dependencies=[Depends(rate_limit("vocabulary"))])
+async def stream_vocabulary(topic: str, level: str = "intermediate"):
+    """特定のトピックに関連する語彙を、生成された順に1語ずつNDJSONで提供"""
+    cache_key = ResponseCache.make_key(topic, level)
+    
+    cataloged = catalog_service.get("vocabulary", cache_key)
+    if cataloged is not None:
+        return _stream_content_items(cataloged["vocabulary"], None, None, "CATALOG")
+    cached = vocabulary_cache.get(cache_key)
+    if cached is not None:
+        return _stream_content_items(cached["vocabulary"], None, None, "HIT")
+    
+    return _stream_content_items(
+        None,
+        lambda: content_service.stream_vocabulary(topic, level),
+        lambda items: vocabulary_cache.set(cache_key, {"topic": topic, "level": level, "vocabulary": items}),
+        "MISS"
+    )
+
+
+@router.get("/topics/stream", dependencies=[Depends(rate_limit("vocabulary"))])
+async def stream_conversation_topics(category: Optional[str] = None, count: int = 5):
+    """会話トピックの推奨を、生成された順に1件ずつNDJSONで提供"""
+    cache_key = ResponseCache.make_key(category, count)
+    
+    cataloged = catalog_service.get("topics", cache_key)
+    if cataloged is not None:
+        return _stream_content_items(cataloged, None, None, "CATALOG")
+    cached = topics_cache.get(cache_key)
+    if cached is not None:
+        return _stream_content_items(cached, None, None, "HIT")
+    
+    return _stream_content_items(
+        None,
+        lambda: content_service.stream_topics(category, count),
+        lambda items: topics_cache.set(cache_key, items),
+        "MISS"
+    )
+
+
+@router.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics():
+    """キャッシュなどの内部メトリクスを取得"""
+    return {
+        "catalog": catalog_service.stats(),
+        "vocabulary_cache": vocabulary_cache.stats(),
+        "topics_cache": topics_cache.stats(),
+        "grammar_cache": grammar_cache.stats(),
+        "grammar": grammar_service.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "llm_router": llm_router.stats(),
+        "model_tiering": tiering_policy.stats(),
+        "resilience": resilience.stats(),
+        "concurrency_limiters": limiter_stats(),
+        "rate_limits": rate_limiter.stats(),
+        "chat_idempotency": chat_idempotency.stats(),
+        "tracing": tracer.stats(),
+        "auth": jwt_verifier.stats(),
+        "llm_single_flight": gemini_service.single_flight.stats()
+    }
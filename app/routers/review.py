@@ -0,0 +1,86 @@
+from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
+from typing import List
+from ..models.models import Word, ReviewCard, ReviewEnrollRequest, ReviewEnrollResult, ReviewResult, ErrorResponse
+from supabase import AsyncClient
+from ..db.supabase import get_supabase_client
+from ..services.review_scheduler import ReviewScheduler
+from ..utils.helpers import handle_supabase_response
+from ..utils.auth import get_current_active_user
+import os
+
+# ユーザーごとの単語の復習スケジュール（SQLiteに保存し、複数のワーカーで共有する）
+review_scheduler = ReviewScheduler(os.getenv("REVIEW_STORAGE_PATH", "data/reviews.sqlite") or None)
+
+router = APIRouter(
+    prefix="/reviews",
+    tags=["reviews"],
+    responses={404: {"model": ErrorResponse}},
+)
+
+@router.post("/enroll", response_model=ReviewEnrollResult)
+async def enroll_words(
+    request: ReviewEnrollRequest = Body(..., description="復習対象に追加する単語"),
+    current_user = Depends(get_current_active_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """
+    単語を復習対象に追加する（追加した単語はすぐに復習対象になる）
+    """
+    word_ids = list(dict.fromkeys(request.word_ids))
+    if not word_ids:
+        return ReviewEnrollResult()
+
+    response = await supabase.table("words").select("id").in_("id", word_ids).execute()
+    existing = {row["id"] for row in handle_supabase_response(response, "Failed to fetch words")}
+
+    found = [word_id for word_id in word_ids if word_id in existing]
+    enrolled = await review_scheduler.enroll(current_user.id, found)
+    return ReviewEnrollResult(
+        enrolled=enrolled,
+        already_enrolled=len(found) - enrolled,
+        not_found=[word_id for word_id in word_ids if word_id not in existing]
+    )
+
+@router.get("/due", response_model=List[ReviewCard])
+async def get_due_cards(
+    limit: int = Query(20, ge=1, le=100, description="取得する単語の最大数"),
+    current_user = Depends(get_current_active_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """
+    復習日時を過ぎた単語を復習日時の早い順に取得する
+    """
+    cards = await review_scheduler.due(current_user.id, limit)
+    if not cards:
+        return []
+
+    response = await supabase.table("words").select("*").in_("id", [card.word_id for card in cards]).execute()
+    words = {row["id"]: row for row in handle_supabase_response(response, "Failed to fetch words")}
+
+    # 削除された単語は復習対象から外す
+    deleted = [card.word_id for card in cards if card.word_id not in words]
+    if deleted:
+        await review_scheduler.remove(current_user.id, deleted)
+
+    return [card.copy(update={"word": Word(**words[card.word_id])}) for card in cards if card.word_id in words]
+
+@router.get("/stats", response_model=dict)
+async def get_review_stats(current_user = Depends(get_current_active_user)):
+    """
+    復習スケジューラーのメトリクスを取得する
+    """
+    return review_scheduler.stats()
+
+@router.post("/{word_id}", response_model=ReviewCard)
+async def record_review(
+    word_id: int = Path(..., description="復習した単語のID"),
+    result: ReviewResult = Body(..., description="復習の結果"),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    復習結果（0〜5）を記録し、SM-2で次の復習日時を決める
+    """
+    card = await review_scheduler.record_review(current_user.id, word_id, result.quality)
+    if card is None:
+        raise HTTPException(status_code=404, detail="Word is not enrolled for review")
+    return card
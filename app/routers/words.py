@@ -1,13 +1,90 @@
-from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
-from typing import List, Optional
-from ..models.models import Word, WordCreate, WordUpdate, ErrorResponse
-from ..db.supabase import supabase  # これで正しくインポートできます
+from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends, Request
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from ..models.models import Word, WordCreate, WordUpdate, WordPage, WordImportReport, ErrorResponse
+from supabase import AsyncClient
+from postgrest.exceptions import APIError
+from ..db.supabase import get_supabase_client, supabase_pool
+from ..services.response_cache import ResponseCache
+from ..services.word_index import WordSearchIndex
+from ..services.word_import import CSV_FORMAT, NDJSON_FORMAT, WordImporter, iter_lines, iter_rows
 from ..utils.helpers import handle_supabase_response, filter_none_values
 from ..utils.auth import get_current_active_user
+import base64
+import json
 import logging
+import os
+import re
 
 logger = logging.getLogger(__name__)
 
+# 単語検索用のプロセス内インデックス（起動時に構築し、書き込みと定期的な再同期で最新に保つ）
+word_index = WordSearchIndex(min_similarity=float(os.getenv("WORD_INDEX_MIN_SIMILARITY", "0.4")))
+word_index_resync_interval = float(os.getenv("WORD_INDEX_RESYNC_INTERVAL", "300"))
+# 単語の取り込みで同時に実行する登録の数
+word_import_concurrency = int(os.getenv("WORD_IMPORT_CONCURRENCY", "4"))
+# インデックスの構築時に1回のクエリで読み込む単語数
+WORD_INDEX_PAGE_SIZE = 1000
+
+# 単語の読み取りキャッシュ（IDごとの単語と一覧のページ。書き込み時に無効化する）
+word_cache_ttl = float(os.getenv("WORD_CACHE_TTL", "300"))
+word_cache = ResponseCache(
+    max_size=int(os.getenv("WORD_CACHE_MAX_SIZE", "10000")),
+    ttl_seconds=word_cache_ttl
+)
+word_list_cache = ResponseCache(
+    max_size=int(os.getenv("WORD_LIST_CACHE_MAX_SIZE", "256")),
+    ttl_seconds=word_cache_ttl
+)
+# 書き込みのたびに増やす世代番号（読み込み中に書き込みがあった結果をキャッシュしないために使う）
+_word_cache_generation = 0
+
+def _word_key(word_id: Any) -> str:
+    """IDごとの単語のキャッシュキー"""
+    return f"word:{word_id}"
+
+def _cache_words(rows: List[Dict[str, Any]]) -> None:
+    """書き込んだ単語をキャッシュに反映し、一覧のキャッシュを無効化する"""
+    global _word_cache_generation
+    _word_cache_generation += 1
+    word_cache.set_many({_word_key(row["id"]): row for row in rows})
+    word_list_cache.clear()
+
+def _uncache_word(word_id: int) -> None:
+    """削除した単語をキャッシュから取り除き、一覧のキャッシュを無効化する"""
+    global _word_cache_generation
+    _word_cache_generation += 1
+    word_cache.delete(_word_key(word_id))
+    word_list_cache.clear()
+
+def _on_words_inserted(rows: List[Dict[str, Any]]) -> None:
+    """登録した単語を検索インデックスとキャッシュに反映する"""
+    word_index.upsert_many(rows)
+    _cache_words(rows)
+
+async def load_all_words() -> List[dict]:
+    """インデックス構築用に、すべての単語をID順にページ分けして読み込む"""
+    supabase = await supabase_pool.get_client()
+    words = []
+    start = 0
+    while True:
+        response = await supabase.table("words").select("*").order("id").range(
+            start, start + WORD_INDEX_PAGE_SIZE - 1
+        ).execute()
+        page = response.data or []
+        words.extend(page)
+        if len(page) < WORD_INDEX_PAGE_SIZE:
+            return words
+        start += WORD_INDEX_PAGE_SIZE
+
+def start_word_index() -> None:
+    """単語検索インデックスの構築と定期的な再同期を開始する"""
+    word_index.start_sync(load_all_words, word_index_resync_interval)
+
+def stop_word_index() -> None:
+    """単語検索インデックスの再同期を停止する"""
+    word_index.stop_sync()
+
 router = APIRouter(
     prefix="/words",
     tags=["words"],
@@ -18,10 +95,17 @@ router = APIRouter(
 async def get_words(
     skip: int = Query(0, description="スキップする単語数"),
     limit: int = Query(100, description="取得する単語の最大数"),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """
     単語のリストを取得する
     """
+    cache_key = f"list:{skip}:{limit}"
+    cached = word_list_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = _word_cache_generation
+    
     try:
         # クエリの構築と実行
         query = supabase.table("words").select("*").range(skip, skip + limit - 1).order("id")
@@ -29,7 +113,7 @@ async def get_words(
         logger.debug(f"Range: {skip} to {skip + limit - 1}")
         
         # クエリの実行
-        response = query.execute()
+        response = await query.execute()
         logger.debug(f"Response status: {getattr(response, 'status_code', 'N/A')}")
         logger.debug(f"Response data type: {type(response.data)}")
         logger.debug(f"Response data: {response.data}")
@@ -38,52 +122,176 @@ async def get_words(
         result = handle_supabase_response(response, "Failed to fetch words")
         logger.debug(f"Processed result: {result}")
         
+        if generation == _word_cache_generation:
+            word_list_cache.set(cache_key, result)
         return result
     except Exception as e:
         logger.error(f"Error in get_words: {str(e)}", exc_info=True)
         raise
 
+def _encode_cursor(sort: str, order: str, last: Dict[str, Any]) -> str:
+    """ページの最後の単語から次のページのカーソルを作成する"""
+    payload = {"sort": sort, "order": order, "id": last["id"]}
+    if sort == "created_at":
+        payload["created_at"] = last["created_at"]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+def _parse_timestamp(value: str) -> datetime:
+    """PostgreSQLのタイムスタンプ文字列を解釈する（小数秒の桁数が6桁でない場合も受け付ける）"""
+    value = value.replace("Z", "+00:00")
+    value = re.sub(r"\.(\d+)", lambda m: "." + m.group(1)[:6].ljust(6, "0"), value, count=1)
+    return datetime.fromisoformat(value)
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> Dict[str, Any]:
+    """
+    カーソルを復元する（並び順が異なるカーソルや壊れたカーソルは400エラー）。
+    値はフィルターの文字列に埋め込むため、型を確認して正規化した値だけを返す
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(payload, dict):
+            raise ValueError("Cursor must be an object")
+        word_id = payload["id"]
+        # bool は int のサブクラスのため除外する
+        if not isinstance(word_id, int) or isinstance(word_id, bool):
+            raise ValueError("Cursor id must be an integer")
+        position: Dict[str, Any] = {"id": word_id}
+        if sort == "created_at":
+            created_at = payload["created_at"]
+            if not isinstance(created_at, str):
+                raise ValueError("Cursor created_at must be a string")
+            # 日時として解釈し直した値を使い、カーソルの文字列をそのままフィルターに渡さない
+            position["created_at"] = _parse_timestamp(created_at).isoformat()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("sort") != sort or payload.get("order") != order:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort and order")
+    return position
+
+@router.get("/page", response_model=WordPage)
+async def get_words_page(
+    cursor: Optional[str] = Query(None, description="前のページの next_cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="取得する単語の最大数"),
+    sort: str = Query("id", regex="^(id|created_at)$", description="並び替えのキー（id / created_at）"),
+    order: str = Query("asc", regex="^(asc|desc)$", description="並び順（asc / desc）"),
+    created_after: Optional[datetime] = Query(None, description="この日時以降に作成された単語のみ"),
+    created_before: Optional[datetime] = Query(None, description="この日時より前に作成された単語のみ"),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """
+    単語のリストをカーソルで順に取得する。
+    前のページの最後の単語より後ろから読むため、深いページでも遅くならず、途中で単語が追加されても重複・欠落しない
+    """
+    descending = order == "desc"
+    comparison = "lt" if descending else "gt"
+    
+    query = supabase.table("words").select("*")
+    if created_after:
+        query = query.gte("created_at", created_after.isoformat())
+    if created_before:
+        query = query.lt("created_at", created_before.isoformat())
+    
+    if cursor:
+        position = _decode_cursor(cursor, sort, order)
+        if sort == "id":
+            query = query.filter("id", comparison, position["id"])
+        else:
+            # 作成日時が同じ単語はIDで順序を決める
+            created_at = f'"{position["created_at"]}"'
+            query = query.or_(
+                f"created_at.{comparison}.{created_at},"
+                f"and(created_at.eq.{created_at},id.{comparison}.{position['id']})"
+            )
+    
+    if sort == "created_at":
+        query = query.order("created_at", desc=descending)
+    query = query.order("id", desc=descending)
+    
+    # 次のページがあるかどうかを判定するために1件多く取得する
+    response = await query.limit(limit + 1).execute()
+    rows = handle_supabase_response(response, "Failed to fetch words")
+    
+    items = rows[:limit]
+    next_cursor = _encode_cursor(sort, order, items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.get("/search", response_model=List[Word])
 async def search_words(
     query: str = Query(..., description="検索クエリ"),
+    limit: int = Query(50, description="取得する単語の最大数"),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """
-    単語を検索する
+    単語を検索する（単語・意味の部分一致、前方一致、綴り間違いを許容した一致を関連度順に返す）
     """
-    response = supabase.table("words").select("*").ilike("word", f"%{query}%").execute()
+    if word_index.ready:
+        return word_index.search(query, limit)
+    
+    # インデックスの構築前はデータベースで検索する
+    response = await supabase.table("words").select("*").ilike("word", f"%{query}%").limit(limit).execute()
     return handle_supabase_response(response, "Failed to search words")
 
+@router.get("/stats", response_model=dict)
+async def get_word_stats():
+    """
+    単語のキャッシュと検索インデックスのメトリクスを取得する
+    """
+    return {
+        "word_cache": word_cache.stats(),
+        "word_list_cache": word_list_cache.stats(),
+        "search_index": word_index.stats()
+    }
+
 @router.post("/", response_model=Word)
 async def create_word(
     word: WordCreate = Body(..., description="作成する単語情報"),
-    current_user = Depends(get_current_active_user)
+    current_user = Depends(get_current_active_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """
     新しい単語を登録する
     """
-    response = supabase.table("words").insert(word.dict()).execute()
-    return handle_supabase_response(response, "Failed to create word")[0]
+    try:
+        response = await supabase.table("words").insert(word.dict()).execute()
+    except APIError as e:
+        # words.word の一意制約（一括取り込みと同じ単語の重複を防ぐ）に違反した場合
+        if e.code == "23505":
+            raise HTTPException(status_code=409, detail="Word already exists")
+        raise
+    created = handle_supabase_response(response, "Failed to create word")[0]
+    word_index.upsert(created)
+    _cache_words([created])
+    return created
 
 @router.get("/{word_id}", response_model=Word)
 async def get_word(
     word_id: int = Path(..., description="取得する単語のID"),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """
     指定したIDの単語を取得する
     """
-    response = supabase.table("words").select("*").eq("id", word_id).execute()
+    cached = word_cache.get(_word_key(word_id))
+    if cached is not None:
+        return cached
+    generation = _word_cache_generation
+    
+    response = await supabase.table("words").select("*").eq("id", word_id).execute()
     data = handle_supabase_response(response, "Failed to fetch word")
     
     if not data:
         raise HTTPException(status_code=404, detail="Word not found")
     
+    if generation == _word_cache_generation:
+        word_cache.set(_word_key(word_id), data[0])
     return data[0]
 
 @router.put("/{word_id}", response_model=Word)
 async def update_word(
     word_id: int = Path(..., description="更新する単語のID"),
     word: WordUpdate = Body(..., description="更新する単語情報"),
-    current_user = Depends(get_current_active_user)
+    current_user = Depends(get_current_active_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """
     指定したIDの単語を更新する
@@ -94,35 +302,70 @@ async def update_word(
     if not update_data:
         raise HTTPException(status_code=400, detail="No valid fields to update")
     
-    response = supabase.table("words").update(update_data).eq("id", word_id).execute()
+    response = await supabase.table("words").update(update_data).eq("id", word_id).execute()
     data = handle_supabase_response(response, "Failed to update word")
     
     if not data:
         raise HTTPException(status_code=404, detail="Word not found")
     
+    word_index.upsert(data[0])
+    _cache_words([data[0]])
     return data[0]
 
 @router.delete("/{word_id}", response_model=dict)
 async def delete_word(
     word_id: int = Path(..., description="削除する単語のID"),
-    current_user = Depends(get_current_active_user)
+    current_user = Depends(get_current_active_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """
     指定したIDの単語を削除する
     """
-    response = supabase.table("words").delete().eq("id", word_id).execute()
+    response = await supabase.table("words").delete().eq("id", word_id).execute()
     handle_supabase_response(response, "Failed to delete word")
+    word_index.remove(word_id)
+    _uncache_word(word_id)
     
     return {"message": "Word deleted successfully"}
 
 @router.post("/batch", response_model=List[Word])
 async def create_words_batch(
     words: List[WordCreate] = Body(..., description="バッチで作成する単語リスト"),
-    current_user = Depends(get_current_active_user)
+    current_user = Depends(get_current_active_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """
     複数の単語を一括で登録する
     """
     words_data = [word.dict() for word in words]
-    response = supabase.table("words").insert(words_data).execute()
-    return handle_supabase_response(response, "Failed to create words batch")
\ No newline at end of file
+    response = await supabase.table("words").insert(words_data).execute()
+    created = handle_supabase_response(response, "Failed to create words batch")
+    _on_words_inserted(created)
+    return created
+
+@router.post("/import", response_model=WordImportReport)
+async def import_words(
+    request: Request,
+    import_format: Optional[str] = Query(
+        None, alias="format", regex="^(ndjson|csv)$",
+        description="取り込み形式（ndjson / csv）。省略時はContent-Typeから判定する"
+    ),
+    chunk_size: int = Query(500, ge=1, le=1000, description="1回の登録でまとめる単語数"),
+    current_user = Depends(get_current_active_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """
+    NDJSON（1行に1単語のJSON）またはCSV（1行目はヘッダー）の単語をストリームで取り込む。
+    リクエストを読みながら一定件数ごとに登録し、重複した単語は登録しない
+    """
+    if import_format is None:
+        content_type = request.headers.get("content-type", "")
+        import_format = CSV_FORMAT if "csv" in content_type else NDJSON_FORMAT
+    
+    importer = WordImporter(
+        supabase,
+        chunk_size=chunk_size,
+        max_concurrency=word_import_concurrency,
+        on_inserted=_on_words_inserted
+    )
+    return await importer.run(iter_rows(iter_lines(request.stream()), import_format))
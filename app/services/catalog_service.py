@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import json
+import os
+
+
+class CatalogService:
+    """事前生成した語彙・トピックのカタログを管理するサービス"""
+    
+    SECTIONS = ("vocabulary", "topics")
+    
+    def __init__(self, storage_path: Optional[str] = None):
+        """カタログの初期化"""
+        self.storage_path = storage_path
+        
+        # セクション -> (正規化したキー -> コンテンツ) のインデックス
+        self.sections: Dict[str, Dict[str, Any]] = {section: {} for section in self.SECTIONS}
+        self.generated_at: Optional[str] = None
+        
+        # メトリクス
+        self.hits = 0
+        self.misses = 0
+        
+        if self.storage_path and os.path.exists(self.storage_path):
+            self._load()
+    
+    def _load(self) -> None:
+        """ファイルからカタログを読み込む"""
+        try:
+            with open(self.storage_path, 'r') as f:
+                data = json.load(f)
+            
+            for section in self.SECTIONS:
+                self.sections[section] = data.get(section, {})
+            self.generated_at = data.get("generated_at")
+        except Exception as e:
+            print(f"Error loading catalog: {e}")
+    
+    def save(self) -> None:
+        """カタログをファイルに保存する"""
+        if not self.storage_path:
+            return
+        
+        directory = os.path.dirname(self.storage_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.generated_at = datetime.now().isoformat()
+        data = {"generated_at": self.generated_at, **self.sections}
+        
+        # 書き込み途中のファイルを読まないように一時ファイル経由で置き換える
+        tmp_path = f"{self.storage_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.storage_path)
+    
+    def get(self, section: str, key: str) -> Optional[Any]:
+        """カタログからコンテンツを取得する（未登録の場合はNone）"""
+        content = self.sections[section].get(key)
+        if content is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return content
+    
+    def put(self, section: str, key: str, content: Any) -> None:
+        """カタログにコンテンツを登録する（保存は save で行う）"""
+        self.sections[section][key] = content
+    
+    def keys(self, section: str) -> List[str]:
+        """セクションに登録されているキーの一覧を取得する"""
+        return list(self.sections[section].keys())
+    
+    def stats(self) -> Dict[str, Any]:
+        """カタログのメトリクスを取得する"""
+        return {
+            "generated_at": self.generated_at,
+            "entries": {section: len(entries) for section, entries in self.sections.items()},
+            "hits": self.hits,
+            "misses": self.misses
+        }
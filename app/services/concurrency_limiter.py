@@ -0,0 +1,190 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import asyncio
+import os
+import time
+
+from .resilience import LLMUnavailableError
+
+T = TypeVar("T")
+
+# プロバイダからのスロットリング（レート制限）とみなす例外クラス名
+THROTTLE_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests", "RateLimitError", "OverloadedError"}
+
+
+def is_throttled(error: BaseException) -> bool:
+    """例外がプロバイダのスロットリングによるものかどうかを判定する"""
+    if any(cls.__name__ in THROTTLE_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status_code in (429, 529)
+
+
+class LimiterQueueFullError(LLMUnavailableError):
+    """同時実行数の上限に達し、待ち行列にも入れられなかったことを示す例外"""
+
+    def __init__(self, name: str):
+        super().__init__(f"Too many concurrent requests to '{name}'", retry_after=1.0)
+        self.name = name
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD方式で同時実行数の上限を調整するリミッター。
+    上限近くまで使われていて遅延が安定している間は上限を少しずつ増やし、スロットリングや遅延の急増で大きく減らす。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        max_queue: int = 100,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.7,
+        increase_utilization: float = 0.8
+    ):
+        """リミッターの初期化"""
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        # 上限を超えた呼び出しを待たせる待ち行列の長さ
+        self.max_queue = max_queue
+        # 基準遅延のこの倍率を超えたら遅延の急増とみなす
+        self.latency_tolerance = latency_tolerance
+        # 上限を減らすときの倍率
+        self.backoff_ratio = backoff_ratio
+        # 実行中の呼び出しが上限のこの割合以上のときだけ上限を増やす
+        # （余裕がある間に増やすと、実際には試していない上限まで膨らんでしまう）
+        self.increase_utilization = increase_utilization
+
+        self.in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        # 負荷が低いときの遅延の目安（成功した呼び出しの遅延の移動平均）
+        self.baseline_latency: Optional[float] = None
+
+        # メトリクス
+        self.completed = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.decreases = 0
+
+    async def acquire(self) -> None:
+        """実行枠を取得する（上限に達している場合は待ち行列で待つ）"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LimiterQueueFullError(self.name)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # 枠を受け取った直後にキャンセルされた場合は枠を返す
+                self.in_flight -= 1
+                self._wake_waiters()
+            raise
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False) -> None:
+        """
+        実行枠を返し、結果に応じて上限を調整する
+
+        Args:
+            latency: プロバイダの応答にかかった秒数（ストリームの場合は最初のチャンクまで）。Noneの場合は調整しない
+            throttled: プロバイダにスロットリングされたかどうか
+        """
+        # 返す前の使用率（待ち行列がある場合は上限まで使われている）
+        saturated = bool(self._waiters) or self.in_flight >= self.limit * self.increase_utilization
+        self.in_flight -= 1
+
+        if throttled:
+            self.throttled += 1
+            self._decrease()
+        elif latency is not None:
+            self.completed += 1
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            if latency > self.baseline_latency * self.latency_tolerance:
+                self._decrease()
+            else:
+                if saturated:
+                    # 加算的に増やす（上限いっぱいの呼び出しが一巡するとおよそ1増える）
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.baseline_latency = 0.95 * self.baseline_latency + 0.05 * latency
+
+        self._wake_waiters()
+
+    def _decrease(self) -> None:
+        """上限を乗算的に減らす"""
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        self.decreases += 1
+
+    def _wake_waiters(self) -> None:
+        """空いた枠の分だけ待ち行列の先頭から実行を再開させる"""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def run(self, func: Callable[[], Awaitable[T]]) -> T:
+        """実行枠を取得して関数を呼び出し、遅延とスロットリングを上限の調整に反映する"""
+        await self.acquire()
+        started_at = time.monotonic()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception as e:
+            if is_throttled(e):
+                self.release(throttled=True)
+            else:
+                self.release()
+            raise
+        self.release(latency=time.monotonic() - started_at)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """現在の上限と待ち行列の状態を取得する"""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "baseline_latency": self.baseline_latency,
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "decreases": self.decreases
+        }
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_limiter(name: str) -> AdaptiveConcurrencyLimiter:
+    """プロバイダ名（gemini / anthropic）に対応する共有リミッターを取得する"""
+    if name not in _limiters:
+        _limiters[name] = AdaptiveConcurrencyLimiter(
+            name,
+            initial_limit=float(os.environ.get("LLM_CONCURRENCY_INITIAL", "8")),
+            min_limit=float(os.environ.get("LLM_CONCURRENCY_MIN", "1")),
+            max_limit=float(os.environ.get("LLM_CONCURRENCY_MAX", "64")),
+            max_queue=int(os.environ.get("LLM_CONCURRENCY_MAX_QUEUE", "100"))
+        )
+    return _limiters[name]
+
+
+def limiter_stats() -> Dict[str, Any]:
+    """全リミッターの状態を取得する"""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,119 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .gemini_service import GeminiService
+from ..utils.llm_json import IncrementalJSONArrayParser, parse_json_text
+
+
+class ContentService:
+    """語彙リストや会話トピックなどの学習コンテンツ生成サービス"""
+    
+    def __init__(self, gemini_service: GeminiService, model_name: str = "gemini-1.5-flash"):
+        """学習コンテンツ生成サービスの初期化"""
+        self.gemini_service = gemini_service
+        self.model_name = model_name
+    
+    @staticmethod
+    def vocabulary_prompt(topic: str, level: str) -> str:
+        """語彙リスト生成用のプロンプトを作成する"""
+        return f"""
+        Generate a list of useful English vocabulary for {level} level students related to the topic "{topic}".
+        
+        For each word, provide:
+        1. The word itself
+        2. Part of speech (noun, verb, adj, etc.)
+        3. Definition (simple and clear)
+        4. Example sentence using the word
+        5. Any common collocations or phrases with this word
+        
+        Return as a JSON array of objects with fields:
+        - word: the vocabulary word
+        - partOfSpeech: the part of speech
+        - definition: a simple definition
+        - example: an example sentence
+        - collocations: array of common phrases/collocations
+        
+        Include 10 words that would be appropriate for {level} level English learners.
+        """
+    
+    @staticmethod
+    def topics_prompt(category: Optional[str], count: int) -> str:
+        """会話トピック生成用のプロンプトを作成する"""
+        # カテゴリがある場合はそれに関連するトピックを、なければ一般的なトピックを提供
+        category_prompt = f"related to {category}" if category else "for general conversation practice"
+        
+        return f"""
+        Generate {count} interesting conversation topics {category_prompt} for English language learners.
+        
+        For each topic, provide:
+        1. A title/question for the topic
+        2. A brief description of the topic
+        3. 3 sample questions to get the conversation started
+        
+        Return as a JSON array of objects with fields:
+        - title: the conversation topic title/question
+        - description: a brief description of why this is a good conversation topic
+        - questions: array of 3 starter questions
+        - category: the category this topic belongs to
+        """
+    
+    async def generate_vocabulary(self, topic: str, level: str) -> Dict[str, Any]:
+        """
+        トピックに関連する語彙リストを生成する。
+        JSONとして解析できない場合は、空のリストと応答テキスト（message）を返す。
+        """
+        response_text = await self.gemini_service.generate_text(
+            self.vocabulary_prompt(topic, level),
+            model_name=self.model_name
+        )
+        
+        try:
+            vocabulary = parse_json_text(response_text)
+        except ValueError:
+            return {
+                "topic": topic,
+                "level": level,
+                "vocabulary": [],
+                "message": response_text
+            }
+        
+        return {
+            "topic": topic,
+            "level": level,
+            "vocabulary": vocabulary
+        }
+    
+    async def generate_topics(self, category: Optional[str], count: int) -> Optional[List[Dict[str, Any]]]:
+        """会話トピックを生成する（JSONとして解析できない場合はNone）"""
+        response_text = await self.gemini_service.generate_text(
+            self.topics_prompt(category, count),
+            model_name=self.model_name
+        )
+        
+        try:
+            return parse_json_text(response_text)
+        except ValueError:
+            return None
+    
+    async def _stream_items(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """構造化出力モードで生成したJSON配列の要素を、完成した順に返す"""
+        parser = IncrementalJSONArrayParser()
+        stream = self.gemini_service.stream_text(prompt, model_name=self.model_name, json_output=True)
+        try:
+            async for text in stream:
+                for item in parser.feed(text):
+                    yield item
+                if parser.finished:
+                    break
+        finally:
+            # 途中で読むのをやめた場合も、生成の同時実行枠をすぐに返す
+            await stream.aclose()
+        if not parser.finished:
+            raise ValueError("Model response ended before the JSON array was complete")
+    
+    def stream_vocabulary(self, topic: str, level: str) -> AsyncIterator[Dict[str, Any]]:
+        """トピックに関連する語彙を、生成された順に1語ずつ返す"""
+        return self._stream_items(self.vocabulary_prompt(topic, level))
+    
+    def stream_topics(self, category: Optional[str], count: int) -> AsyncIterator[Dict[str, Any]]:
+        """会話トピックを、生成された順に1件ずつ返す"""
+        return self._stream_items(self.topics_prompt(category, count))
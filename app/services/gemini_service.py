@@ -1,9 +1,14 @@
 import google.generativeai as genai
 import os
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import hashlib
+import time
 
 from ..models.chat import Message, ChatSession
+from .single_flight import SingleFlight
+from .resilience import resilience
+from .concurrency_limiter import get_limiter, is_throttled
 
 
 class GeminiService:
@@ -29,6 +34,12 @@ class GeminiService:
             self.default_model = self.available_models[0]
         print(f"Using Gemini model: {self.default_model}")
         
+        # 同一プロンプトの同時リクエストを1回のAPI呼び出しにまとめる
+        self.single_flight = SingleFlight()
+        
+        # Gemini APIへの同時呼び出し数を負荷に応じて調整する
+        self.limiter = get_limiter("gemini")
+        
         # システムプロンプトの設定
         self.system_prompts = {
             "beginner": """You are an AI English language tutor named Emma. Your task is to help users learn English.
@@ -73,7 +84,7 @@ class GeminiService:
             "pronunciation": """Focus on pronunciation patterns. When appropriate, provide phonetic guidance for difficult words. Explain stress patterns, intonation, and linking sounds. Encourage the user to practice challenging sounds."""
         }
         
-    def _create_prompt_for_session(self, session: ChatSession, user_message: str) -> str:
+    def create_prompt_for_session(self, session: ChatSession, user_message: str) -> str:
         """セッションに基づいてプロンプトを作成する"""
         # セッションのレベルとフォーカスに基づいてプロンプトを作成
         level = session.level if session.level in self.system_prompts else "intermediate"
@@ -101,18 +112,20 @@ Now, respond to the user as Emma the English tutor:
         
         return prompt
     
-    async def generate_response(self, session: ChatSession, user_message: str) -> str:
-        """ユーザーメッセージに対する応答を生成する"""
-        
-        # セッション用のプロンプトを作成
-        prompt = self._create_prompt_for_session(session, user_message)
-        
-        # 温度設定（レベルによって調整）
-        temperature = 0.7 if session.level == "beginner" else 0.5 if session.level == "intermediate" else 0.3
-        
+    def get_temperature(self, level: str) -> float:
+        """レベルに応じた温度設定を返す"""
+        return 0.7 if level == "beginner" else 0.5 if level == "intermediate" else 0.3
+    
+    async def generate_completion(
+        self,
+        prompt: str,
+        temperature: float = 0.5,
+        model_name: Optional[str] = None
+    ) -> str:
+        """チューター用の生成設定でプロンプトに対する応答を生成する"""
         # Geminiモデルを初期化
         model = genai.GenerativeModel(
-            model_name=self.default_model,
+            model_name=model_name or self.default_model,
             generation_config=genai.GenerationConfig(
                 temperature=temperature,
                 top_p=0.95,
@@ -139,12 +152,101 @@ Now, respond to the user as Emma the English tutor:
             ]
         )
         
-        # 応答を生成
-        response = model.generate_content(prompt)
+        # 応答を生成（イベントループを塞がないよう非同期APIを使う）
+        response = await self.limiter.run(lambda: model.generate_content_async(prompt))
         
         # 応答テキストを返す
         return response.text
     
+    async def generate_response(self, session: ChatSession, user_message: str) -> str:
+        """ユーザーメッセージに対する応答を生成する"""
+        
+        # セッション用のプロンプトを作成
+        prompt = self.create_prompt_for_session(session, user_message)
+        
+        # 温度設定（レベルによって調整）
+        temperature = self.get_temperature(session.level)
+        
+        return await self.generate_completion(prompt, temperature)
+    
+    async def generate_text(self, prompt: str, model_name: Optional[str] = None) -> str:
+        """
+        プロンプトに対するテキストを生成する。
+        同じモデル・プロンプトの呼び出しが実行中であれば、その結果を共有する。
+        """
+        model_name = model_name or self.default_model
+        key = hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+        
+        async def call() -> str:
+            model = genai.GenerativeModel(model_name)
+            response = await model.generate_content_async(prompt)
+            return response.text
+        
+        # 一時的な障害はリトライし、障害が続く場合はサーキットブレーカーで即座に失敗させる
+        return await self.single_flight.do(
+            key,
+            lambda: resilience.call(f"gemini/{model_name}", lambda: self.limiter.run(call))
+        )
+    
+    async def stream_text(
+        self,
+        prompt: str,
+        model_name: Optional[str] = None,
+        json_output: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        プロンプトに対するテキストを生成された順に返す
+
+        Args:
+            prompt: プロンプト
+            model_name: 使用するモデル名
+            json_output: 構造化出力（JSON）モードで生成するかどうか
+        """
+        model_name = model_name or self.default_model
+        generation_config = {"response_mime_type": "application/json"} if json_output else None
+        model = genai.GenerativeModel(model_name, generation_config=generation_config)
+        
+        async def start() -> Tuple[AsyncIterator[Any], Optional[Any], float]:
+            """ストリームを開始して最初のチャンクを受け取る（成功した場合は枠を確保したまま返す）"""
+            # 同時呼び出しの枠は試行ごとに取得し、リトライの待ち時間には保持しない
+            await self.limiter.acquire()
+            started_at = time.monotonic()
+            try:
+                response = await model.generate_content_async(prompt, stream=True)
+                chunks = response.__aiter__()
+                try:
+                    first = await chunks.__anext__()
+                except StopAsyncIteration:
+                    first = None
+            except BaseException as e:
+                self.limiter.release(throttled=isinstance(e, Exception) and is_throttled(e))
+                raise
+            # プロバイダの遅延として、クライアントが読む速さに左右されない最初のチャンクまでの時間を使う
+            return chunks, first, time.monotonic() - started_at
+        
+        # 一時的な障害は、最初のチャンクを受け取るまでの間だけリトライする
+        chunks, first, first_chunk_latency = await resilience.call(f"gemini/{model_name}", start)
+        
+        # ストリームを読み終えるまで同時呼び出しの枠を確保する
+        completed = False
+        throttled = False
+        try:
+            if first is not None:
+                if first.parts:
+                    yield first.text
+                async for chunk in chunks:
+                    if chunk.parts:
+                        yield chunk.text
+            completed = True
+        except Exception as e:
+            throttled = is_throttled(e)
+            raise
+        finally:
+            self.limiter.release(
+                latency=first_chunk_latency if completed else None,
+                throttled=throttled
+            )
+    
     def generate_title(self, first_message: str) -> str:
         """最初のメッセージからセッションタイトルを生成する"""
         try:
@@ -0,0 +1,355 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import re
+
+from .gemini_service import GeminiService
+from .response_cache import ResponseCache
+from ..utils.llm_json import parse_json_text
+
+# 文末記号（と閉じ括弧・引用符）または改行・文字列末尾までを1文とみなす
+_SENTENCE_PATTERN = re.compile(r'\S.*?(?:[.!?]+["\')\]]*(?=\s|$)|(?=\n)|$)', re.DOTALL)
+
+# 空行を段落の区切りとみなす
+_PARAGRAPH_BREAK_PATTERN = re.compile(r'\n\s*\n')
+
+
+class GrammarService:
+    """文単位のキャッシュを使った文法チェックサービス"""
+
+    def __init__(
+        self,
+        gemini_service: GeminiService,
+        cache: ResponseCache,
+        model_name: str = "gemini-1.5-flash",
+        max_prompt_chars: int = 12000,
+        chunk_chars: int = 2000,
+        max_concurrency: int = 4
+    ):
+        """文法チェックサービスの初期化"""
+        self.gemini_service = gemini_service
+        self.cache = cache
+        self.model_name = model_name
+        # 1回のプロンプトに詰め込む文の合計文字数の上限（コンテキスト長の目安）
+        self.max_prompt_chars = max_prompt_chars
+        # 長文チェック時のチャンクの文字数の目安と、同時にチェックするチャンク数の上限
+        self.chunk_chars = chunk_chars
+        self.max_concurrency = max_concurrency
+
+        # メトリクス
+        self.model_calls = 0
+        self.fallback_calls = 0
+
+    @staticmethod
+    def split_sentences(text: str) -> List[Tuple[int, str]]:
+        """テキストを (開始位置, 文) のリストに分割する"""
+        return [(m.start(), m.group()) for m in _SENTENCE_PATTERN.finditer(text)]
+
+    @staticmethod
+    def sentence_key(sentence: str) -> str:
+        """空白を正規化した文のハッシュをキャッシュキーとして返す"""
+        normalized = re.sub(r"\s+", " ", sentence).strip()
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _build_prompt(self, sentences: Dict[str, str]) -> str:
+        """複数の文をまとめてチェックするプロンプトを作成する"""
+        items = [{"id": sentence_id, "text": text} for sentence_id, text in sentences.items()]
+        return f"""
+        Please analyze each of the following English sentences for grammar errors.
+        For each error, provide:
+        1. The incorrect part
+        2. The correct version
+        3. A brief explanation of the grammar rule
+
+        Return ONLY a JSON array with one object per sentence, with fields:
+        - id: the id of the sentence
+        - corrections: an array of objects with fields:
+          - original: the original incorrect text (copied exactly from the sentence)
+          - correction: the corrected text
+          - explanation: explanation of the grammar rule
+          - type: the type of error (e.g., "verb tense", "article", etc.)
+        Use an empty corrections array for sentences without errors.
+
+        SENTENCES: {json.dumps(items, ensure_ascii=False)}
+        """
+
+    @staticmethod
+    def _parse_results(response_text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """モデルの応答を id -> 訂正リスト の辞書に変換する"""
+        data = parse_json_text(response_text)
+        if not isinstance(data, list):
+            raise ValueError("Grammar response is not a JSON array")
+
+        results = {}
+        for item in data:
+            if not isinstance(item, dict) or "id" not in item:
+                continue
+            corrections = item.get("corrections") or []
+            if isinstance(corrections, list):
+                results[str(item["id"])] = [c for c in corrections if isinstance(c, dict)]
+        return results
+
+    def _pack(self, sentences: Dict[str, str]) -> List[Dict[str, str]]:
+        """文をプロンプトの文字数上限に収まるグループに分ける"""
+        packs: List[Dict[str, str]] = []
+        current: Dict[str, str] = {}
+        current_chars = 0
+        for key, sentence in sentences.items():
+            if current and current_chars + len(sentence) > self.max_prompt_chars:
+                packs.append(current)
+                current, current_chars = {}, 0
+            current[key] = sentence
+            current_chars += len(sentence)
+        if current:
+            packs.append(current)
+        return packs
+
+    async def _check_pack(self, sentences: Dict[str, str]) -> Tuple[Dict[str, List[Dict[str, Any]]], str]:
+        """
+        1回のプロンプトで文 (キー -> 文) をモデルに送り、キー -> 訂正リスト を返す。
+        解析できなかった場合は空の辞書と応答テキストを返す。
+        """
+        self.model_calls += 1
+        keys = list(sentences.keys())
+        # プロンプト内では短いIDを使う
+        prompt_sentences = {f"s{i}": sentences[key] for i, key in enumerate(keys)}
+
+        response_text = await self.gemini_service.generate_text(
+            self._build_prompt(prompt_sentences),
+            model_name=self.model_name
+        )
+
+        try:
+            parsed = self._parse_results(response_text)
+        except ValueError:
+            return {}, response_text
+
+        results = {}
+        for i, key in enumerate(keys):
+            if f"s{i}" in parsed:
+                results[key] = parsed[f"s{i}"]
+
+        # 結果が得られた文だけをキャッシュする
+        self.cache.set_many(results)
+        return results, response_text
+
+    @staticmethod
+    def _locate(corrections: List[Dict[str, Any]], start: int, sentence: str) -> List[Dict[str, Any]]:
+        """文内の訂正にテキスト全体でのオフセットを付与する"""
+        located = []
+        for correction in corrections:
+            original = str(correction.get("original") or "")
+            index = sentence.find(original) if original else -1
+            if index >= 0:
+                offset, length = start + index, len(original)
+            else:
+                # 該当箇所が見つからない場合は文全体を指す
+                offset, length = start, len(sentence)
+            located.append({**correction, "offset": offset, "length": length})
+        return located
+
+    async def _check_sentences(
+        self,
+        sentences: Dict[str, str]
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], Optional[str]]:
+        """
+        未チェックの文をできるだけ少ないプロンプトにまとめて並行にチェックする。
+        解析に失敗したグループがあれば、その応答テキストも返す。
+        """
+        packs = self._pack(sentences)
+        outcomes = await asyncio.gather(*(self._check_pack(pack) for pack in packs))
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        message = None
+        for checked, response_text in outcomes:
+            results.update(checked)
+            if not checked:
+                message = response_text
+        return results, message
+
+    def _keyed_sentences(self, text: str) -> List[Tuple[int, str, str]]:
+        """テキストを (開始位置, 文, キャッシュキー) のリストに分割する"""
+        return [
+            (start, sentence, self.sentence_key(sentence))
+            for start, sentence in self.split_sentences(text)
+        ]
+
+    def _lookup(
+        self,
+        sentences: List[Tuple[int, str, str]],
+        results: Dict[str, List[Dict[str, Any]]],
+        unseen: Dict[str, str]
+    ) -> None:
+        """キャッシュ済みの文は results に、未チェックの文は unseen に振り分ける"""
+        for _, sentence, key in sentences:
+            if key in results or key in unseen:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                unseen[key] = sentence
+
+    def _merge(
+        self,
+        text: str,
+        sentences: List[Tuple[int, str, str]],
+        results: Dict[str, List[Dict[str, Any]]],
+        unseen: Dict[str, str],
+        message: Optional[str]
+    ) -> Dict[str, Any]:
+        """文ごとの結果を元のテキストのオフセットで結合する"""
+        corrections = []
+        for start, sentence, key in sentences:
+            corrections.extend(self._locate(results.get(key, []), start, sentence))
+
+        result = {
+            "original_text": text,
+            "corrections": corrections,
+            "sentence_count": len(sentences),
+            "cached_sentence_count": sum(1 for _, _, key in sentences if key not in unseen)
+        }
+        if message is not None:
+            result["message"] = message
+        return result
+
+    async def check(self, text: str) -> Dict[str, Any]:
+        """テキストの文法をチェックし、キャッシュにない文だけをモデルに送る"""
+        sentences = self._keyed_sentences(text)
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        unseen: Dict[str, str] = {}
+        self._lookup(sentences, results, unseen)
+
+        message = None
+        if unseen:
+            checked, message = await self._check_sentences(unseen)
+            results.update(checked)
+
+        return self._merge(text, sentences, results, unseen, message)
+
+    async def check_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        複数のテキスト (ID, テキスト) をまとめてチェックする。
+        全テキストの未チェックの文をできるだけ少ないプロンプトに詰め込み、
+        結果が得られなかったテキストだけを個別にチェックし直す。
+        """
+        keyed_items = [(item_id, text, self._keyed_sentences(text)) for item_id, text in items]
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        unseen: Dict[str, str] = {}
+        for _, _, sentences in keyed_items:
+            self._lookup(sentences, results, unseen)
+
+        if unseen:
+            checked, _ = await self._check_sentences(unseen)
+            results.update(checked)
+
+        # まとめたプロンプトで結果が得られなかったテキストは個別にチェックする
+        async def fallback(sentences: List[Tuple[int, str, str]]) -> Optional[str]:
+            missing = {key: sentence for _, sentence, key in sentences if key not in results}
+            if not missing:
+                return None
+            self.fallback_calls += 1
+            checked, message = await self._check_sentences(missing)
+            results.update(checked)
+            return message
+
+        messages = await asyncio.gather(*(fallback(sentences) for _, _, sentences in keyed_items))
+
+        return [
+            {"id": item_id, **self._merge(text, sentences, results, unseen, message)}
+            for (item_id, text, sentences), message in zip(keyed_items, messages)
+        ]
+
+    def split_chunks(self, text: str) -> List[Tuple[int, str]]:
+        """
+        長文を段落・文の境界で (開始位置, チャンク) のリストに分割する。
+        チャンクは段落単位でまとめ、長すぎる段落だけを文単位で分ける。
+        """
+        # 段落 (開始位置, 終了位置) を求める
+        units: List[Tuple[int, int]] = []
+        position = 0
+        for paragraph_break in list(_PARAGRAPH_BREAK_PATTERN.finditer(text)) + [None]:
+            end = paragraph_break.start() if paragraph_break else len(text)
+            paragraph = text[position:end]
+            if paragraph.strip():
+                if len(paragraph) <= self.chunk_chars:
+                    units.append((position, end))
+                else:
+                    units.extend(
+                        (position + start, position + start + len(sentence))
+                        for start, sentence in self.split_sentences(paragraph)
+                    )
+            position = paragraph_break.end() if paragraph_break else len(text)
+
+        # 上限に収まる範囲で隣り合う段落・文をまとめる
+        chunks: List[Tuple[int, str]] = []
+        chunk_start = chunk_end = None
+        for start, end in units:
+            if chunk_start is not None and end - chunk_start > self.chunk_chars:
+                chunks.append((chunk_start, text[chunk_start:chunk_end]))
+                chunk_start = None
+            if chunk_start is None:
+                chunk_start = start
+            chunk_end = end
+        if chunk_start is not None:
+            chunks.append((chunk_start, text[chunk_start:chunk_end]))
+        return chunks
+
+    async def iter_document(self, text: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        長文をチャンクに分けて並行にチェックし、完了したチャンクから順に結果を返す。
+        訂正のオフセットは文書全体での位置に変換する。
+        """
+        chunks = self.split_chunks(text)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def check_chunk(index: int, start: int, chunk: str) -> Dict[str, Any]:
+            async with semaphore:
+                result = await self.check(chunk)
+            result["corrections"] = [
+                {**correction, "offset": correction["offset"] + start}
+                for correction in result["corrections"]
+            ]
+            return {"chunk_index": index, "chunk_offset": start, "chunk_length": len(chunk), **result}
+
+        tasks = [
+            asyncio.ensure_future(check_chunk(index, start, chunk))
+            for index, (start, chunk) in enumerate(chunks)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # クライアントの切断などで中断された場合は残りのチェックを止める
+            for task in tasks:
+                task.cancel()
+
+    async def check_document(self, text: str) -> Dict[str, Any]:
+        """長文をチャンクに分けて並行にチェックし、文書全体の結果にまとめる"""
+        chunk_results = [result async for result in self.iter_document(text)]
+        chunk_results.sort(key=lambda result: result["chunk_index"])
+
+        result = {
+            "original_text": text,
+            "corrections": [c for chunk in chunk_results for c in chunk["corrections"]],
+            "chunk_count": len(chunk_results),
+            "sentence_count": sum(chunk["sentence_count"] for chunk in chunk_results),
+            "cached_sentence_count": sum(chunk["cached_sentence_count"] for chunk in chunk_results)
+        }
+        messages = [chunk["message"] for chunk in chunk_results if "message" in chunk]
+        if messages:
+            result["message"] = messages[0]
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """文法チェックのメトリクスを取得する"""
+        return {
+            "model_calls": self.model_calls,
+            "fallback_calls": self.fallback_calls,
+            "max_prompt_chars": self.max_prompt_chars,
+            "chunk_chars": self.chunk_chars,
+            "max_concurrency": self.max_concurrency
+        }
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import time
+
+
+class IdempotencyKeyConflictError(Exception):
+    """同じ冪等キーが異なる内容のリクエストに使われたことを示す例外"""
+
+    def __init__(self, key: str):
+        super().__init__(f"Idempotency key '{key}' was already used for a different request")
+        self.key = key
+
+
+class _IdempotencyEntry:
+    """冪等キー1つ分の実行状態"""
+
+    def __init__(self, fingerprint: str, task: "asyncio.Task[Any]"):
+        self.fingerprint = fingerprint
+        self.task = task
+        # 成功して結果を保持している場合の有効期限（実行中はNone）
+        self.expires_at: Optional[float] = None
+
+
+class IdempotencyStore:
+    """
+    冪等キーごとに処理を1回だけ実行し、結果を一定期間保持するクラス。
+    実行中の重複リクエストは最初の実行の完了を待ち、完了後の重複リクエストには保持した結果を返す。
+    失敗した場合はキーを解放し、再試行で改めて実行できるようにする。
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_size: int = 10000):
+        """ストアの初期化"""
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, _IdempotencyEntry]" = OrderedDict()
+        # 成功した結果を完了順（=有効期限順）で保持し、期限切れや古いものを先頭から削除する
+        self._completed: "OrderedDict[str, _IdempotencyEntry]" = OrderedDict()
+
+        # メトリクス
+        self.executions = 0
+        self.joined = 0
+        self.replayed = 0
+        self.conflicts = 0
+        self.failures = 0
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        冪等キーに対応する処理を実行する
+
+        Args:
+            key: 冪等キー（呼び出し元でクライアントやエンドポイントごとに区別したもの）
+            fingerprint: リクエスト内容のハッシュ（同じキーで内容が異なる場合はエラーにする）
+            func: 実行する処理
+
+        Returns:
+            (処理結果, 保持していた結果・実行中の結果を再利用したかどうか)
+        """
+        self._purge_expired()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyKeyConflictError(key)
+            if entry.task.done():
+                self.replayed += 1
+            else:
+                self.joined += 1
+            return await asyncio.shield(entry.task), True
+
+        self.executions += 1
+        # クライアントが切断しても処理を続け、再試行されたリクエストで結果を受け取れるようにする
+        task = asyncio.ensure_future(func())
+        entry = _IdempotencyEntry(fingerprint, task)
+        self._entries[key] = entry
+        task.add_done_callback(lambda t: self._on_done(key, entry))
+        self._evict()
+
+        return await asyncio.shield(task), False
+
+    def _on_done(self, key: str, entry: _IdempotencyEntry) -> None:
+        """処理の完了時に、成功なら結果の有効期限を設定し、失敗ならキーを解放する"""
+        task = entry.task
+        if task.cancelled() or task.exception() is not None:
+            self.failures += 1
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            return
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        if self._entries.get(key) is entry:
+            self._completed[key] = entry
+            self._evict()
+
+    def _discard_oldest(self) -> None:
+        """最も古い完了済みの結果を削除する"""
+        key, entry = self._completed.popitem(last=False)
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _purge_expired(self) -> None:
+        """有効期限切れの結果を先頭（古いもの）から削除する"""
+        now = time.monotonic()
+        while self._completed:
+            entry = next(iter(self._completed.values()))
+            if entry.expires_at > now:
+                break
+            self._discard_oldest()
+
+    def _evict(self) -> None:
+        """最大件数を超えた分を古い完了済みの結果から削除する（実行中のものは残す）"""
+        while len(self._entries) > self.max_size and self._completed:
+            self._discard_oldest()
+
+    def stats(self) -> Dict[str, Any]:
+        """ストアのメトリクスを取得する"""
+        return {
+            "size": len(self._entries),
+            "in_flight": len(self._entries) - len(self._completed),
+            "ttl_seconds": self.ttl_seconds,
+            "executions": self.executions,
+            "joined": self.joined,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "failures": self.failures
+        }
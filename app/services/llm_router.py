@@ -0,0 +1,343 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import os
+import random
+import time
+
+from .gemini_service import GeminiService
+from .model_tiering import LIGHT_TIER, STANDARD_TIER
+from .resilience import CircuitOpenError, LLMUnavailableError, ResilienceManager, resilience
+from .concurrency_limiter import get_limiter
+
+
+class LLMProvider:
+    """LLMプロバイダの基底クラス"""
+
+    name = "base"
+
+    def __init__(self, model: str, tier: str = STANDARD_TIER):
+        """プロバイダの初期化"""
+        self.model = model
+        # このプロバイダが担当するモデルのティア（light / standard）
+        self.tier = tier
+
+    @property
+    def key(self) -> str:
+        """メトリクスなどで使うプロバイダ/モデルの識別子"""
+        return f"{self.name}/{self.model}"
+
+    async def generate(self, prompt: str, temperature: float = 0.5) -> str:
+        """プロンプトに対する応答を生成する"""
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """Geminiプロバイダ"""
+
+    name = "gemini"
+
+    def __init__(self, gemini_service: GeminiService, model: Optional[str] = None, tier: str = STANDARD_TIER):
+        """Geminiプロバイダの初期化"""
+        super().__init__(model or gemini_service.default_model, tier)
+        self.gemini_service = gemini_service
+
+    async def generate(self, prompt: str, temperature: float = 0.5) -> str:
+        """Geminiで応答を生成する"""
+        return await self.gemini_service.generate_completion(prompt, temperature, model_name=self.model)
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropicプロバイダ"""
+
+    name = "anthropic"
+
+    def __init__(
+        self,
+        model: str = "claude-3-haiku-20240307",
+        api_key: Optional[str] = None,
+        tier: str = STANDARD_TIER
+    ):
+        """Anthropicプロバイダの初期化"""
+        super().__init__(model, tier)
+        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        # 温度ごとのクライアント
+        self._clients: Dict[float, Any] = {}
+
+    def _get_client(self, temperature: float) -> Any:
+        """温度に対応するクライアントを取得する"""
+        if temperature not in self._clients:
+            from langchain_anthropic import ChatAnthropic
+            self._clients[temperature] = ChatAnthropic(
+                api_key=self.api_key,
+                model=self.model,
+                temperature=temperature,
+                max_tokens=1024
+            )
+        return self._clients[temperature]
+
+    async def generate(self, prompt: str, temperature: float = 0.5) -> str:
+        """Anthropicで応答を生成する"""
+        client = self._get_client(temperature)
+        response = await get_limiter("anthropic").run(lambda: client.ainvoke(prompt))
+        return response.content
+
+
+class FakeProvider(LLMProvider):
+    """オフラインでのテスト・検証用の疑似プロバイダ"""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        model: str = "fake-model",
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        response: str = "This is a fake response from {model}.",
+        tier: str = STANDARD_TIER
+    ):
+        """疑似プロバイダの初期化"""
+        super().__init__(model, tier)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.response = response
+        self.calls = 0
+
+    async def generate(self, prompt: str, temperature: float = 0.5) -> str:
+        """指定された遅延・失敗率で疑似的な応答を返す"""
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.failure_rate:
+            raise RuntimeError(f"Fake provider {self.key} failed")
+        return self.response.format(model=self.model, prompt=prompt)
+
+
+class ProviderStats:
+    """プロバイダごとの直近の遅延・エラー率の統計"""
+
+    def __init__(self, window: int = 100):
+        """統計の初期化"""
+        # (遅延秒, 成功したか) を直近 window 件だけ保持する
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, latency: float, ok: bool) -> None:
+        """1回の呼び出し結果を記録する"""
+        self.samples.append((latency, ok))
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """成功した呼び出しの遅延のパーセンタイルを返す（サンプルがなければNone）"""
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(percent / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    @property
+    def error_rate(self) -> float:
+        """直近の呼び出しのエラー率"""
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """統計を辞書に変換する"""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "window_size": len(self.samples),
+            "error_rate": self.error_rate,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95)
+        }
+
+
+class LLMRouter:
+    """遅延とエラー率に基づいてプロバイダを選択するルーター"""
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 95,
+        min_samples: int = 5,
+        max_error_rate: float = 0.5,
+        resilience_manager: Optional[ResilienceManager] = None
+    ):
+        """ルーターの初期化"""
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = providers
+        # 最初のリクエストがこのパーセンタイルの遅延を超えたら2つ目のリクエストを送る
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        # この件数に満たないプロバイダは優先的に試して統計を集める
+        self.min_samples = min_samples
+        # これを超えるエラー率のプロバイダは後回しにする
+        self.max_error_rate = max_error_rate
+        # プロバイダごとのリトライ・サーキットブレーカー
+        self.resilience = resilience_manager or resilience
+
+        self.stats_by_provider: Dict[str, ProviderStats] = {p.key: ProviderStats() for p in providers}
+        self.stats_by_tier: Dict[str, ProviderStats] = {LIGHT_TIER: ProviderStats(), STANDARD_TIER: ProviderStats()}
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+
+    def rank(self, tier: Optional[str] = None) -> List[LLMProvider]:
+        """
+        現在の統計から、試す順にプロバイダを並べる。
+        ティアが指定された場合はそのティアのプロバイダを優先し、残りを後ろに並べる。
+        """
+        def sort_key(provider: LLMProvider) -> Tuple[int, int, float]:
+            stats = self.stats_by_provider[provider.key]
+            unhealthy = 1 if stats.error_rate > self.max_error_rate else 0
+            warmed_up = 1 if len(stats.samples) >= self.min_samples else 0
+            p50 = stats.percentile(50)
+            return (unhealthy, warmed_up, p50 if p50 is not None else 0.0)
+
+        ranked = sorted(self.providers, key=sort_key)
+        if tier is None:
+            return ranked
+        return [p for p in ranked if p.tier == tier] + [p for p in ranked if p.tier != tier]
+
+    async def _call(self, provider: LLMProvider, prompt: str, temperature: float) -> str:
+        """プロバイダを呼び出し、遅延と成否を記録する"""
+        started_at = time.monotonic()
+        try:
+            result = await self.resilience.call(
+                provider.key,
+                lambda: provider.generate(prompt, temperature=temperature)
+            )
+        except (asyncio.CancelledError, LLMUnavailableError):
+            # ヘッジで負けた呼び出しのキャンセルや、回路・同時実行数の制限で呼ばなかった場合はエラーとして数えない
+            raise
+        except Exception:
+            self.stats_by_provider[provider.key].record(time.monotonic() - started_at, False)
+            raise
+        self.stats_by_provider[provider.key].record(time.monotonic() - started_at, True)
+        return result
+
+    async def _hedged_call(
+        self,
+        primary: LLMProvider,
+        secondary: LLMProvider,
+        prompt: str,
+        temperature: float,
+        hedge_delay: float
+    ) -> str:
+        """
+        主プロバイダの応答が hedge_delay 秒を超えた場合に副プロバイダにも同じリクエストを送り、
+        先に成功した方の結果を返す
+        """
+        primary_task = asyncio.ensure_future(self._call(primary, prompt, temperature))
+        pending = {primary_task}
+
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            if primary_task in done and primary_task.exception() is None:
+                return primary_task.result()
+
+            # 主プロバイダが遅い、または失敗した場合は副プロバイダにも送る
+            self.hedged_requests += 1
+            secondary_task = asyncio.ensure_future(self._call(secondary, prompt, temperature))
+            pending = {task for task in (primary_task, secondary_task) if not task.done()}
+            error: Optional[BaseException] = primary_task.exception() if primary_task.done() else None
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary_task:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (primary_task, *pending):
+                if not task.done():
+                    task.cancel()
+
+    async def generate(self, prompt: str, temperature: float = 0.5, tier: Optional[str] = None) -> str:
+        """最も速く健全なプロバイダで応答を生成する（失敗時は次のプロバイダを試す）"""
+        started_at = time.monotonic()
+        try:
+            result = await self._generate(prompt, temperature, tier)
+        except Exception:
+            self.stats_by_tier[tier or STANDARD_TIER].record(time.monotonic() - started_at, False)
+            raise
+        self.stats_by_tier[tier or STANDARD_TIER].record(time.monotonic() - started_at, True)
+        return result
+
+    async def _generate(self, prompt: str, temperature: float, tier: Optional[str]) -> str:
+        """ランキング順にプロバイダを呼び出す（必要に応じてヘッジする）"""
+        ranked = self.rank(tier)
+        last_error: Optional[Exception] = None
+
+        # サーキットブレーカーが開いているプロバイダは呼ばずに飛ばす
+        available = [p for p in ranked if not self.resilience.breaker(p.key).is_open()]
+        if not available:
+            retry_after = min(self.resilience.breaker(p.key).retry_after() for p in ranked)
+            raise CircuitOpenError("llm_router", retry_after)
+        ranked = available
+
+        # 主プロバイダの遅延の統計がある場合のみヘッジする
+        hedge_delay = self.stats_by_provider[ranked[0].key].percentile(self.hedge_percentile)
+        if self.hedge_enabled and len(ranked) >= 2 and hedge_delay is not None:
+            try:
+                return await self._hedged_call(ranked[0], ranked[1], prompt, temperature, hedge_delay)
+            except Exception as e:
+                print(f"Hedged LLM request failed: {e}")
+                last_error = e
+            ranked = ranked[2:]
+
+        for provider in ranked:
+            try:
+                return await self._call(provider, prompt, temperature)
+            except Exception as e:
+                print(f"LLM provider {provider.key} failed: {e}")
+                last_error = e
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        """ルーターのメトリクスを取得する"""
+        return {
+            "providers": {key: stats.to_dict() for key, stats in self.stats_by_provider.items()},
+            "tiers": {tier: stats.to_dict() for tier, stats in self.stats_by_tier.items()},
+            "ranking": [provider.key for provider in self.rank()],
+            "hedge_enabled": self.hedge_enabled,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins
+        }
+
+
+def create_providers(names: List[str], gemini_service: GeminiService) -> List[LLMProvider]:
+    """
+    プロバイダ名のリストからプロバイダを作成する。
+    軽量モデルが設定されているプロバイダは、標準モデルと軽量モデルの2つを作成する。
+    """
+    providers: List[LLMProvider] = []
+    for name in names:
+        if name == "gemini":
+            providers.append(GeminiProvider(gemini_service, os.environ.get("GEMINI_TUTOR_MODEL")))
+            light_model = os.environ.get("GEMINI_LIGHT_MODEL", "models/gemini-2.0-flash-lite")
+            # 利用できない軽量モデルは登録しない
+            if light_model and light_model in gemini_service.available_models:
+                providers.append(GeminiProvider(gemini_service, light_model, tier=LIGHT_TIER))
+        elif name == "anthropic":
+            providers.append(AnthropicProvider(os.environ.get("ANTHROPIC_TUTOR_MODEL", "claude-3-haiku-20240307")))
+            light_model = os.environ.get("ANTHROPIC_LIGHT_MODEL")
+            if light_model:
+                providers.append(AnthropicProvider(light_model, tier=LIGHT_TIER))
+        elif name == "fake":
+            latency = float(os.environ.get("FAKE_LLM_LATENCY", "0.05"))
+            providers.append(FakeProvider(latency=latency))
+            providers.append(FakeProvider("fake-light-model", latency=latency / 2, tier=LIGHT_TIER))
+        else:
+            raise ValueError(f"Unknown LLM provider: {name}")
+    return providers
@@ -0,0 +1,56 @@
+from typing import Any, Dict, Iterable
+
+from ..models.chat import ChatSession
+
+LIGHT_TIER = "light"
+STANDARD_TIER = "standard"
+
+
+class ModelTieringPolicy:
+    """会話ターンの複雑さに応じて、軽量モデルと標準モデルを振り分けるポリシー"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        light_max_chars: int = 120,
+        light_max_history: int = 8,
+        light_levels: Iterable[str] = ("beginner", "intermediate"),
+        standard_focuses: Iterable[str] = ("grammar",)
+    ):
+        """ポリシーの初期化"""
+        self.enabled = enabled
+        # この文字数以下のメッセージは軽量モデルで十分とみなす
+        self.light_max_chars = light_max_chars
+        # この件数以下の履歴であれば軽量モデルで十分とみなす
+        self.light_max_history = light_max_history
+        # 軽量モデルを使ってよいレベル
+        self.light_levels = set(light_levels)
+        # 詳しい説明が必要なため常に標準モデルを使うフォーカス
+        self.standard_focuses = set(standard_focuses)
+
+        self.counts: Dict[str, int] = {LIGHT_TIER: 0, STANDARD_TIER: 0}
+
+    def classify(self, session: ChatSession, user_message: str) -> str:
+        """ターンを軽量（light）か標準（standard）のどちらのティアで処理するか判定する"""
+        tier = STANDARD_TIER
+        if self.enabled and (
+            session.level in self.light_levels
+            and session.focus not in self.standard_focuses
+            and len(user_message) <= self.light_max_chars
+            and len(session.messages) <= self.light_max_history
+        ):
+            tier = LIGHT_TIER
+
+        self.counts[tier] += 1
+        return tier
+
+    def stats(self) -> Dict[str, Any]:
+        """ポリシーの設定と振り分け件数を取得する"""
+        return {
+            "enabled": self.enabled,
+            "light_max_chars": self.light_max_chars,
+            "light_max_history": self.light_max_history,
+            "light_levels": sorted(self.light_levels),
+            "standard_focuses": sorted(self.standard_focuses),
+            "counts": dict(self.counts)
+        }
@@ -0,0 +1,91 @@
+from typing import Any, Optional
+import asyncio
+import json
+import os
+import threading
+
+
+class PeriodicFlushMixin:
+    """
+    永続ストレージへの保存を書き込みのたびには行わず、flush（定期的な保存・終了時）でまとめて行うための共通処理。
+    利用するクラスは storage_path と _lock を持ち、__init__ で _init_flush() を呼び、
+    データを変更したら _lock を取得した状態で _dirty を True にし、保存する内容を返す _serialize() を実装する。
+    """
+
+    # 保存に失敗したときのメッセージに使う名前
+    storage_label = "cache"
+
+    storage_path: Optional[str]
+    _lock: threading.Lock
+
+    def _init_flush(self) -> None:
+        """保存の状態を初期化する"""
+        # 保存していない変更があるかどうかと、保存を1つずつ行うためのロック
+        self._dirty = False
+        self._flush_lock = threading.Lock()
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        self.flushes = 0
+
+    def _serialize(self) -> Any:
+        """保存する内容（JSONに変換できる値）を作成する（_lock を取得した状態で呼ばれる）"""
+        raise NotImplementedError
+
+    def _snapshot(self) -> Optional[Any]:
+        """保存していない変更があれば、保存する内容をコピーして取得する"""
+        with self._lock:
+            if not self._dirty:
+                return None
+            self._dirty = False
+            return self._serialize()
+
+    def flush(self) -> None:
+        """保存していない変更を永続ストレージに保存する（ファイルの書き込みはロックの外で行う）"""
+        if not self.storage_path:
+            return
+
+        with self._flush_lock:
+            data = self._snapshot()
+            if data is None:
+                return
+
+            try:
+                directory = os.path.dirname(self.storage_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+                # 書き込み途中のファイルを読まないように一時ファイル経由で置き換える
+                tmp_path = f"{self.storage_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.storage_path)
+                self.flushes += 1
+            except Exception as e:
+                # 次回の保存で再試行する
+                with self._lock:
+                    self._dirty = True
+                print(f"Error saving {self.storage_label}: {e}")
+
+    async def aflush(self) -> None:
+        """イベントループを塞がないよう、別スレッドで flush を行う"""
+        if self.storage_path and self._dirty:
+            await asyncio.to_thread(self.flush)
+
+    def start_flush(self, interval: float) -> None:
+        """一定間隔で保存するバックグラウンドタスクを開始する"""
+        if not self.storage_path:
+            return
+
+        async def flush_loop() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                await self.aflush()
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(flush_loop())
+
+    async def stop_flush(self) -> None:
+        """定期的な保存を停止し、残っている変更を保存する"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.aflush()
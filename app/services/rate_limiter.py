@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import time
+
+
+class RateLimitStore:
+    """
+    トークンバケットの状態を保持するストアの基底クラス。
+    複数ワーカーで動かす場合は、同じインターフェースで共有ストア（Redisなど）を実装して差し替える。
+    """
+
+    async def consume(
+        self,
+        key: str,
+        capacity: float,
+        refill_rate: float,
+        cost: float = 1.0
+    ) -> Tuple[bool, float, float]:
+        """
+        バケットからトークンを消費する
+
+        Args:
+            key: バケットのキー
+            capacity: バケットの容量（バースト可能なリクエスト数）
+            refill_rate: 1秒あたりに補充されるトークン数
+            cost: 消費するトークン数
+
+        Returns:
+            (許可されたか, 再試行まで待つべき秒数, 残りのトークン数)
+        """
+        raise NotImplementedError
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """プロセス内でトークンバケットを保持するストア"""
+
+    def __init__(self, max_keys: int = 100000):
+        """ストアの初期化"""
+        # キー -> (トークン数, 最終更新時刻)。最近使われていないキーから捨てる
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.max_keys = max_keys
+
+    async def consume(
+        self,
+        key: str,
+        capacity: float,
+        refill_rate: float,
+        cost: float = 1.0
+    ) -> Tuple[bool, float, float]:
+        """バケットからトークンを消費する"""
+        # 途中でawaitしないため、イベントループ上では排他制御なしで一貫性が保たれる
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+            retry_after = 0.0
+        else:
+            retry_after = (cost - tokens) / refill_rate if refill_rate > 0 else float("inf")
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return allowed, retry_after, tokens
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """エンドポイントの種類（スコープ）ごとの予算でリクエストを制限するクラス"""
+
+    def __init__(self, store: RateLimitStore, budgets: Dict[str, Tuple[float, float]]):
+        """
+        レートリミッターの初期化
+
+        Args:
+            store: トークンバケットのストア
+            budgets: スコープ -> (期間内のリクエスト数, 期間の秒数)
+        """
+        self.store = store
+        self.budgets = budgets
+        self.allowed: Dict[str, int] = {scope: 0 for scope in budgets}
+        self.limited: Dict[str, int] = {scope: 0 for scope in budgets}
+
+    @staticmethod
+    def parse_budget(value: str) -> Tuple[float, float]:
+        """'30/60'（60秒に30回）形式の文字列を (回数, 秒数) に変換する"""
+        requests, _, seconds = value.partition("/")
+        return float(requests), float(seconds or 60)
+
+    async def check(self, scope: str, identity: str, cost: float = 1.0) -> Tuple[bool, float, Optional[float]]:
+        """
+        リクエストを許可するかどうかを判定する
+
+        Returns:
+            (許可されたか, 再試行まで待つべき秒数, スコープの上限回数)
+        """
+        budget = self.budgets.get(scope)
+        if budget is None:
+            return True, 0.0, None
+
+        requests, seconds = budget
+        allowed, retry_after, _ = await self.store.consume(
+            f"{scope}:{identity}", capacity=requests, refill_rate=requests / seconds, cost=cost
+        )
+        if allowed:
+            self.allowed[scope] += 1
+        else:
+            self.limited[scope] += 1
+        return allowed, retry_after, requests
+
+    def stats(self) -> Dict[str, Any]:
+        """スコープごとの予算と許可・制限の件数を取得する"""
+        return {
+            scope: {
+                "requests": requests,
+                "per_seconds": seconds,
+                "allowed": self.allowed[scope],
+                "limited": self.limited[scope]
+            }
+            for scope, (requests, seconds) in self.budgets.items()
+        }
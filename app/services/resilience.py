@@ -0,0 +1,263 @@
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+import asyncio
+import os
+import random
+import threading
+import time
+
+T = TypeVar("T")
+
+# 一時的な障害とみなす例外クラス名（google.api_core / anthropic / httpx などの例外を名前で判定する）
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "TooManyRequests",
+    "Unavailable",
+    "Aborted",
+    "RateLimitError",
+    "APIConnectionError",
+    "APITimeoutError",
+    "OverloadedError",
+    "ConnectError",
+    "ReadTimeout",
+    "TimeoutException",
+}
+
+# 一時的な障害とみなすHTTPステータスコード
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """例外がリトライすべき一時的な障害かどうかを判定する"""
+    if isinstance(error, LLMUnavailableError):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status_code, int) and status_code in RETRYABLE_STATUS_CODES
+
+
+class LLMUnavailableError(Exception):
+    """LLMプロバイダを呼び出せない状態（呼び出しを行わずに失敗させた）ことを示す例外"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """サーキットブレーカーが開いているため呼び出しを行わなかったことを示す例外"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker '{name}' is open", retry_after)
+        self.name = name
+
+
+class CircuitBreaker:
+    """プロバイダごとのサーキットブレーカー"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """サーキットブレーカーの初期化"""
+        self.name = name
+        # 連続でこの回数失敗したら回路を開く（リトライを含めた呼び出し単位で数える）
+        self.failure_threshold = failure_threshold
+        # 回路を開いてからこの秒数が経過したら試験的な呼び出しを許可する
+        self.recovery_timeout = recovery_timeout
+        # 半開状態で同時に許可する試験的な呼び出しの数
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """回路が再び試験的な呼び出しを許可するまでの秒数"""
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def is_open(self) -> bool:
+        """呼び出しを即座に拒否する状態かどうか（状態は変更しない）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return self.retry_after() > 0
+            if self.state == self.HALF_OPEN:
+                return self.half_open_calls >= self.half_open_max_calls
+            return False
+
+    def before_call(self) -> None:
+        """呼び出し前に状態を確認し、開いている場合は CircuitOpenError を送出する"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.retry_after() > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.retry_after())
+                # 回復待ちの時間が過ぎたので半開状態に移行する
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.recovery_timeout)
+                self.half_open_calls += 1
+
+    def record_success(self) -> None:
+        """呼び出しの成功を記録する"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.half_open_calls = 0
+
+    def record_failure(self) -> None:
+        """呼び出しの失敗を記録する"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.half_open_calls = 0
+
+    def release(self) -> None:
+        """成否が判定できない終了（キャンセル・一時的でないエラー）で半開状態の枠を返す"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """サーキットブレーカーの状態を取得する"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state == self.OPEN else 0.0
+        }
+
+
+class RetryPolicy:
+    """ジッター付き指数バックオフのリトライポリシー"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0):
+        """リトライポリシーの初期化"""
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    def delay(self, attempt: int) -> float:
+        """attempt回目（0始まり）の失敗後に待つ秒数（フルジッター）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class ResilienceManager:
+    """リトライとサーキットブレーカーをまとめて適用するクラス"""
+
+    def __init__(
+        self,
+        retry_policy: RetryPolicy,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0
+    ):
+        """初期化"""
+        self.retry_policy = retry_policy
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """名前（プロバイダ/モデル）に対応するサーキットブレーカーを取得する"""
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(name, self.failure_threshold, self.recovery_timeout)
+        return self.breakers[name]
+
+    async def call(self, name: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        サーキットブレーカーを通して関数を呼び出し、一時的な障害はリトライする。
+        ブレーカーには論理的な呼び出し1回につき1回だけ（リトライを使い切った後に）結果を記録する
+        """
+        breaker = self.breaker(name)
+        breaker.before_call()
+        attempt = 0
+        while True:
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    breaker.release()
+                    raise
+                attempt += 1
+                # 他の呼び出しの失敗で回路が開いた場合もリトライをやめる
+                if attempt >= self.retry_policy.max_attempts or breaker.state == CircuitBreaker.OPEN:
+                    breaker.record_failure()
+                    raise
+            else:
+                breaker.record_success()
+                return result
+
+            self.retry_policy.retries += 1
+            try:
+                await asyncio.sleep(self.retry_policy.delay(attempt - 1))
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+
+    def call_sync(self, name: str, func: Callable[[], T]) -> T:
+        """同期関数版の call"""
+        breaker = self.breaker(name)
+        breaker.before_call()
+        attempt = 0
+        while True:
+            try:
+                result = func()
+            except Exception as e:
+                if not is_retryable(e):
+                    breaker.release()
+                    raise
+                attempt += 1
+                if attempt >= self.retry_policy.max_attempts or breaker.state == CircuitBreaker.OPEN:
+                    breaker.record_failure()
+                    raise
+                self.retry_policy.retries += 1
+                time.sleep(self.retry_policy.delay(attempt - 1))
+                continue
+            breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """リトライ回数と各サーキットブレーカーの状態を取得する"""
+        return {
+            "retries": self.retry_policy.retries,
+            "max_attempts": self.retry_policy.max_attempts,
+            "circuit_breakers": {name: breaker.stats() for name, breaker in self.breakers.items()}
+        }
+
+
+# アプリ全体で共有するインスタンス（同じプロバイダ/モデルのブレーカーを共有する）
+resilience = ResilienceManager(
+    RetryPolicy(
+        max_attempts=int(os.environ.get("LLM_RETRY_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.environ.get("LLM_RETRY_BASE_DELAY", "0.2")),
+        max_delay=float(os.environ.get("LLM_RETRY_MAX_DELAY", "2.0"))
+    ),
+    failure_threshold=int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5")),
+    recovery_timeout=float(os.environ.get("CIRCUIT_RECOVERY_TIMEOUT", "30"))
+)
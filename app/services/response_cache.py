@@ -0,0 +1,162 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+import re
+import threading
+import time
+
+from .periodic_flush import PeriodicFlushMixin
+
+
+class ResponseCache(PeriodicFlushMixin):
+    """
+    TTL付きLRUレスポンスキャッシュ。
+    永続ストレージへの保存は書き込みのたびには行わず、flush（定期的な保存・終了時）でまとめて行う。
+    """
+
+    storage_label = "response cache"
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl_seconds: float = 3600,
+        storage_path: Optional[str] = None
+    ):
+        """キャッシュの初期化"""
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.storage_path = storage_path
+
+        # キー -> (有効期限のUNIX時刻, 値) を挿入順（=LRU順）で保持
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._init_flush()
+
+        # メトリクス
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        # 永続ストレージが指定されている場合は読み込む
+        if self.storage_path and os.path.exists(self.storage_path):
+            self._load()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """パラメータを正規化してキャッシュキーを作成する"""
+        normalized = []
+        for part in parts:
+            text = "" if part is None else str(part)
+            normalized.append(re.sub(r"\s+", " ", text).strip().lower())
+        return "|".join(normalized)
+
+    def _load(self) -> None:
+        """永続ストレージからキャッシュを読み込む"""
+        try:
+            with open(self.storage_path, 'r') as f:
+                entries = json.load(f)
+
+            now = time.time()
+            for key, entry in entries.items():
+                if entry["expires_at"] > now:
+                    self._entries[key] = (entry["expires_at"], entry["value"])
+
+            # 読み込んだ結果がサイズ上限を超える場合は古いものから捨てる
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            print(f"Error loading response cache: {e}")
+
+    def _serialize(self) -> Dict[str, Any]:
+        """保存する内容を作成する"""
+        return {
+            key: {"expires_at": expires_at, "value": value}
+            for key, (expires_at, value) in self._entries.items()
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """キャッシュから値を取得する（見つからない・期限切れの場合はNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            # 最近使われたものとして末尾に移動
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """キャッシュに値を保存する"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+
+            # サイズ上限を超えた場合は最も古いエントリを削除
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            self._dirty = True
+
+    def set_many(self, items: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """複数の値をまとめてキャッシュに保存する（永続化は1回だけ行う）"""
+        if not items:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            expires_at = time.time() + ttl
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            self._dirty = True
+
+    def delete(self, key: str) -> None:
+        """キャッシュから値を削除する（元データの更新時など）"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+                self._dirty = True
+
+    def clear(self) -> None:
+        """キャッシュをすべて削除する"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュのメトリクスを取得する"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "persistent": bool(self.storage_path),
+            "unsaved_changes": self._dirty,
+            "flushes": self.flushes
+        }
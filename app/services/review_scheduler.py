@@ -0,0 +1,279 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import os
+
+import aiosqlite
+
+from ..models.models import ReviewCard
+
+# SM-2の易しさ係数の初期値と下限
+DEFAULT_EASE_FACTOR = 2.5
+MIN_EASE_FACTOR = 1.3
+# この値以上の結果を「思い出せた」とみなす
+PASSING_QUALITY = 3
+
+_CARD_COLUMNS = "word_id, ease_factor, interval_days, repetitions, lapses, due_at, last_reviewed_at"
+
+
+def schedule_next(card: ReviewCard, quality: int, now: datetime) -> ReviewCard:
+    """
+    SM-2で復習結果から次の復習日時を計算する
+
+    Args:
+        card: 現在のスケジュール
+        quality: 思い出せた度合い（0〜5）
+        now: 復習した日時
+
+    Returns:
+        更新したスケジュール
+    """
+    if quality >= PASSING_QUALITY:
+        if card.repetitions == 0:
+            interval = 1
+        elif card.repetitions == 1:
+            interval = 6
+        else:
+            interval = round(card.interval_days * card.ease_factor)
+        repetitions = card.repetitions + 1
+        lapses = card.lapses
+    else:
+        # 思い出せなかった場合は最初からやり直す
+        interval = 1
+        repetitions = 0
+        lapses = card.lapses + 1
+
+    ease_factor = card.ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return card.copy(update={
+        "ease_factor": max(MIN_EASE_FACTOR, ease_factor),
+        "interval_days": interval,
+        "repetitions": repetitions,
+        "lapses": lapses,
+        "due_at": now + timedelta(days=interval),
+        "last_reviewed_at": now
+    })
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    """日時をUNIX時刻に変換する（タイムゾーンのない日時はUTCとみなす）"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_timestamp(value: Optional[float]) -> Optional[datetime]:
+    """UNIX時刻をUTCの日時に変換する"""
+    return None if value is None else datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+class ReviewScheduler:
+    """
+    ユーザーごとの単語の復習スケジュールをSQLiteで管理するクラス。
+    (ユーザーID, 次の復習日時) のインデックスを優先度キューとして使い、復習対象の取得や
+    復習結果の記録は全件を調べずに済むようにする。複数のワーカーから同じファイルを共有できる。
+    """
+
+    def __init__(self, storage_path: Optional[str] = None, busy_timeout: float = 5.0):
+        """
+        スケジューラーの初期化（接続は最初の利用時に作成する）
+
+        Args:
+            storage_path: SQLiteファイルのパス（Noneの場合はメモリ上のみで保持する）
+            busy_timeout: 他のワーカーが書き込み中の場合に待つ秒数
+        """
+        self.storage_path = storage_path
+        self.busy_timeout = busy_timeout
+
+        self._db: Optional[aiosqlite.Connection] = None
+        # 接続の作成と、読み込みから更新までのトランザクションを1つずつ行うためのロック（実行中のループで作成する）
+        self._lock: Optional[asyncio.Lock] = None
+
+        # メトリクス
+        self.enrolled = 0
+        self.reviews = 0
+        self.removed = 0
+        self.due_queries = 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        """ロックを取得する（なければ実行中のイベントループで作成する）"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """SQLiteに接続し、テーブルとインデックスを作成する"""
+        if self._db is not None:
+            return self._db
+
+        async with self._get_lock():
+            if self._db is None:
+                path = self.storage_path or ":memory:"
+                if self.storage_path:
+                    os.makedirs(os.path.dirname(self.storage_path) or ".", exist_ok=True)
+                db = await aiosqlite.connect(path, timeout=self.busy_timeout)
+                # 複数のワーカーからの読み込みが書き込みを待たないようにする
+                await db.execute("PRAGMA journal_mode=WAL")
+                await db.execute(
+                    "CREATE TABLE IF NOT EXISTS review_cards ("
+                    " user_id TEXT NOT NULL,"
+                    " word_id INTEGER NOT NULL,"
+                    " ease_factor REAL NOT NULL,"
+                    " interval_days INTEGER NOT NULL,"
+                    " repetitions INTEGER NOT NULL,"
+                    " lapses INTEGER NOT NULL,"
+                    " due_at REAL NOT NULL,"
+                    " last_reviewed_at REAL,"
+                    " PRIMARY KEY (user_id, word_id))"
+                )
+                await db.execute(
+                    "CREATE INDEX IF NOT EXISTS review_cards_due ON review_cards (user_id, due_at, word_id)"
+                )
+                await db.commit()
+                self._db = db
+        return self._db
+
+    @staticmethod
+    def _row_to_card(row: Any) -> ReviewCard:
+        """テーブルの行をスケジュールに変換する"""
+        word_id, ease_factor, interval_days, repetitions, lapses, due_at, last_reviewed_at = row
+        return ReviewCard(
+            word_id=word_id,
+            ease_factor=ease_factor,
+            interval_days=interval_days,
+            repetitions=repetitions,
+            lapses=lapses,
+            due_at=_from_timestamp(due_at),
+            last_reviewed_at=_from_timestamp(last_reviewed_at)
+        )
+
+    async def get(self, user_id: str, word_id: int) -> Optional[ReviewCard]:
+        """単語のスケジュールを取得する（復習対象でない場合はNone）"""
+        db = await self._connect()
+        async with db.execute(
+            f"SELECT {_CARD_COLUMNS} FROM review_cards WHERE user_id = ? AND word_id = ?",
+            (user_id, word_id)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return self._row_to_card(row) if row else None
+
+    async def enroll(self, user_id: str, word_ids: Iterable[int], now: Optional[datetime] = None) -> int:
+        """
+        単語を復習対象に追加する（すぐに復習対象になる）
+
+        Returns:
+            追加した単語数（既に復習対象の単語は変更しない）
+        """
+        due_at = _to_timestamp(now or datetime.now(timezone.utc))
+        rows = [
+            (user_id, word_id, DEFAULT_EASE_FACTOR, 0, 0, 0, due_at)
+            for word_id in dict.fromkeys(word_ids)
+        ]
+        if not rows:
+            return 0
+
+        db = await self._connect()
+        async with self._get_lock():
+            cursor = await db.executemany(
+                "INSERT OR IGNORE INTO review_cards"
+                " (user_id, word_id, ease_factor, interval_days, repetitions, lapses, due_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            await db.commit()
+        added = max(cursor.rowcount, 0)
+        self.enrolled += added
+        return added
+
+    async def record_review(
+        self,
+        user_id: str,
+        word_id: int,
+        quality: int,
+        now: Optional[datetime] = None
+    ) -> Optional[ReviewCard]:
+        """
+        復習結果を記録して次の復習日時を決める
+
+        Returns:
+            更新したスケジュール（復習対象でない場合はNone）
+        """
+        db = await self._connect()
+        async with self._get_lock():
+            # 他のワーカーの記録と読み込み・更新が入り混じらないよう、書き込みロックを取ってから読む
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                async with db.execute(
+                    f"SELECT {_CARD_COLUMNS} FROM review_cards WHERE user_id = ? AND word_id = ?",
+                    (user_id, word_id)
+                ) as cursor:
+                    row = await cursor.fetchone()
+                if row is None:
+                    await db.rollback()
+                    return None
+
+                card = schedule_next(self._row_to_card(row), quality, now or datetime.now(timezone.utc))
+                await db.execute(
+                    "UPDATE review_cards SET ease_factor = ?, interval_days = ?, repetitions = ?, lapses = ?,"
+                    " due_at = ?, last_reviewed_at = ? WHERE user_id = ? AND word_id = ?",
+                    (
+                        card.ease_factor, card.interval_days, card.repetitions, card.lapses,
+                        _to_timestamp(card.due_at), _to_timestamp(card.last_reviewed_at), user_id, word_id
+                    )
+                )
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+        self.reviews += 1
+        return card
+
+    async def remove(self, user_id: str, word_ids: Iterable[int]) -> int:
+        """単語を復習対象から外し、外した単語数を返す"""
+        rows = [(user_id, word_id) for word_id in dict.fromkeys(word_ids)]
+        if not rows:
+            return 0
+
+        db = await self._connect()
+        async with self._get_lock():
+            cursor = await db.executemany(
+                "DELETE FROM review_cards WHERE user_id = ? AND word_id = ?",
+                rows
+            )
+            await db.commit()
+        removed = max(cursor.rowcount, 0)
+        self.removed += removed
+        return removed
+
+    async def due(self, user_id: str, limit: int, now: Optional[datetime] = None) -> List[ReviewCard]:
+        """
+        復習日時を過ぎた単語を復習日時の早い順に最大 limit 件取得する
+
+        (ユーザーID, 次の復習日時) のインデックスを先頭から読むため、復習対象の単語数ではなく件数に比例した時間で済む
+        """
+        self.due_queries += 1
+        db = await self._connect()
+        async with db.execute(
+            f"SELECT {_CARD_COLUMNS} FROM review_cards"
+            " WHERE user_id = ? AND due_at <= ? ORDER BY due_at, word_id LIMIT ?",
+            (user_id, _to_timestamp(now or datetime.now(timezone.utc)), limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [self._row_to_card(row) for row in rows]
+
+    async def close(self) -> None:
+        """SQLiteへの接続を閉じる"""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        """スケジューラーのメトリクスを取得する（このプロセスでの処理数）"""
+        return {
+            "enrolled": self.enrolled,
+            "reviews": self.reviews,
+            "removed": self.removed,
+            "due_queries": self.due_queries,
+            "persistent": bool(self.storage_path)
+        }
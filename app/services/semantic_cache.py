@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import uuid
+
+from .periodic_flush import PeriodicFlushMixin
+
+# 似たメッセージとみなす類似度の下限。これより低いと "I go ..." と "I went ..." のように
+# 訂正すべき点が異なるメッセージを同じとみなしてしまう
+MIN_THRESHOLD = 0.97
+
+
+class SemanticResponseCache(PeriodicFlushMixin):
+    """
+    会話の書き出しへの応答を再利用するためのローカルキャッシュ。
+    正規化したメッセージが同じ場合に再利用し、短い定型的なメッセージに限って
+    ほぼ同じ（類似度が threshold 以上の）メッセージも同じとみなす。
+    """
+
+    storage_label = "semantic cache"
+
+    def __init__(
+        self,
+        threshold: float = MIN_THRESHOLD,
+        max_variants: int = 3,
+        max_entries: int = 1000,
+        storage_path: Optional[str] = None,
+        max_fuzzy_words: int = 3
+    ):
+        """セマンティックキャッシュの初期化"""
+        # この類似度以上の短いメッセージを同じ質問とみなす（MIN_THRESHOLD 未満は指定できない）
+        self.threshold = max(threshold, MIN_THRESHOLD)
+        # 類似度で一致させるメッセージの最大単語数（これより長いメッセージは完全一致のみ）
+        self.max_fuzzy_words = max_fuzzy_words
+        # 1つのメッセージに対して保持する応答のバリエーション数
+        self.max_variants = max_variants
+        self.max_entries = max_entries
+        self.storage_path = storage_path
+
+        # エントリID -> エントリ（挿入順で保持し、古いものから捨てる）
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (パーティション, 特徴量) -> エントリIDの集合（転置インデックス）
+        self._index: Dict[Tuple[str, str], Set[str]] = {}
+        self._lock = threading.Lock()
+        self._init_flush()
+
+        # メトリクス
+        self.hits = 0
+        self.near_duplicate_hits = 0
+        self.misses = 0
+
+        if self.storage_path and os.path.exists(self.storage_path):
+            self._load()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """比較用にメッセージを正規化する（小文字化・記号除去・空白の統一）"""
+        text = re.sub(r"[^\w\s']", " ", text.lower())
+        return re.sub(r"\s+", " ", text).strip()
+
+    @staticmethod
+    def _vectorize(normalized: str) -> Dict[str, float]:
+        """単語と文字トライグラムの出現頻度から正規化済みベクトルを作成する"""
+        features: Dict[str, float] = {}
+        for word in normalized.split():
+            features[f"w:{word}"] = features.get(f"w:{word}", 0.0) + 1.0
+        padded = f" {normalized} "
+        for i in range(len(padded) - 2):
+            gram = f"c:{padded[i:i + 3]}"
+            features[gram] = features.get(gram, 0.0) + 1.0
+
+        norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+        return {k: v / norm for k, v in features.items()}
+
+    @staticmethod
+    def partition_key(level: str, focus: str, history: Sequence[Tuple[str, str]] = ()) -> str:
+        """レベル・フォーカス・直前の会話履歴からパーティションキーを作成する"""
+        history_text = "\n".join(
+            f"{role}:{SemanticResponseCache.normalize(content)}" for role, content in history
+        )
+        history_digest = hashlib.sha256(history_text.encode("utf-8")).hexdigest()[:16]
+        return f"{level}|{focus}|{history_digest}"
+
+    def _add_to_index(self, entry_id: str, entry: Dict[str, Any]) -> None:
+        """エントリを転置インデックスに登録する"""
+        for feature in entry["vector"]:
+            self._index.setdefault((entry["partition"], feature), set()).add(entry_id)
+
+    def _remove_from_index(self, entry_id: str, entry: Dict[str, Any]) -> None:
+        """エントリを転置インデックスから外す"""
+        for feature in entry["vector"]:
+            key = (entry["partition"], feature)
+            ids = self._index.get(key)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._index[key]
+
+    def _find(self, partition: str, normalized: str, vector: Dict[str, float]) -> Optional[str]:
+        """
+        パーティション内で同じとみなせるエントリを探す。
+        同じテキストのエントリを優先し、なければ短いメッセージ同士に限って最も類似度が高いものを返す。
+        """
+        candidates: Set[str] = set()
+        for feature in vector:
+            candidates |= self._index.get((partition, feature), set())
+
+        fuzzy = len(normalized.split()) <= self.max_fuzzy_words
+        best_id, best_score = None, 0.0
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if entry["text"] == normalized:
+                return entry_id
+            if not fuzzy or len(entry["text"].split()) > self.max_fuzzy_words:
+                continue
+            score = sum(weight * entry["vector"].get(feature, 0.0) for feature, weight in vector.items())
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        return best_id if best_score >= self.threshold else None
+
+    def get(self, message: str, partition: str) -> Optional[str]:
+        """
+        似たメッセージに対するキャッシュ済みの応答を返す。
+        応答のバリエーションがまだ揃っていない場合は、新しい応答を生成させるためNoneを返す。
+        """
+        normalized = self.normalize(message)
+        if not normalized:
+            return None
+
+        with self._lock:
+            entry_id = self._find(partition, normalized, self._vectorize(normalized))
+            if entry_id is None:
+                self.misses += 1
+                return None
+
+            entry = self._entries[entry_id]
+            if len(entry["responses"]) < self.max_variants:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            if entry["text"] != normalized:
+                self.near_duplicate_hits += 1
+            return random.choice(entry["responses"])
+
+    def add(self, message: str, partition: str, response: str) -> None:
+        """メッセージに対する応答をキャッシュに追加する"""
+        normalized = self.normalize(message)
+        if not normalized or not response:
+            return
+
+        with self._lock:
+            vector = self._vectorize(normalized)
+            entry_id = self._find(partition, normalized, vector)
+            if entry_id is not None:
+                # 既存のエントリに応答のバリエーションとして追加する
+                entry = self._entries[entry_id]
+                if response not in entry["responses"] and len(entry["responses"]) < self.max_variants:
+                    entry["responses"].append(response)
+                self._entries.move_to_end(entry_id)
+            else:
+                entry_id = str(uuid.uuid4())
+                entry = {"partition": partition, "text": normalized, "vector": vector, "responses": [response]}
+                self._entries[entry_id] = entry
+                self._add_to_index(entry_id, entry)
+
+                while len(self._entries) > self.max_entries:
+                    old_id, old_entry = self._entries.popitem(last=False)
+                    self._remove_from_index(old_id, old_entry)
+
+            self._dirty = True
+
+    def _load(self) -> None:
+        """永続ストレージからキャッシュを読み込む"""
+        try:
+            with open(self.storage_path, 'r') as f:
+                entries = json.load(f)
+
+            for entry_id, entry in entries.items():
+                entry["vector"] = self._vectorize(entry["text"])
+                self._entries[entry_id] = entry
+                self._add_to_index(entry_id, entry)
+        except Exception as e:
+            print(f"Error loading semantic cache: {e}")
+
+    def _serialize(self) -> Dict[str, Any]:
+        """保存する内容を作成する（ベクトルは読み込み時に再計算する）"""
+        return {
+            entry_id: {
+                "partition": entry["partition"],
+                "text": entry["text"],
+                "responses": list(entry["responses"])
+            }
+            for entry_id, entry in self._entries.items()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュのメトリクスを取得する"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "max_fuzzy_words": self.max_fuzzy_words,
+            "max_variants": self.max_variants,
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_duplicate_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "unsaved_changes": self._dirty,
+            "flushes": self.flushes
+        }
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Any
+from typing import Awaitable, Callable, Dict, List, Optional, Any
 from datetime import datetime
 import os
 import json
@@ -6,17 +6,37 @@ import json
 from ..models.chat import ChatSession, Message
 
 
+# メッセージを外部（LangGraphのチェックポイント）に保存しているセッションのメタデータ
+EXTERNAL_MESSAGES_KEY = "message_store"
+
+
 class SessionService:
     """チャットセッション管理サービス"""
     
-    def __init__(self, storage_path: Optional[str] = None):
-        """セッション管理サービスの初期化"""
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        message_loader: Optional[Callable[[ChatSession], Awaitable[List[Message]]]] = None,
+        message_deleter: Optional[Callable[[ChatSession], Awaitable[None]]] = None
+    ):
+        """
+        セッション管理サービスの初期化
+
+        Args:
+            storage_path: 永続ストレージのパス
+            message_loader: メッセージを外部に保存しているセッションのメッセージを読み込む非同期関数
+            message_deleter: メッセージを外部に保存しているセッションのメッセージを削除する非同期関数
+        """
         # インメモリストレージとして辞書を使用
         self.sessions: Dict[str, ChatSession] = {}
         
         # 永続ストレージのパス（オプション）
         self.storage_path = storage_path or os.environ.get("SESSION_STORAGE_PATH")
         
+        # 外部に保存したメッセージの読み込み関数（起動後の最初のアクセスで読み込む）
+        self.message_loader = message_loader
+        self.message_deleter = message_deleter
+        
         # 永続ストレージが指定されている場合は初期化
         if self.storage_path and os.path.exists(self.storage_path):
             self._load_sessions()
@@ -69,9 +89,9 @@ class SessionService:
             # セッションをシリアライズ可能な形式に変換
             sessions_dict = {}
             for session_id, session in self.sessions.items():
-                # メッセージをシリアライズ
+                # メッセージをシリアライズ（外部に保存しているセッションは二重に保存しない）
                 messages = []
-                for msg in session.messages:
+                for msg in ([] if self.has_external_messages(session) else session.messages):
                     messages.append({
                         'id': msg.id,
                         'content': msg.content,
@@ -99,10 +119,37 @@ class SessionService:
         except Exception as e:
             print(f"Error saving sessions: {e}")
     
+    @staticmethod
+    def has_external_messages(session: ChatSession) -> bool:
+        """メッセージを外部（LangGraphのチェックポイント）に保存しているセッションかどうか"""
+        return bool(session.metadata and session.metadata.get(EXTERNAL_MESSAGES_KEY))
+    
+    def mark_external_messages(self, session: ChatSession, store: str) -> ChatSession:
+        """セッションのメッセージを外部に保存するよう設定する"""
+        session.metadata = {**(session.metadata or {}), EXTERNAL_MESSAGES_KEY: store}
+        return self.update_session(session)
+    
+    async def load_messages(self, session: ChatSession) -> ChatSession:
+        """外部に保存しているメッセージをまだ読み込んでいなければ読み込む"""
+        if self.message_loader and not session.messages and self.has_external_messages(session):
+            try:
+                session.messages = await self.message_loader(session)
+            except Exception as e:
+                print(f"Error loading messages for session {session.id}: {e}")
+        return session
+    
     def get_session(self, session_id: str) -> Optional[ChatSession]:
-        """セッションIDによるセッションの取得"""
+        """
+        セッションIDによるセッションの取得
+        （外部に保存しているメッセージは読み込まないため、メッセージが必要な場合は aget_session を使う）
+        """
         return self.sessions.get(session_id)
     
+    async def aget_session(self, session_id: str) -> Optional[ChatSession]:
+        """セッションIDによるセッションの取得（外部に保存しているメッセージも読み込む）"""
+        session = self.get_session(session_id)
+        return await self.load_messages(session) if session else None
+    
     def create_session(self, session: ChatSession) -> ChatSession:
         """新しいセッションの作成"""
         # セッションをストレージに追加
@@ -137,6 +184,13 @@ class SessionService:
             return True
         return False
     
+    async def adelete_session(self, session_id: str) -> bool:
+        """セッションの削除（外部に保存しているメッセージも削除する）"""
+        session = self.get_session(session_id)
+        if session and self.message_deleter and self.has_external_messages(session):
+            await self.message_deleter(session)
+        return self.delete_session(session_id)
+    
     def add_message(self, session_id: str, message: Message) -> Optional[ChatSession]:
         """セッションにメッセージを追加"""
         session = self.get_session(session_id)
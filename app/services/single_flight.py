@@ -0,0 +1,53 @@
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+
+
+class SingleFlight:
+    """同一キーの実行中リクエストを1回の呼び出しにまとめるクラス"""
+
+    def __init__(self):
+        """シングルフライトの初期化"""
+        # キー -> 実行中の呼び出しタスク
+        self._in_flight: Dict[str, "asyncio.Task[Any]"] = {}
+
+        # メトリクス
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        キーに対応する呼び出しを実行する。
+        同じキーの呼び出しが実行中であれば、その結果を共有する。
+        """
+        self.calls += 1
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+        else:
+            self.executions += 1
+            # 呼び出し元とは独立したタスクで実行し、最初の呼び出し元が
+            # キャンセルされても他の待機者の結果には影響させない
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        """完了したタスクを実行中リストから外す"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # 待機者がいない場合でも「未取得の例外」警告を出さない
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """シングルフライトのメトリクスを取得する"""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._in_flight)
+        }
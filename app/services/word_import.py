@@ -0,0 +1,219 @@
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Set, Tuple
+import asyncio
+import codecs
+import csv
+import json
+import logging
+
+from pydantic import ValidationError
+from supabase import AsyncClient
+
+from ..models.models import WordCreate, WordImportError, WordImportReport
+
+logger = logging.getLogger(__name__)
+
+# 取り込み形式
+NDJSON_FORMAT = "ndjson"
+CSV_FORMAT = "csv"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """受信したバイト列を少しずつデコードし、1行ずつ返す"""
+    # 先頭のBOMは取り除く
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+class _PendingLines:
+    """csv.reader に読み込み済みの行を渡すための待ち行列"""
+
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+
+    def __iter__(self) -> "_PendingLines":
+        return self
+
+    def __next__(self) -> str:
+        return self.lines.popleft()
+
+
+async def iter_rows(
+    lines: AsyncIterator[str],
+    import_format: str
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    行を単語のデータに変換する
+
+    Returns:
+        (行番号, データ, エラー) を1行ずつ返す（解析できない行はデータがNoneでエラーを含む）
+        CSVの場合は1行目をヘッダー（word, mean, example_sentence）として扱い、
+        引用符で囲まれた値の中の改行を含む複数行を1件として読み込む（行番号は1行目）
+    """
+    header: Optional[List[str]] = None
+    line_number = 0
+    # CSVは1つの csv.reader で読み、引用符内の改行は csv モジュールに任せる
+    pending = _PendingLines()
+    reader = csv.reader(pending)
+    record_line = 0
+    quotes = 0
+    async for line in lines:
+        line_number += 1
+
+        if import_format == CSV_FORMAT:
+            if not pending.lines:
+                if not line.strip():
+                    continue
+                record_line = line_number
+            # 値の中の改行を残すため、iter_lines で取り除いた改行を付け直して渡す
+            pending.lines.append(line + "\n")
+            # 引用符の数が奇数の間は値の途中（引用符内の改行）なので次の行を待つ
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            quotes = 0
+
+            values = next(reader)
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) > len(header):
+                yield record_line, None, "Too many columns"
+                continue
+            yield record_line, {name: value for name, value in zip(header, values) if value != ""}, None
+        else:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {str(e)}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, "Each line must be a JSON object"
+                continue
+            yield line_number, row, None
+
+    if pending.lines:
+        yield record_line, None, "Unterminated quoted field"
+
+
+class WordImporter:
+    """
+    ストリームで受け取った単語を検証・重複排除し、一定件数ごとに並行して登録するクラス。
+    1回の取り込みごとに作成する。登録済みの単語の除外には words テーブルの word 列の一意制約が必要
+    （例: alter table words add constraint words_word_key unique (word);）。
+    """
+
+    def __init__(
+        self,
+        supabase: AsyncClient,
+        chunk_size: int = 500,
+        max_concurrency: int = 4,
+        max_errors: int = 1000,
+        on_inserted: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ):
+        """
+        取り込みの初期化
+
+        Args:
+            supabase: Supabaseクライアント
+            chunk_size: 1回の登録でまとめる単語数
+            max_concurrency: 同時に実行する登録の数
+            max_errors: レポートに含める行ごとのエラーの最大数
+            on_inserted: 登録した単語を受け取るコールバック（検索インデックスの更新など）
+        """
+        self.supabase = supabase
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.on_inserted = on_inserted
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: List["asyncio.Task[None]"] = []
+        # 取り込み内で既に現れた単語
+        self._seen: Set[str] = set()
+        self.report = WordImportReport()
+
+    def _add_error(self, line: int, error: str, word: Optional[str] = None) -> None:
+        """行ごとのエラーを記録する"""
+        if len(self.report.errors) < self.max_errors:
+            self.report.errors.append(WordImportError(line=line, word=word, error=error))
+        else:
+            self.report.errors_truncated = True
+
+    async def _insert_chunk(self, chunk: List[Tuple[int, WordCreate]]) -> None:
+        """
+        1チャンクを登録する（呼び出し前にセマフォを取得しておく）。
+        登録済みの単語は words.word の一意制約で除外するため、同時に行われる取り込みや単語の登録とも重複しない
+        """
+        try:
+            response = await self.supabase.table("words").upsert(
+                [word.dict() for _, word in chunk],
+                on_conflict="word",
+                ignore_duplicates=True
+            ).execute()
+            # 応答には実際に登録された単語だけが含まれる
+            inserted = response.data or []
+            self.report.inserted += len(inserted)
+            self.report.duplicates += len(chunk) - len(inserted)
+            if inserted and self.on_inserted:
+                self.on_inserted(inserted)
+            logger.info(
+                f"Word import progress: {self.report.inserted} inserted, "
+                f"{self.report.duplicates} duplicates, {self.report.total_rows} rows read"
+            )
+        except Exception as e:
+            self.report.failed += len(chunk)
+            for line, word in chunk:
+                self._add_error(line, f"Insert failed: {str(e)}", word.word)
+        finally:
+            self._semaphore.release()
+
+    async def _dispatch(self, chunk: List[Tuple[int, WordCreate]]) -> None:
+        """チャンクの登録を開始する（同時実行数の上限に達している場合は空くまで読み込みを止める）"""
+        await self._semaphore.acquire()
+        self._tasks.append(asyncio.ensure_future(self._insert_chunk(chunk)))
+
+    async def run(self, rows: AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]) -> WordImportReport:
+        """行を読み込みながら登録し、結果のレポートを返す"""
+        chunk: List[Tuple[int, WordCreate]] = []
+        try:
+            async for line, row, error in rows:
+                self.report.total_rows += 1
+                if error is not None:
+                    self.report.invalid += 1
+                    self._add_error(line, error)
+                    continue
+
+                try:
+                    word = WordCreate(**row)
+                except ValidationError as e:
+                    self.report.invalid += 1
+                    self._add_error(line, str(e), row.get("word"))
+                    continue
+
+                # 取り込み内の重複は最初の行のみ登録する（登録済みの単語との重複は登録時に一意制約で除外する）
+                if word.word in self._seen:
+                    self.report.duplicates += 1
+                    continue
+                self._seen.add(word.word)
+
+                chunk.append((line, word))
+                if len(chunk) >= self.chunk_size:
+                    await self._dispatch(chunk)
+                    chunk = []
+
+            if chunk:
+                await self._dispatch(chunk)
+        finally:
+            # 途中で失敗した場合も、開始した登録は完了を待つ
+            if self._tasks:
+                await asyncio.gather(*self._tasks)
+        return self.report
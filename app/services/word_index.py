@@ -0,0 +1,222 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 検索対象のフィールド（前にあるものほど優先する）
+SEARCH_FIELDS = ("word", "mean")
+
+
+def normalize(text: Optional[str]) -> str:
+    """検索用に小文字化し、空白をまとめる"""
+    return " ".join((text or "").lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """前後に境界記号を付けた文字トライグラムの集合"""
+    padded = f"^{text}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class WordSearchIndex:
+    """
+    単語テーブルのプロセス内検索インデックス。
+    word / mean のトライグラム転置インデックスと単語の前方一致用のソート済みリストを持ち、
+    部分一致・前方一致・綴り間違いを許容した一致を順位付けして返す。
+    """
+
+    def __init__(self, min_similarity: float = 0.4):
+        """インデックスの初期化"""
+        # 綴り間違いを許容する一致とみなすトライグラムの類似度（Dice係数）
+        self.min_similarity = min_similarity
+
+        self.ready = False
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        # (フィールド, トライグラム) -> 単語IDの集合
+        self._postings: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        # 前方一致用の (正規化した単語, 単語ID) のソート済みリスト
+        self._sorted_words: List[Tuple[str, int]] = []
+        # 再構築中の書き込み（再構築後に適用し直す）。再構築中でなければNone
+        self._pending: Optional[Dict[int, Optional[Dict[str, Any]]]] = None
+        self._sync_task: Optional["asyncio.Task[None]"] = None
+
+        # メトリクス
+        self.searches = 0
+        self.rebuilds = 0
+        self.rebuild_errors = 0
+        self.last_rebuild_at: Optional[float] = None
+
+    def _add(self, doc: Dict[str, Any], keep_sorted: bool = True) -> None:
+        """単語をインデックスに追加する（keep_sorted=Falseの場合は前方一致用のリストを並べ替えない）"""
+        word_id = doc["id"]
+        self._docs[word_id] = doc
+        for field in SEARCH_FIELDS:
+            for gram in trigrams(normalize(doc.get(field))):
+                self._postings[(field, gram)].add(word_id)
+        entry = (normalize(doc.get("word")), word_id)
+        if keep_sorted:
+            insort(self._sorted_words, entry)
+        else:
+            self._sorted_words.append(entry)
+
+    def _remove(self, word_id: int) -> None:
+        """単語をインデックスから削除する"""
+        doc = self._docs.pop(word_id, None)
+        if doc is None:
+            return
+        for field in SEARCH_FIELDS:
+            for gram in trigrams(normalize(doc.get(field))):
+                ids = self._postings.get((field, gram))
+                if ids is not None:
+                    ids.discard(word_id)
+                    if not ids:
+                        del self._postings[(field, gram)]
+        entry = (normalize(doc.get("word")), word_id)
+        index = bisect_left(self._sorted_words, entry)
+        if index < len(self._sorted_words) and self._sorted_words[index] == entry:
+            del self._sorted_words[index]
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        """単語を追加・更新する"""
+        self._remove(doc["id"])
+        self._add(doc)
+        if self._pending is not None:
+            self._pending[doc["id"]] = doc
+
+    def upsert_many(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """複数の単語を追加・更新する"""
+        for doc in docs:
+            self.upsert(doc)
+
+    def remove(self, word_id: int) -> None:
+        """単語を削除する"""
+        self._remove(word_id)
+        if self._pending is not None:
+            self._pending[word_id] = None
+
+    def replace_all(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """インデックスを作り直す（読み込み中に行われた書き込みは適用し直す）"""
+        pending = self._pending or {}
+        self._docs = {}
+        self._postings = defaultdict(set)
+        self._sorted_words = []
+        for doc in docs:
+            self._add(doc, keep_sorted=False)
+        self._sorted_words.sort()
+        for word_id, doc in pending.items():
+            self._remove(word_id)
+            if doc is not None:
+                self._add(doc)
+        self._pending = None
+        self.ready = True
+
+    def _prefix_ids(self, query: str) -> List[int]:
+        """単語が query で始まる単語ID（単語の辞書順）"""
+        ids = []
+        index = bisect_left(self._sorted_words, (query, -1))
+        while index < len(self._sorted_words) and self._sorted_words[index][0].startswith(query):
+            ids.append(self._sorted_words[index][1])
+            index += 1
+        return ids
+
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        単語を検索し、一致の度合いが高い順に返す
+
+        順位: 単語の完全一致 > 単語の前方一致 > 単語の部分一致 > 意味の部分一致 > 綴り間違いを許容した一致
+        """
+        self.searches += 1
+        query = normalize(query)
+        if not query:
+            return []
+
+        # 単語ID -> 並び替えのキー
+        ranked: Dict[int, Tuple[int, float, int]] = {}
+
+        def rank(word_id: int, level: int, similarity: float = 1.0) -> None:
+            key = (level, -similarity, len(self._docs[word_id].get("word") or ""))
+            if word_id not in ranked or key < ranked[word_id]:
+                ranked[word_id] = key
+
+        for word_id in self._prefix_ids(query):
+            rank(word_id, 0 if normalize(self._docs[word_id].get("word")) == query else 1)
+
+        query_grams = trigrams(query)
+        # 境界記号を除いたトライグラムがすべて含まれるものだけが部分一致の候補になる
+        inner_grams = {gram for gram in query_grams if "^" not in gram and "$" not in gram}
+        for level, field in ((2, "word"), (3, "mean")):
+            if inner_grams:
+                candidates = set.intersection(*(self._postings.get((field, gram), set()) for gram in inner_grams))
+            else:
+                # 2文字以下のクエリはトライグラムで絞り込めないため全件を調べる
+                candidates = set(self._docs)
+            for word_id in candidates:
+                if query in normalize(self._docs[word_id].get(field)):
+                    rank(word_id, level)
+
+        # 綴り間違いを許容する一致（トライグラムの類似度）
+        for level, field in ((4, "word"), (5, "mean")):
+            counts: Dict[int, int] = defaultdict(int)
+            for gram in query_grams:
+                for word_id in self._postings.get((field, gram), ()):
+                    counts[word_id] += 1
+            for word_id, count in counts.items():
+                if word_id in ranked:
+                    continue
+                field_grams = trigrams(normalize(self._docs[word_id].get(field)))
+                # Dice係数
+                similarity = 2 * count / (len(query_grams) + len(field_grams))
+                if similarity >= self.min_similarity:
+                    rank(word_id, level, similarity)
+
+        ordered = sorted(ranked, key=lambda word_id: ranked[word_id])
+        return [self._docs[word_id] for word_id in ordered[:limit]]
+
+    async def rebuild(self, load_all: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> None:
+        """データベースからすべての単語を読み込んでインデックスを作り直す"""
+        self._pending = {}
+        try:
+            docs = await load_all()
+        except Exception:
+            self._pending = None
+            self.rebuild_errors += 1
+            raise
+        self.replace_all(docs)
+        self.rebuilds += 1
+        self.last_rebuild_at = time.time()
+
+    def start_sync(self, load_all: Callable[[], Awaitable[List[Dict[str, Any]]]], interval: float) -> None:
+        """起動時の構築と定期的な再同期をバックグラウンドで開始する"""
+        async def sync_loop() -> None:
+            while True:
+                try:
+                    await self.rebuild(load_all)
+                    logger.info(f"Word search index rebuilt with {len(self._docs)} words")
+                except Exception as e:
+                    logger.warning(f"Failed to rebuild word search index: {str(e)}")
+                await asyncio.sleep(interval)
+
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.get_running_loop().create_task(sync_loop())
+
+    def stop_sync(self) -> None:
+        """定期的な再同期を停止する"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """インデックスの状態を取得する"""
+        return {
+            "ready": self.ready,
+            "words": len(self._docs),
+            "trigrams": len(self._postings),
+            "searches": self.searches,
+            "rebuilds": self.rebuilds,
+            "rebuild_errors": self.rebuild_errors,
+            "last_rebuild_at": self.last_rebuild_at
+        }
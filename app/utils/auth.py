@@ -1,37 +1,59 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from supabase import create_client, Client
-import os
+from datetime import datetime, timezone
 from typing import Optional
-from dotenv import load_dotenv
+from jose import jwt
 
-# 環境変数のロード
-load_dotenv()
-
-# Supabaseクライアントの初期化
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+from ..db.supabase import supabase_pool
+from ..models.models import AuthenticatedUser
+from .jwt_verifier import InvalidTokenError, jwt_verifier
 
 # OAuth2スキーマ
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def _credentials_exception() -> HTTPException:
+    """認証に失敗した場合の401エラーを作成する"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def _verify_remotely(token: str) -> AuthenticatedUser:
+    """Supabaseにトークンを問い合わせてユーザーを取得する"""
+    client = await supabase_pool.get_auth_client()
+    response = await client.auth.get_user(token)
+    user = response.user
+    # Supabaseが有効と判断したトークンなので、キャッシュの期限を決めるために有効期限だけ読み取る
+    exp = jwt.get_unverified_claims(token).get("exp")
+    return AuthenticatedUser(
+        id=str(user.id),
+        email=user.email,
+        role=getattr(user, "role", None),
+        expires_at=datetime.fromtimestamp(exp, tz=timezone.utc) if exp else None
+    )
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
     """
     現在のユーザーを取得する関数。
     トークンが有効であれば、ユーザー情報を返す。
     無効であれば、HTTPExceptionを発生させる。
+    署名と有効期限はローカルで検証し、ローカルで検証できない場合のみSupabaseに問い合わせる。
     """
+    try:
+        user = await jwt_verifier.verify(token)
+    except InvalidTokenError:
+        raise _credentials_exception()
+    if user is not None:
+        return user
+    
     try:
         # トークンからユーザー情報を取得
-        user = supabase.auth.get_user(token)
-        return user.user
+        user = await _verify_remotely(token)
     except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_exception()
+    jwt_verifier.remember(token, user)
+    return user
 
 # 認証が必要なエンドポイントで使用する依存関係
 def get_current_active_user(current_user = Depends(get_current_user)):
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import time
+
+import httpx
+from jose import jwt, JWTError
+
+from ..models.models import AuthenticatedUser
+
+logger = logging.getLogger(__name__)
+
+# JWTシークレットで検証するアルゴリズム
+SECRET_ALGORITHM = "HS256"
+# JWKSの鍵で検証するアルゴリズムと、対応する鍵の種類（kty）
+JWK_ALGORITHMS = {"RS256": "RSA", "ES256": "EC"}
+
+
+class InvalidTokenError(Exception):
+    """アクセストークンが不正（署名・有効期限・audienceの検証に失敗）であることを示す例外"""
+    pass
+
+
+class SupabaseJWTVerifier:
+    """
+    Supabaseのアクセストークンをローカルで検証するクラス。
+    HS256のトークンはJWTシークレットで、非対称鍵のトークンはキャッシュしたJWKSで検証し、
+    検証済みのユーザーは短時間キャッシュする。ローカルで検証できない場合はNoneを返す。
+    """
+
+    def __init__(
+        self,
+        supabase_url: Optional[str] = None,
+        jwt_secret: Optional[str] = None,
+        audience: str = "authenticated",
+        cache_ttl: float = 60,
+        cache_max_size: int = 10000,
+        jwks_ttl: float = 600,
+        leeway: int = 10
+    ):
+        """検証器の初期化"""
+        self.supabase_url = (supabase_url or "").rstrip("/")
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.cache_ttl = cache_ttl
+        self.cache_max_size = cache_max_size
+        self.jwks_ttl = jwks_ttl
+        # 有効期限の判定で許容する時計のずれ（秒）
+        self.leeway = leeway
+
+        # トークンのハッシュ -> (ユーザー, キャッシュの有効期限)
+        self._users: "OrderedDict[str, Tuple[AuthenticatedUser, float]]" = OrderedDict()
+        # kid -> JWK
+        self._jwks: Dict[str, Dict[str, Any]] = {}
+        self._jwks_fetched_at = 0.0
+
+        # メトリクス
+        self.cache_hits = 0
+        self.local_verifications = 0
+        self.unverifiable = 0
+        self.rejected = 0
+        self.jwks_fetches = 0
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        """キャッシュのキー（トークンそのものは保持しない）"""
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _get_cached(self, key: str) -> Optional[AuthenticatedUser]:
+        """キャッシュから有効期限内のユーザーを取得する"""
+        entry = self._users.get(key)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            del self._users[key]
+            return None
+        self._users.move_to_end(key)
+        return user
+
+    def remember(self, token: str, user: AuthenticatedUser) -> None:
+        """検証済みのユーザーをキャッシュする（トークンの有効期限を超えては保持しない）"""
+        expires_at = time.time() + self.cache_ttl
+        if user.expires_at is not None:
+            expires_at = min(expires_at, user.expires_at.timestamp())
+        self._users[self._token_key(token)] = (user, expires_at)
+        self._users.move_to_end(self._token_key(token))
+        while len(self._users) > self.cache_max_size:
+            self._users.popitem(last=False)
+
+    async def _fetch_jwks(self) -> None:
+        """SupabaseのJWKSを取得する"""
+        self.jwks_fetches += 1
+        self._jwks_fetched_at = time.monotonic()
+        url = f"{self.supabase_url}/auth/v1/.well-known/jwks.json"
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+            keys: List[Dict[str, Any]] = response.json().get("keys", [])
+        self._jwks = {key["kid"]: key for key in keys if "kid" in key}
+
+    async def _get_signing_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        """kidに対応する署名鍵を取得する（未知のkidは鍵のローテーションとみなして再取得する）"""
+        if not self.supabase_url or not kid:
+            return None
+        age = time.monotonic() - self._jwks_fetched_at
+        # 未知のkidによる再取得は短い間隔では行わない
+        if age > self.jwks_ttl or (kid not in self._jwks and age > 30):
+            try:
+                await self._fetch_jwks()
+            except Exception as e:
+                logger.warning(f"Failed to fetch JWKS: {str(e)}")
+        return self._jwks.get(kid)
+
+    async def verify(self, token: str) -> Optional[AuthenticatedUser]:
+        """
+        アクセストークンを検証してユーザーを返す
+
+        Returns:
+            検証済みのユーザー（ローカルで検証できない場合はNone）
+
+        Raises:
+            InvalidTokenError: トークンが不正な場合
+        """
+        key = self._token_key(token)
+        user = self._get_cached(key)
+        if user is not None:
+            self.cache_hits += 1
+            return user
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError as e:
+            self.rejected += 1
+            raise InvalidTokenError(str(e))
+
+        # 検証に使うアルゴリズムは設定（シークレット）や鍵から決め、ヘッダーの値はそれと一致するかだけを確認する
+        header_algorithm = header.get("alg")
+        if header_algorithm == SECRET_ALGORITHM:
+            if not self.jwt_secret:
+                self.unverifiable += 1
+                return None
+            signing_key: Any = self.jwt_secret
+            algorithm = SECRET_ALGORITHM
+        elif header_algorithm in JWK_ALGORITHMS:
+            signing_key = await self._get_signing_key(header.get("kid"))
+            if signing_key is None:
+                self.unverifiable += 1
+                return None
+            kty = signing_key.get("kty")
+            algorithm = signing_key.get("alg") or next(
+                (alg for alg, key_type in JWK_ALGORITHMS.items() if key_type == kty), None
+            )
+            if algorithm not in JWK_ALGORITHMS or JWK_ALGORITHMS[algorithm] != kty or algorithm != header_algorithm:
+                self.rejected += 1
+                raise InvalidTokenError("Token algorithm does not match the signing key")
+        else:
+            # none や想定していないアルゴリズムのトークンは受け付けない
+            self.rejected += 1
+            raise InvalidTokenError(f"Unsupported token algorithm: {header_algorithm}")
+
+        try:
+            claims = jwt.decode(
+                token,
+                signing_key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                options={"leeway": self.leeway, "require_exp": True, "require_sub": True}
+            )
+        except JWTError as e:
+            self.rejected += 1
+            raise InvalidTokenError(str(e))
+        self.local_verifications += 1
+        user = AuthenticatedUser(
+            id=claims["sub"],
+            email=claims.get("email"),
+            role=claims.get("role"),
+            expires_at=datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+        )
+        self.remember(token, user)
+        return user
+
+    def stats(self) -> Dict[str, Any]:
+        """検証のメトリクスを取得する"""
+        return {
+            "cached_users": len(self._users),
+            "cache_hits": self.cache_hits,
+            "local_verifications": self.local_verifications,
+            "unverifiable": self.unverifiable,
+            "rejected": self.rejected,
+            "jwks_keys": len(self._jwks),
+            "jwks_fetches": self.jwks_fetches
+        }
+
+
+# アプリ全体で共有する検証器
+jwt_verifier = SupabaseJWTVerifier(
+    supabase_url=os.getenv("SUPABASE_URL"),
+    jwt_secret=os.getenv("SUPABASE_JWT_SECRET"),
+    audience=os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated"),
+    cache_ttl=float(os.getenv("AUTH_CACHE_TTL", "60")),
+    jwks_ttl=float(os.getenv("JWKS_CACHE_TTL", "600"))
+)
@@ -1,43 +1,84 @@
 # app/utils/langgraph_chatbot.py
+import asyncio
 import os
 import json
+from datetime import datetime
 
 from langchain_anthropic import ChatAnthropic
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
-from typing import Annotated, Dict, List, Any
+from typing import Annotated, Dict, List, Any, Optional
 from typing_extensions import TypedDict
 from dotenv import load_dotenv
 
+from ..models.chat import Message
+from ..services.resilience import resilience
+from ..services.concurrency_limiter import get_limiter
+from .tracing import tracer
+
 load_dotenv()
 
-# 環境変数の設定
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
-os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
-os.environ["LANGCHAIN_API_KEY"] = os.environ.get("LANGSMITH_API_KEY")
-os.environ["LANGCHAIN_PROJECT"] = os.environ.get("LANGCHAIN_PROJECT")
+# トレースは TRACING_MODE / TRACING_SAMPLE_RATE に応じて実行ごとにコールバックで有効にする（..utils.tracing）
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
 
-def create_chatbot():
+async def create_checkpointer():
+    """
+    会話の状態を保存するチェックポインタを作成する。
+    LANGGRAPH_CHECKPOINT_PATH が設定されていればSQLiteに保存し、再起動後も会話を継続できるようにする。
+    """
+    path = os.environ.get("LANGGRAPH_CHECKPOINT_PATH", "data/langgraph_checkpoints.sqlite")
+    if path:
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError:
+            print("langgraph-checkpoint-sqlite is not installed; using in-memory checkpoints")
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            return AsyncSqliteSaver(await aiosqlite.connect(path))
+    return MemorySaver()
+
+def create_chatbot(checkpointer=None):
     """チャットボットグラフを作成して返す"""
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-    llm = ChatAnthropic(api_key=ANTHROPIC_API_KEY, model="claude-3-haiku-20240307")
+    model = "claude-3-haiku-20240307"
+    llm = ChatAnthropic(api_key=ANTHROPIC_API_KEY, model=model)
+    limiter = get_limiter("anthropic")
     
     graph_builder = StateGraph(State)
     
-    def chatbot(state: State):
-        return {"messages": [llm.invoke(state["messages"])]}
+    async def chatbot(state: State):
+        # 一時的な障害はリトライし、障害が続く場合はサーキットブレーカーで即座に失敗させる。
+        # Anthropicへの同時呼び出し数はリミッターで制御する
+        response = await resilience.call(
+            f"anthropic/{model}",
+            lambda: limiter.run(lambda: llm.ainvoke(state["messages"]))
+        )
+        return {"messages": [response]}
     
     graph_builder.add_node("chatbot", chatbot)
     graph_builder.set_entry_point("chatbot")
     graph_builder.set_finish_point("chatbot")
-    return graph_builder.compile()
-
-# グローバルなグラフインスタンスを作成
-chatbot_graph = create_chatbot()
+    return graph_builder.compile(checkpointer=checkpointer)
+
+# グローバルなグラフインスタンス（会話の状態はセッションIDをスレッドIDとして保存する）。
+# 非同期のチェックポインタは実行中のイベントループで作成する必要があるため、最初の利用時に作成する
+_chatbot_graph = None
+
+async def get_chatbot_graph():
+    """グローバルなグラフインスタンスを取得する"""
+    global _chatbot_graph
+    if _chatbot_graph is None:
+        checkpointer = await create_checkpointer()
+        if _chatbot_graph is None:
+            _chatbot_graph = create_chatbot(checkpointer)
+        elif hasattr(checkpointer, "conn"):
+            # 並行して作成された場合は先に作成されたものを使い、余分な接続は閉じる
+            await checkpointer.conn.close()
+    return _chatbot_graph
 
 # def process_message(user_input: str, session_history: List[Dict[str, Any]] = None) -> Dict[str, Any]:
 #     """
@@ -60,25 +101,64 @@ chatbot_graph = create_chatbot()
 #     result = chatbot_graph.invoke({"messages": messages})
 #     return result
 
-def process_message(user_input: str, session_history: List[Dict[str, Any]] = None) -> Dict[str, Any]:
-    # 履歴がない場合は新しいリストを作成
-    messages = session_history or []
+def _thread_config(thread_id: str) -> Dict[str, Any]:
+    """スレッドIDに対応するグラフの実行設定"""
+    return {"configurable": {"thread_id": thread_id}}
+
+async def process_message(
+    user_input: str,
+    thread_id: str,
+    seed_history: Optional[List[Dict[str, Any]]] = None,
+    message_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    ユーザー入力を処理し、応答を返す
+
+    Args:
+        user_input: ユーザーの入力メッセージ
+        thread_id: 会話のスレッドID（セッションID）
+        seed_history: チェックポイントがまだない会話の既存の履歴（LangChainフォーマット、チェックポイントがあれば使わない）
+        message_id: ユーザーメッセージのID（同じIDのメッセージはチェックポイントに二重に追加しない）
+
+    Returns:
+        処理結果の辞書 {"messages": [...]}（スレッドのすべてのメッセージ）
+    """
+    graph = await get_chatbot_graph()
+    config = _thread_config(thread_id)
     
-    # ユーザーメッセージを追加
-    messages.append({"role": "user", "content": user_input})
+    # これまでの会話はチェックポイントに保存されているため、新しいメッセージだけを渡す
+    state = await graph.aget_state(config)
+    existing = list(state.values.get("messages", [])) if state else []
+    messages = [] if existing else list(seed_history or [])
     
-    # グラフを実行
-    result = chatbot_graph.invoke({"messages": messages})
+    # 前回のターンがユーザーメッセージの保存後に失敗していた場合、その再送は同じメッセージとして扱う
+    # （add_messages は同じIDのメッセージを置き換えるため、チェックポイントに二重に追加されない）
+    last = existing[-1] if existing else None
+    if last is not None and getattr(last, "type", None) == "human" and (
+        last.id == message_id or last.content == user_input
+    ):
+        message_id = last.id
     
-    # デバッグ情報を出力
-    print("DEBUG: LangGraph result type:", type(result))
-    print("DEBUG: Messages type:", type(result.get("messages", [])))
-    if result.get("messages"):
-        last_msg = result["messages"][-1]
-        print("DEBUG: Last message type:", type(last_msg))
-        print("DEBUG: Last message attributes:", dir(last_msg))
+    user_message = {"role": "user", "content": user_input}
+    if message_id:
+        user_message["id"] = message_id
+    messages.append(user_message)
     
-    return result
+    # グラフを実行
+    # サンプリングされた実行のみトレースする（出力はバックグラウンドで行う）
+    config["callbacks"] = tracer.callbacks("langgraph_chat", {"session_id": thread_id})
+    return await graph.ainvoke({"messages": messages}, config)
+
+async def delete_thread(thread_id: str) -> None:
+    """スレッドのチェックポイントを削除する"""
+    graph = await get_chatbot_graph()
+    await graph.checkpointer.adelete_thread(thread_id)
+
+async def get_thread_messages(thread_id: str) -> List[Any]:
+    """チェックポイントに保存されているスレッドのメッセージを取得する"""
+    graph = await get_chatbot_graph()
+    state = await graph.aget_state(_thread_config(thread_id))
+    return list(state.values.get("messages", [])) if state else []
 
 def convert_to_langchain_format(messages):
     """
@@ -94,10 +174,39 @@ def convert_to_langchain_format(messages):
     for msg in messages:
         result.append({
             "role": msg.role,
-            "content": msg.content
+            "content": msg.content,
+            "id": msg.id
         })
     return result
 
+# LangChainのメッセージ種別 -> アプリケーションのロール
+_ROLE_BY_TYPE = {"human": "user", "ai": "assistant", "system": "system"}
+
+def convert_from_langchain_format(messages, timestamps: Optional[Dict[str, str]] = None) -> List[Message]:
+    """
+    LangChain形式のメッセージをアプリケーション形式に変換
+
+    Args:
+        messages: LangChain形式のメッセージリスト
+        timestamps: メッセージID -> 作成日時（ISO形式）。チェックポイントには日時を保存しないため別途渡す
+
+    Returns:
+        アプリケーション形式のメッセージリスト
+    """
+    timestamps = timestamps or {}
+    result = []
+    for msg in messages:
+        role = _ROLE_BY_TYPE.get(getattr(msg, "type", ""))
+        if role is None:
+            continue
+        kwargs = {"content": msg.content if isinstance(msg.content, str) else str(msg.content), "role": role}
+        if msg.id:
+            kwargs["id"] = msg.id
+            if msg.id in timestamps:
+                kwargs["timestamp"] = datetime.fromisoformat(timestamps[msg.id])
+        result.append(Message(**kwargs))
+    return result
+
 # def extract_assistant_message(result):
 #     """
 #     LangGraphの結果から最新のアシスタントメッセージを抽出
@@ -133,7 +242,8 @@ def extract_assistant_message(result):
     return ""
 
 # スタンドアロン実行用のコード
-if __name__ == "__main__":
+async def _run_cli():
+    """標準入力で会話する（チェックポインタの接続を使い回すため、1つのイベントループで実行する）"""
     while True:
         try:
             user_input = input("User: ")
@@ -141,12 +251,15 @@ if __name__ == "__main__":
                 print("Goodbye!")
                 break
 
-            result = process_message(user_input)
+            result = await process_message(user_input, thread_id="cli")
             print("Assistant:", extract_assistant_message(result))
         except Exception as e:
             print(f"Error: {e}")
             break
 
+if __name__ == "__main__":
+    asyncio.run(_run_cli())
+
 # import os
 # import json
 
@@ -0,0 +1,112 @@
+import json
+import re
+from typing import Any, List, Optional
+
+# ```json ... ``` のようなコードブロックを取り除くためのパターン
+_CODE_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+def parse_json_text(text: str) -> Any:
+    """
+    LLMの応答テキストをJSONとして解析する
+
+    Args:
+        text: LLMの応答テキスト（コードブロックで囲まれていてもよい）
+
+    Returns:
+        解析されたJSONデータ
+
+    Raises:
+        ValueError: JSONとして解析できない場合
+    """
+    match = _CODE_FENCE_PATTERN.match(text)
+    if match:
+        text = match.group(1)
+    return json.loads(text)
+
+
+class IncrementalJSONArrayParser:
+    """
+    ストリーミングで届くLLMの応答から、JSON配列の要素を完成した順に取り出すパーサー。
+    配列の開始（最初の "["）より前のテキスト（コードブロックの開始など）は読み飛ばす。
+    """
+
+    def __init__(self):
+        """パーサーの初期化"""
+        self._buffer = ""
+        # 次に走査するバッファ上の位置
+        self._pos = 0
+        # 走査中の要素の開始位置（要素の外にいる場合はNone）
+        self._element_start: Optional[int] = None
+        # 配列の要素内でのネストの深さ
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.started = False
+        self.finished = False
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        応答テキストの続きを与え、新たに完成した要素を返す
+
+        Raises:
+            ValueError: 完成した要素がJSONとして解析できない場合
+        """
+        self._buffer += text
+        elements = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer) and not self.finished:
+            c = buffer[i]
+            if not self.started:
+                if c == "[":
+                    self.started = True
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+                self._begin_element(i)
+            elif c in "{[":
+                self._begin_element(i)
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 0:
+                    # 配列の終わり（末尾の要素が数値などの場合はここで完成する）
+                    self._complete_element(buffer, i, elements)
+                    self.finished = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._complete_element(buffer, i + 1, elements)
+            elif c == "," and self._depth == 0:
+                self._complete_element(buffer, i, elements)
+            elif not c.isspace():
+                self._begin_element(i)
+            i += 1
+
+        # 要素の外にいる場合は、走査済みの部分を捨てる
+        if self._element_start is None:
+            self._buffer = buffer[i:]
+            self._pos = 0
+        else:
+            self._buffer = buffer[self._element_start:]
+            self._pos = i - self._element_start
+            self._element_start = 0
+        return elements
+
+    def _begin_element(self, index: int) -> None:
+        """配列の直下で要素が始まった位置を記録する"""
+        if self._depth == 0 and self._element_start is None:
+            self._element_start = index
+
+    def _complete_element(self, buffer: str, end: int, elements: List[Any]) -> None:
+        """走査中の要素を解析して結果に追加する"""
+        if self._element_start is None:
+            return
+        elements.append(json.loads(buffer[self._element_start:end]))
+        self._element_start = None
@@ -0,0 +1,63 @@
+from fastapi import HTTPException, Request, status
+import math
+import os
+
+from ..services.rate_limiter import InMemoryRateLimitStore, RateLimiter, RateLimitStore
+from .jwt_verifier import InvalidTokenError, jwt_verifier
+
+
+def _create_store() -> RateLimitStore:
+    """環境変数 RATE_LIMIT_STORE に応じたストアを作成する"""
+    store_type = os.environ.get("RATE_LIMIT_STORE", "memory")
+    if store_type == "memory":
+        return InMemoryRateLimitStore()
+    raise ValueError(f"Unknown rate limit store: {store_type}")
+
+
+# アプリ全体で共有するレートリミッター（スコープごとに「回数/秒数」で予算を設定）
+rate_limiter = RateLimiter(
+    _create_store(),
+    {
+        "chat": RateLimiter.parse_budget(os.environ.get("RATE_LIMIT_CHAT", "20/60")),
+        "grammar": RateLimiter.parse_budget(os.environ.get("RATE_LIMIT_GRAMMAR", "30/60")),
+        "vocabulary": RateLimiter.parse_budget(os.environ.get("RATE_LIMIT_VOCABULARY", "60/60")),
+    }
+)
+
+
+async def get_client_identity(request: Request) -> str:
+    """
+    レート制限のキーとなるクライアントの識別子を取得する。
+    署名を検証できた認証トークンのユーザーID（sub）を使い、それ以外はIPアドレスを使う。
+    クライアントが自由に変えられる値（未検証のトークンやuser_id）をキーにすると、
+    毎回違う値を送るだけで制限を回避でき、他人のuser_idを送ればその人の予算を使い切れてしまう。
+    """
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            user = await jwt_verifier.verify(authorization[7:].strip())
+        except InvalidTokenError:
+            user = None
+        if user is not None:
+            return f"user:{user.id}"
+
+    # プロキシ経由の場合は uvicorn の --proxy-headers で元のクライアントのIPが設定される
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def rate_limit(scope: str):
+    """指定したスコープの予算でレート制限を行う依存関係を作成する"""
+    async def dependency(request: Request) -> None:
+        identity = await get_client_identity(request)
+        allowed, retry_after, limit = await rate_limiter.check(scope, identity)
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded for {scope} requests",
+                headers={
+                    "Retry-After": str(max(1, math.ceil(retry_after))),
+                    "X-RateLimit-Limit": str(int(limit)),
+                },
+            )
+
+    return dependency
@@ -0,0 +1,281 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+import asyncio
+import json
+import os
+import random
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# トレースのモード
+TRACING_OFF = "off"
+TRACING_LOCAL = "local"
+TRACING_LANGSMITH = "langsmith"
+
+
+class SpanExporter:
+    """記録したスパンの出力先の基底クラス"""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """スパンをまとめて出力する（バックグラウンドのスレッドから呼ばれる）"""
+        raise NotImplementedError
+
+
+class InMemorySpanExporter(SpanExporter):
+    """直近のスパンをメモリ上に保持する出力先（オフライン環境や動作確認用）"""
+
+    def __init__(self, max_spans: int = 1000):
+        self.spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self.spans.extend(spans)
+
+
+class FileSpanExporter(SpanExporter):
+    """スパンをJSON Lines形式でファイルに追記する出力先"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+
+
+class BufferedSpanProcessor:
+    """
+    スパンをバッファに溜め、バックグラウンドでまとめて出力するクラス。
+    リクエストの処理中はバッファに追加するだけで、出力の遅延や失敗の影響を受けない。
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue: int = 2048,
+        batch_size: int = 100,
+        flush_interval: float = 2.0
+    ):
+        """プロセッサの初期化"""
+        self.exporter = exporter
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+        # メトリクス
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+
+    def submit(self, span: Dict[str, Any]) -> None:
+        """スパンをバッファに追加する（バッファがいっぱいの場合は捨てる）"""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # イベントループ外（CLIなど）ではその場で出力する
+            self._export(self._take_batch())
+            return
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        """バッファの先頭から1回分のスパンを取り出す"""
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        """スパンを出力する（出力の失敗はリクエストに影響させない）"""
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.export_errors += 1
+            print(f"Error exporting trace spans: {e}")
+
+    async def _run(self) -> None:
+        """バッファが空になるまで一定間隔でスパンを出力する"""
+        while self._queue:
+            await asyncio.sleep(self.flush_interval)
+            while self._queue:
+                await asyncio.to_thread(self._export, self._take_batch())
+
+    async def shutdown(self) -> None:
+        """バッファに残っているスパンをすべて出力する"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        while self._queue:
+            await asyncio.to_thread(self._export, self._take_batch())
+
+    def stats(self) -> Dict[str, Any]:
+        """プロセッサのメトリクスを取得する"""
+        return {
+            "queued": len(self._queue),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "export_errors": self.export_errors
+        }
+
+
+class SpanRecorder(BaseCallbackHandler):
+    """LangChain / LangGraph の実行をスパンとして記録するコールバック（1回の実行ごとに作成する）"""
+
+    # 記録は辞書の操作だけで軽いため、別スレッドに回さずに実行する
+    run_inline = True
+
+    def __init__(self, processor: BufferedSpanProcessor, trace_name: str, metadata: Optional[Dict[str, Any]] = None):
+        self.processor = processor
+        self.trace_name = trace_name
+        self.metadata = metadata or {}
+        self._spans: Dict[Any, Dict[str, Any]] = {}
+
+    def _start(self, run_id, parent_run_id, name: str, kind: str, **attributes) -> None:
+        self._spans[run_id] = {
+            "trace": self.trace_name,
+            "run_id": str(run_id),
+            "parent_run_id": str(parent_run_id) if parent_run_id else None,
+            "name": name,
+            "kind": kind,
+            "start_time": datetime.now().isoformat(),
+            "metadata": self.metadata,
+            **attributes
+        }
+
+    def _end(self, run_id, error: Optional[BaseException] = None, **attributes) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        end_time = datetime.now()
+        span["end_time"] = end_time.isoformat()
+        span["duration_ms"] = (end_time - datetime.fromisoformat(span["start_time"])).total_seconds() * 1000
+        span["error"] = repr(error) if error is not None else None
+        span.update(attributes)
+        self.processor.submit(span)
+
+    @staticmethod
+    def _name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any], default: str) -> str:
+        return kwargs.get("name") or (serialized or {}).get("name") or default
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chain"), "chain")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        # 会話の内容は記録せず、メッセージ数のみ記録する
+        self._start(
+            run_id, parent_run_id, self._name(serialized, kwargs, "chat_model"), "llm",
+            message_count=sum(len(batch) for batch in messages)
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = (response.llm_output or {}).get("usage") if response.llm_output else None
+        self._end(run_id, token_usage=usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+class Tracer:
+    """実行ごとにサンプリングを行い、トレース用のコールバックを作成するクラス"""
+
+    def __init__(
+        self,
+        mode: str = TRACING_OFF,
+        sample_rate: float = 1.0,
+        processor: Optional[BufferedSpanProcessor] = None,
+        project: Optional[str] = None
+    ):
+        """トレーサーの初期化"""
+        if mode not in (TRACING_OFF, TRACING_LOCAL, TRACING_LANGSMITH):
+            raise ValueError(f"Unknown tracing mode: {mode}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.processor = processor
+        self.project = project
+
+        # メトリクス
+        self.sampled = 0
+        self.skipped = 0
+
+    def callbacks(self, trace_name: str, metadata: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        1回の実行に渡すコールバックを作成する（サンプリングされなかった場合は空のリスト）
+
+        Args:
+            trace_name: トレースの名前
+            metadata: トレースに付加する情報（セッションIDなど）
+        """
+        if self.mode == TRACING_OFF:
+            return []
+        if random.random() >= self.sample_rate:
+            self.skipped += 1
+            return []
+        self.sampled += 1
+
+        if self.mode == TRACING_LANGSMITH:
+            # LangSmithのクライアントはバックグラウンドのスレッドでまとめて送信する
+            from langchain_core.tracers import LangChainTracer
+            return [LangChainTracer(project_name=self.project)]
+        return [SpanRecorder(self.processor, trace_name, metadata)]
+
+    async def shutdown(self) -> None:
+        """未出力のスパンを出力する"""
+        if self.processor is not None:
+            await self.processor.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        """トレースの設定とメトリクスを取得する"""
+        stats = {
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "skipped": self.skipped
+        }
+        if self.processor is not None:
+            stats["exporter"] = self.processor.stats()
+        return stats
+
+
+def create_tracer() -> Tracer:
+    """
+    環境変数に応じたトレーサーを作成する
+
+    TRACING_MODE: off（既定） / local（TRACING_FILE があればファイル、なければメモリに保存） / langsmith
+    TRACING_SAMPLE_RATE: トレースする実行の割合（0〜1）
+    """
+    mode = os.environ.get("TRACING_MODE", TRACING_OFF).lower()
+    sample_rate = float(os.environ.get("TRACING_SAMPLE_RATE", "0.1"))
+
+    processor = None
+    if mode == TRACING_LOCAL:
+        path = os.environ.get("TRACING_FILE")
+        exporter = FileSpanExporter(path) if path else InMemorySpanExporter()
+        processor = BufferedSpanProcessor(exporter)
+
+    return Tracer(
+        mode=mode,
+        sample_rate=sample_rate,
+        processor=processor,
+        project=os.environ.get("LANGCHAIN_PROJECT")
+    )
+
+
+# アプリ全体で共有するトレーサー
+tracer = create_tracer()
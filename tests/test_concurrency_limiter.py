@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+from app.services.concurrency_limiter import AdaptiveConcurrencyLimiter, LimiterQueueFullError, is_throttled
+
+
+class ResourceExhausted(Exception):
+    """google.api_core のスロットリングと同じ名前の例外"""
+
+
+def test_is_throttled():
+    assert is_throttled(ResourceExhausted())
+    assert is_throttled(type("HTTPError", (Exception,), {"status_code": 429})())
+    assert not is_throttled(type("HTTPError", (Exception,), {"status_code": 500})())
+    assert not is_throttled(ValueError())
+
+
+def test_limit_does_not_grow_while_underused():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8)
+
+    async def scenario() -> None:
+        for _ in range(50):
+            await limiter.acquire()
+            limiter.release(latency=0.1)
+
+    asyncio.run(scenario())
+
+    assert limiter.limit == 8
+    assert limiter.completed == 50
+
+
+def test_limit_grows_when_saturated():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4, max_limit=16)
+
+    async def scenario() -> None:
+        for _ in range(20):
+            for _ in range(int(limiter.limit)):
+                await limiter.acquire()
+            while limiter.in_flight:
+                limiter.release(latency=0.1)
+
+    asyncio.run(scenario())
+
+    assert limiter.limit > 4
+    assert limiter.limit <= 16
+
+
+def test_throttling_decreases_limit():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=10, min_limit=2, backoff_ratio=0.5)
+
+    async def scenario() -> None:
+        for _ in range(5):
+            await limiter.acquire()
+            limiter.release(throttled=True)
+
+    asyncio.run(scenario())
+
+    assert limiter.limit == 2
+    assert limiter.throttled == 5
+    assert limiter.decreases == 5
+
+
+def test_latency_spike_decreases_limit():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=10, latency_tolerance=2.0, backoff_ratio=0.5)
+
+    async def scenario() -> None:
+        await limiter.acquire()
+        limiter.release(latency=0.1)
+        await limiter.acquire()
+        limiter.release(latency=1.0)
+
+    asyncio.run(scenario())
+
+    assert limiter.limit == 5
+    assert limiter.baseline_latency == 0.1
+
+
+def test_release_without_latency_keeps_limit():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1)
+
+    async def scenario() -> None:
+        await limiter.acquire()
+        limiter.release()
+
+    asyncio.run(scenario())
+
+    assert limiter.limit == 1
+    assert limiter.in_flight == 0
+    assert limiter.baseline_latency is None
+
+
+def test_waiters_run_in_order_when_slots_free_up():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1)
+    order = []
+
+    async def worker(name: str) -> None:
+        await limiter.acquire()
+        order.append(name)
+        await asyncio.sleep(0)
+        limiter.release()
+
+    async def scenario() -> None:
+        await asyncio.gather(*(worker(name) for name in "abc"))
+
+    asyncio.run(scenario())
+
+    assert order == ["a", "b", "c"]
+    assert limiter.in_flight == 0
+
+
+def test_full_queue_rejects():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1, max_queue=1)
+
+    async def scenario() -> None:
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(LimiterQueueFullError):
+            await limiter.acquire()
+        limiter.release()
+        await waiter
+        limiter.release()
+
+    asyncio.run(scenario())
+
+    assert limiter.rejected == 1
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_waiter_leaves_queue():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1)
+
+    async def scenario() -> None:
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+
+    asyncio.run(scenario())
+
+    assert limiter.stats()["queue_depth"] == 0
+    assert limiter.in_flight == 0
+
+
+def test_run_releases_slot_and_reports_throttling():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4)
+
+    async def throttled() -> None:
+        raise ResourceExhausted()
+
+    async def ok() -> str:
+        return "ok"
+
+    async def scenario() -> None:
+        assert await limiter.run(ok) == "ok"
+        with pytest.raises(ResourceExhausted):
+            await limiter.run(throttled)
+
+    asyncio.run(scenario())
+
+    assert limiter.in_flight == 0
+    assert limiter.completed == 1
+    assert limiter.throttled == 1
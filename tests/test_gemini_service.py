@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import gemini_service as gemini_module
+from app.services.concurrency_limiter import AdaptiveConcurrencyLimiter
+from app.services.gemini_service import GeminiService
+from app.services.resilience import ResilienceManager, RetryPolicy
+
+
+class ServiceUnavailable(Exception):
+    """google.api_core の一時的な障害と同じ名前の例外"""
+
+
+class FakeResponse:
+    """generate_content_async(stream=True) の応答の代わり"""
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    async def __aiter__(self):
+        for text in self.texts:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(parts=[text], text=text)
+
+
+def make_service(monkeypatch, attempts):
+    """
+    attempts の順に「例外」または「チャンクのリスト」を返すモデルを使うサービスを作成する。
+    同時呼び出しの上限は1にし、リトライ中に枠を保持したままだと2回目の試行が進まないようにする
+    """
+    attempts = list(attempts)
+
+    class FakeModel:
+        def __init__(self, model_name, generation_config=None):
+            pass
+
+        async def generate_content_async(self, prompt, stream=False):
+            outcome = attempts.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return FakeResponse(outcome)
+
+    model = SimpleNamespace(name="models/gemini-2.0-flash", supported_generation_methods=["generateContent"])
+    monkeypatch.setattr(gemini_module, "genai", SimpleNamespace(
+        configure=lambda api_key: None,
+        list_models=lambda: [model],
+        GenerativeModel=FakeModel
+    ))
+    monkeypatch.setattr(gemini_module, "resilience", ResilienceManager(RetryPolicy(max_attempts=3, base_delay=0)))
+
+    service = GeminiService(api_key="test")
+    service.limiter = AdaptiveConcurrencyLimiter("gemini", initial_limit=1)
+    return service
+
+
+async def collect(service: GeminiService) -> str:
+    return "".join([text async for text in service.stream_text("prompt")])
+
+
+def test_stream_text_yields_all_chunks(monkeypatch):
+    service = make_service(monkeypatch, [["Hello", ", ", "world"]])
+
+    assert asyncio.run(collect(service)) == "Hello, world"
+    assert service.limiter.in_flight == 0
+    assert service.limiter.completed == 1
+
+
+def test_stream_text_releases_slot_between_retries(monkeypatch):
+    service = make_service(monkeypatch, [ServiceUnavailable(), ServiceUnavailable(), ["ok"]])
+
+    text = asyncio.run(asyncio.wait_for(collect(service), timeout=1))
+
+    assert text == "ok"
+    assert service.limiter.in_flight == 0
+    assert gemini_module.resilience.retry_policy.retries == 2
+
+
+def test_stream_text_releases_slot_when_retries_are_exhausted(monkeypatch):
+    service = make_service(monkeypatch, [ServiceUnavailable()] * 3)
+
+    with pytest.raises(ServiceUnavailable):
+        asyncio.run(asyncio.wait_for(collect(service), timeout=1))
+
+    assert service.limiter.in_flight == 0
+
+
+def test_stream_text_releases_slot_when_reader_stops_early(monkeypatch):
+    service = make_service(monkeypatch, [["a", "b", "c"]])
+
+    async def read_first() -> str:
+        stream = service.stream_text("prompt")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(read_first()) == "a"
+    assert service.limiter.in_flight == 0
+    # 読み終えていないストリームの遅延は上限の調整に使わない
+    assert service.limiter.completed == 0
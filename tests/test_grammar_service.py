@@ -0,0 +1,234 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from app.services.grammar_service import GrammarService
+from app.services.response_cache import ResponseCache
+
+
+def prompt_sentences(prompt: str):
+    """プロンプトに埋め込まれた文のリスト（[{"id", "text"}]）"""
+    return json.loads(re.search(r"SENTENCES: (.*)", prompt).group(1))
+
+
+class FakeGeminiService:
+    """
+    プロンプト内の文を読み取り、"goed" を "went" に訂正する結果を返すモデルの代わり。
+    最初の broken_calls 回は解析できない応答を返し、delay 秒かけて応答する
+    """
+
+    def __init__(self, broken_calls: int = 0, delay: float = 0.0):
+        self.prompts = []
+        self.broken_calls = broken_calls
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def generate_text(self, prompt: str, model_name: str = None) -> str:
+        self.prompts.append(prompt)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+        if len(self.prompts) <= self.broken_calls:
+            return "Sorry, I can't check these sentences right now."
+
+        results = []
+        for item in prompt_sentences(prompt):
+            corrections = []
+            if "goed" in item["text"]:
+                corrections.append({
+                    "original": "goed",
+                    "correction": "went",
+                    "explanation": "Past tense of go",
+                    "type": "verb tense"
+                })
+            results.append({"id": item["id"], "corrections": corrections})
+        return json.dumps(results)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I go to school. She like apples!", [(0, "I go to school."), (16, "She like apples!")]),
+    ('He said "Hi." Then left?!  Ok', [(0, 'He said "Hi."'), (14, "Then left?!"), (27, "Ok")]),
+    ("Line one\nLine two.", [(0, "Line one"), (9, "Line two.")]),
+    ("It costs 3.5 dollars. Next", [(0, "It costs 3.5 dollars."), (22, "Next")]),
+    ("No end", [(0, "No end")]),
+    ("", []),
+    ("   ", []),
+])
+def test_split_sentences(text, expected):
+    assert GrammarService.split_sentences(text) == expected
+
+
+def test_split_sentences_offsets_point_into_text():
+    text = "  First one.   Second one?\n\nThird one"
+    for start, sentence in GrammarService.split_sentences(text):
+        assert text[start:start + len(sentence)] == sentence
+
+
+def test_sentence_key_ignores_whitespace_differences():
+    assert GrammarService.sentence_key("I  goed\nhome.") == GrammarService.sentence_key(" I goed home. ")
+    assert GrammarService.sentence_key("I goed home.") != GrammarService.sentence_key("I went home.")
+
+
+def test_check_locates_corrections_in_original_text():
+    service = GrammarService(FakeGeminiService(), ResponseCache())
+    text = "It was fun. Yesterday I goed home."
+
+    result = asyncio.run(service.check(text))
+
+    assert result["sentence_count"] == 2
+    [correction] = result["corrections"]
+    assert correction["correction"] == "went"
+    assert text[correction["offset"]:correction["offset"] + correction["length"]] == "goed"
+
+
+def test_check_sends_only_new_sentences_to_the_model():
+    gemini = FakeGeminiService()
+    service = GrammarService(gemini, ResponseCache())
+
+    asyncio.run(service.check("It was fun. Yesterday I goed home."))
+    result = asyncio.run(service.check("It was fun. Yesterday I goed home. Then I slept."))
+
+    assert result["cached_sentence_count"] == 2
+    assert len(result["corrections"]) == 1
+    assert len(gemini.prompts) == 2
+    assert "It was fun." not in gemini.prompts[1]
+    assert "Then I slept." in gemini.prompts[1]
+
+    asyncio.run(service.check("It was fun."))
+    assert len(gemini.prompts) == 2
+
+
+def located(text: str, corrections):
+    """訂正が指しているテキストの部分"""
+    return [text[c["offset"]:c["offset"] + c["length"]] for c in corrections]
+
+
+def test_check_batch_packs_sentences_within_prompt_limit():
+    gemini = FakeGeminiService()
+    service = GrammarService(gemini, ResponseCache(), max_prompt_chars=25)
+    items = [("a", "I goed home."), ("b", "It was fun."), ("c", "We ate rice."), ("d", "Then I slept.")]
+
+    asyncio.run(service.check_batch(items))
+
+    packed = [[item["text"] for item in prompt_sentences(prompt)] for prompt in gemini.prompts]
+    assert sorted(sentence for pack in packed for sentence in pack) == sorted(text for _, text in items)
+    assert len(packed) == 2
+    assert all(sum(len(sentence) for sentence in pack) <= 25 for pack in packed)
+
+
+def test_check_batch_returns_results_in_input_order():
+    gemini = FakeGeminiService()
+    service = GrammarService(gemini, ResponseCache())
+    items = [
+        ("first", "It was fun. Yesterday I goed home."),
+        ("second", "We ate rice."),
+        ("third", "Yesterday I goed home. We goed out."),
+    ]
+
+    results = asyncio.run(service.check_batch(items))
+
+    assert [result["id"] for result in results] == ["first", "second", "third"]
+    for (_, text), result in zip(items, results):
+        assert result["original_text"] == text
+        assert located(text, result["corrections"]) == ["goed"] * text.count("goed")
+    # 複数のテキストに含まれる同じ文は1回だけ送る
+    assert len(gemini.prompts) == 1
+    assert len(prompt_sentences(gemini.prompts[0])) == 4
+
+
+def test_check_batch_rechecks_items_when_batch_response_is_unparseable():
+    gemini = FakeGeminiService(broken_calls=1)
+    service = GrammarService(gemini, ResponseCache())
+    items = [("a", "I goed home."), ("b", "It was fun. We goed out.")]
+
+    results = asyncio.run(service.check_batch(items))
+
+    assert service.fallback_calls == 2
+    assert len(gemini.prompts) == 3
+    assert [located(text, result["corrections"]) for (_, text), result in zip(items, results)] == [
+        ["goed"], ["goed"]
+    ]
+    assert all("message" not in result for result in results)
+
+
+def test_check_batch_reports_items_that_could_not_be_checked():
+    gemini = FakeGeminiService(broken_calls=2)
+    service = GrammarService(gemini, ResponseCache())
+
+    [result] = asyncio.run(service.check_batch([("a", "I goed home.")]))
+
+    assert result["corrections"] == []
+    assert result["message"] == "Sorry, I can't check these sentences right now."
+
+
+def test_split_chunks_end_on_sentence_boundaries():
+    service = GrammarService(FakeGeminiService(), ResponseCache(), chunk_chars=40)
+    text = (
+        "I goed home. It was fun.\n\n"
+        "We ate rice and talked for a long time. Then we goed out. It was late.\n\n"
+        "Short one."
+    )
+
+    chunks = service.split_chunks(text)
+
+    previous_end = 0
+    for start, chunk in chunks:
+        assert text[start:start + len(chunk)] == chunk
+        assert start >= previous_end
+        assert len(chunk) <= 40
+        assert chunk.rstrip()[-1] in ".!?"
+        previous_end = start + len(chunk)
+    # 長すぎる段落は文単位で分け、段落の途中で文を切らない
+    sentences = [sentence for _, sentence in GrammarService.split_sentences(text)]
+    assert [sentence for _, chunk in chunks for _, sentence in GrammarService.split_sentences(chunk)] == sentences
+
+
+def test_split_chunks_keeps_paragraphs_together_when_they_fit():
+    service = GrammarService(FakeGeminiService(), ResponseCache(), chunk_chars=100)
+    text = "First paragraph.\n\nSecond paragraph.\n\n\n"
+
+    assert service.split_chunks(text) == [(0, "First paragraph.\n\nSecond paragraph.")]
+    assert service.split_chunks("") == []
+
+
+def test_check_document_shifts_offsets_to_document():
+    service = GrammarService(FakeGeminiService(), ResponseCache(), chunk_chars=30)
+    text = "It was fun. I goed home.\n\nThen we goed out. We slept.\n\nThey goed too."
+
+    result = asyncio.run(service.check_document(text))
+
+    assert result["chunk_count"] == 3
+    assert located(text, result["corrections"]) == ["goed"] * 3
+    assert [c["offset"] for c in result["corrections"]] == [m.start() for m in re.finditer("goed", text)]
+
+
+def test_iter_document_chunk_offsets():
+    service = GrammarService(FakeGeminiService(), ResponseCache(), chunk_chars=30)
+    text = "It was fun. I goed home.\n\nThen we goed out. We slept."
+
+    async def collect():
+        return [result async for result in service.iter_document(text)]
+
+    for result in asyncio.run(collect()):
+        start, length = result["chunk_offset"], result["chunk_length"]
+        assert result["original_text"] == text[start:start + length]
+        for correction in result["corrections"]:
+            assert start <= correction["offset"] < start + length
+
+
+def test_iter_document_limits_parallel_chunks():
+    gemini = FakeGeminiService(delay=0.01)
+    service = GrammarService(gemini, ResponseCache(), chunk_chars=20, max_concurrency=2)
+    text = "\n\n".join(f"Sentence number {i}." for i in range(6))
+
+    result = asyncio.run(service.check_document(text))
+
+    assert result["chunk_count"] == 6
+    assert gemini.max_active == 2
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from app.services import idempotency as idempotency_module
+from app.services.idempotency import IdempotencyKeyConflictError, IdempotencyStore
+
+
+class Counter:
+    """呼ばれた回数を返す処理（fail=True の場合は失敗する）"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return {"reply": self.calls}
+
+
+def test_completed_result_is_replayed():
+    store = IdempotencyStore()
+    func = Counter()
+
+    async def scenario():
+        return [await store.run("key", "body", func) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [({"reply": 1}, False), ({"reply": 1}, True)]
+    assert func.calls == 1
+    assert store.stats()["replayed"] == 1
+
+
+def test_in_flight_duplicate_joins_first_execution():
+    store = IdempotencyStore()
+    func = Counter()
+
+    async def scenario():
+        return await asyncio.gather(store.run("key", "body", func), store.run("key", "body", func))
+
+    assert asyncio.run(scenario()) == [({"reply": 1}, False), ({"reply": 1}, True)]
+    assert store.stats()["joined"] == 1
+
+
+def test_same_key_with_different_request_conflicts():
+    store = IdempotencyStore()
+
+    async def scenario():
+        await store.run("key", "body", Counter())
+        await store.run("key", "other body", Counter())
+
+    with pytest.raises(IdempotencyKeyConflictError):
+        asyncio.run(scenario())
+    assert store.stats()["conflicts"] == 1
+
+
+def test_failed_execution_releases_key():
+    store = IdempotencyStore()
+    failing = Counter(fail=True)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await store.run("key", "body", failing)
+        # 異なる内容でも、失敗したキーは再利用できる
+        return await store.run("key", "other body", Counter())
+
+    assert asyncio.run(scenario()) == ({"reply": 1}, False)
+    assert store.stats()["failures"] == 1
+
+
+def test_results_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(idempotency_module.time, "monotonic", lambda: now[0])
+    store = IdempotencyStore(ttl_seconds=10)
+    func = Counter()
+
+    async def scenario():
+        await store.run("key", "body", func)
+        now[0] += 10
+        return await store.run("key", "body", func)
+
+    assert asyncio.run(scenario()) == ({"reply": 2}, False)
+
+
+def test_oldest_completed_results_are_evicted():
+    store = IdempotencyStore(max_size=2)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await store.run(key, "body", Counter())
+
+    asyncio.run(scenario())
+
+    assert store.stats()["size"] == 2
+
+
+def test_expired_results_are_purged_in_completion_order(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(idempotency_module.time, "monotonic", lambda: now[0])
+    store = IdempotencyStore(ttl_seconds=10)
+
+    async def scenario():
+        await store.run("a", "body", Counter())
+        now[0] += 5
+        await store.run("b", "body", Counter())
+        now[0] += 5
+        # a だけが期限切れになる
+        await store.run("c", "body", Counter())
+
+    asyncio.run(scenario())
+
+    assert store.stats()["size"] == 2
+    assert store.stats()["in_flight"] == 0
+
+
+def test_in_flight_entries_are_not_evicted():
+    store = IdempotencyStore(max_size=1)
+    release = None
+
+    async def slow():
+        await release.wait()
+        return "slow"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.ensure_future(store.run("a", "body", slow))
+        await asyncio.sleep(0)
+        await store.run("b", "body", Counter())
+        assert store.stats()["in_flight"] == 1
+        release.set()
+        return await first, await store.run("a", "body", slow)
+
+    assert asyncio.run(scenario()) == (("slow", False), ("slow", True))
@@ -0,0 +1,161 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import ecdsa
+import pytest
+import rsa
+from jose import jwk, jwt
+
+from app.utils.jwt_verifier import InvalidTokenError, SupabaseJWTVerifier
+
+SECRET = "test-secret"
+
+
+def claims(**overrides):
+    values = {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 3600, "email": "a@example.com"}
+    values.update(overrides)
+    return values
+
+
+def public_jwk(pem: str, algorithm: str, kid: str, include_alg: bool = True):
+    key = jwk.construct(pem, algorithm).public_key().to_dict()
+    key["kid"] = kid
+    if not include_alg:
+        key.pop("alg", None)
+    return key
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def b64_json(data) -> str:
+    return b64(json.dumps(data).encode("utf-8"))
+
+
+def unsigned_token(payload) -> str:
+    """alg: none のトークン"""
+    return f"{b64_json({'alg': 'none', 'typ': 'JWT'})}.{b64_json(payload)}."
+
+
+def make_verifier(jwks=(), jwt_secret=SECRET) -> SupabaseJWTVerifier:
+    """JWKSを取得済みの状態の検証器を作成する"""
+    verifier = SupabaseJWTVerifier(supabase_url="https://example.supabase.co", jwt_secret=jwt_secret)
+    verifier._jwks = {key["kid"]: key for key in jwks}
+    verifier._jwks_fetched_at = time.monotonic()
+    return verifier
+
+
+def verify(verifier: SupabaseJWTVerifier, token: str):
+    return asyncio.run(verifier.verify(token))
+
+
+@pytest.fixture(scope="module")
+def rsa_pem() -> str:
+    _, private_key = rsa.newkeys(1024)
+    return private_key.save_pkcs1().decode("ascii")
+
+
+@pytest.fixture(scope="module")
+def ec_pem() -> str:
+    return ecdsa.SigningKey.generate(curve=ecdsa.NIST256p).to_pem().decode("ascii")
+
+
+def test_hs256_token_is_verified_with_secret():
+    verifier = make_verifier()
+
+    user = verify(verifier, jwt.encode(claims(), SECRET, algorithm="HS256"))
+
+    assert user.id == "user-1"
+    assert user.email == "a@example.com"
+    assert verifier.local_verifications == 1
+
+
+def test_verified_users_are_cached():
+    verifier = make_verifier()
+    token = jwt.encode(claims(), SECRET, algorithm="HS256")
+
+    verify(verifier, token)
+    verify(verifier, token)
+
+    assert verifier.local_verifications == 1
+    assert verifier.cache_hits == 1
+
+
+@pytest.mark.parametrize("token", [
+    jwt.encode(claims(), "other-secret", algorithm="HS256"),
+    jwt.encode(claims(exp=int(time.time()) - 3600), SECRET, algorithm="HS256"),
+    jwt.encode(claims(aud="anon"), SECRET, algorithm="HS256"),
+    "not-a-token",
+])
+def test_invalid_hs256_tokens_are_rejected(token):
+    with pytest.raises(InvalidTokenError):
+        verify(make_verifier(), token)
+
+
+def test_hs256_without_secret_is_unverifiable():
+    verifier = make_verifier(jwt_secret=None)
+
+    assert verify(verifier, jwt.encode(claims(), SECRET, algorithm="HS256")) is None
+    assert verifier.unverifiable == 1
+
+
+def test_unsigned_token_is_rejected():
+    verifier = make_verifier()
+
+    with pytest.raises(InvalidTokenError):
+        verify(verifier, unsigned_token(claims()))
+    assert verifier.rejected == 1
+
+
+@pytest.mark.parametrize("algorithm", ["HS384", "HS512"])
+def test_unexpected_algorithms_are_rejected(algorithm):
+    with pytest.raises(InvalidTokenError):
+        verify(make_verifier(), jwt.encode(claims(), SECRET, algorithm=algorithm))
+
+
+@pytest.mark.parametrize("include_alg", [True, False])
+def test_rs256_token_is_verified_with_jwks(rsa_pem, include_alg):
+    verifier = make_verifier([public_jwk(rsa_pem, "RS256", "rsa-key", include_alg)])
+    token = jwt.encode(claims(), rsa_pem, algorithm="RS256", headers={"kid": "rsa-key"})
+
+    assert verify(verifier, token).id == "user-1"
+
+
+def test_es256_token_is_verified_with_jwks(ec_pem):
+    verifier = make_verifier([public_jwk(ec_pem, "ES256", "ec-key")])
+    token = jwt.encode(claims(), ec_pem, algorithm="ES256", headers={"kid": "ec-key"})
+
+    assert verify(verifier, token).id == "user-1"
+
+
+def test_header_algorithm_must_match_key(rsa_pem, ec_pem):
+    verifier = make_verifier([public_jwk(ec_pem, "ES256", "ec-key")])
+    # EC鍵のkidを指定したRS256のトークン
+    token = jwt.encode(claims(), rsa_pem, algorithm="RS256", headers={"kid": "ec-key"})
+
+    with pytest.raises(InvalidTokenError):
+        verify(verifier, token)
+
+
+def test_public_key_cannot_be_used_as_hmac_secret(rsa_pem):
+    verifier = make_verifier([public_jwk(rsa_pem, "RS256", "rsa-key")])
+    public_pem = jwk.construct(rsa_pem, "RS256").public_key().to_pem().decode("ascii")
+    # 公開鍵をHMACのシークレットとして署名したトークン（アルゴリズムの取り違えを狙う）
+    signing_input = f"{b64_json({'alg': 'HS256', 'typ': 'JWT', 'kid': 'rsa-key'})}.{b64_json(claims())}"
+    signature = hmac.new(public_pem.encode("ascii"), signing_input.encode("ascii"), hashlib.sha256).digest()
+    token = f"{signing_input}.{b64(signature)}"
+
+    with pytest.raises(InvalidTokenError):
+        verify(verifier, token)
+
+
+def test_unknown_kid_is_unverifiable(rsa_pem):
+    verifier = make_verifier([])
+    token = jwt.encode(claims(), rsa_pem, algorithm="RS256", headers={"kid": "unknown"})
+
+    assert verify(verifier, token) is None
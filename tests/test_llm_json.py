@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from app.utils.llm_json import IncrementalJSONArrayParser, parse_json_text
+
+ITEMS = [
+    {"word": "apple", "mean": "りんご", "examples": ["An apple a day.", "[sic] \"quoted\" }"]},
+    {"word": "run", "nested": {"list": [1, [2, 3]], "empty": {}}},
+    "plain string, with comma",
+    42,
+    None,
+]
+
+
+def feed_all(chunks):
+    parser = IncrementalJSONArrayParser()
+    elements = []
+    for chunk in chunks:
+        elements.extend(parser.feed(chunk))
+    return parser, elements
+
+
+@pytest.mark.parametrize("text", [
+    '[{"a": 1}]',
+    '```json\n[{"a": 1}]\n```',
+    '  ```\n[{"a": 1}]```',
+])
+def test_parse_json_text_strips_code_fences(text):
+    assert parse_json_text(text) == [{"a": 1}]
+
+
+def test_parse_json_text_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_json_text("Sorry, I can't help with that.")
+
+
+def test_whole_array_in_one_chunk():
+    parser, elements = feed_all([json.dumps(ITEMS)])
+
+    assert elements == ITEMS
+    assert parser.finished
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_any_chunking_gives_same_elements(size):
+    text = "```json\n" + json.dumps(ITEMS, ensure_ascii=False, indent=2) + "\n```"
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+
+    parser, elements = feed_all(chunks)
+
+    assert elements == ITEMS
+    assert parser.finished
+
+
+def test_elements_are_returned_as_soon_as_complete():
+    parser = IncrementalJSONArrayParser()
+
+    assert parser.feed('[{"word": "apple"}, {"word": ') == [{"word": "apple"}]
+    assert parser.feed('"run"}') == [{"word": "run"}]
+    assert not parser.finished
+    assert parser.feed("]") == []
+    assert parser.finished
+
+
+def test_last_scalar_element_completes_at_end_of_array():
+    parser = IncrementalJSONArrayParser()
+
+    assert parser.feed("[1, 2") == [1]
+    assert parser.feed("]") == [2]
+
+
+def test_text_after_array_is_ignored():
+    parser, elements = feed_all(['[1]\n```\nHope this helps! [2]'])
+
+    assert elements == [1]
+    assert parser.finished
+
+
+def test_escaped_quotes_and_brackets_inside_strings():
+    parser, elements = feed_all(['["say \\"hi\\" ]", "back\\\\", "{["]'])
+
+    assert elements == ['say "hi" ]', "back\\", "{["]
+
+
+def test_empty_array():
+    parser, elements = feed_all(["[", " ", "]"])
+
+    assert elements == []
+    assert parser.finished
+
+
+def test_text_before_array_is_skipped():
+    parser, elements = feed_all(["Here are the words:\n", "[{\"a\": 1}]"])
+
+    assert elements == [{"a": 1}]
+
+
+def test_incomplete_array_is_not_finished():
+    parser, elements = feed_all(['[{"a": 1}, {"b": '])
+
+    assert elements == [{"a": 1}]
+    assert not parser.finished
+
+
+def test_invalid_element_raises_value_error():
+    parser = IncrementalJSONArrayParser()
+
+    with pytest.raises(ValueError):
+        parser.feed("[{'a': 1}]")
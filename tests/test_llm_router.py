@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.llm_router import FakeProvider, LLMRouter
+from app.services.model_tiering import LIGHT_TIER, STANDARD_TIER
+from app.services.resilience import CircuitOpenError, ResilienceManager, RetryPolicy
+
+
+class TrackingProvider(FakeProvider):
+    """キャンセルされた呼び出しの数を数える疑似プロバイダ"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cancelled = 0
+
+    async def generate(self, prompt: str, temperature: float = 0.5) -> str:
+        try:
+            return await super().generate(prompt, temperature)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def provider(model: str, latency: float = 0.0, failure_rate: float = 0.0, tier: str = STANDARD_TIER):
+    return TrackingProvider(model, latency=latency, failure_rate=failure_rate, response="from {model}", tier=tier)
+
+
+def make_router(providers, **kwargs) -> LLMRouter:
+    manager = ResilienceManager(RetryPolicy(max_attempts=1, base_delay=0), failure_threshold=1)
+    return LLMRouter(providers, resilience_manager=manager, **kwargs)
+
+
+def warm_up(router: LLMRouter, provider: FakeProvider, latency: float, ok: bool = True) -> None:
+    """プロバイダの統計に min_samples 件の結果を記録する"""
+    for _ in range(router.min_samples):
+        router.stats_by_provider[provider.key].record(latency, ok)
+
+
+def generate(router: LLMRouter, tier: str = None) -> str:
+    return asyncio.run(router.generate("Hello", tier=tier))
+
+
+def test_rank_puts_requested_tier_first():
+    standard = provider("standard")
+    light = provider("light", tier=LIGHT_TIER)
+    router = make_router([standard, light])
+
+    assert router.rank(LIGHT_TIER) == [light, standard]
+    assert router.rank(STANDARD_TIER) == [standard, light]
+
+
+def test_rank_orders_by_latency_within_tier():
+    slow = provider("slow")
+    fast = provider("fast")
+    light = provider("light", tier=LIGHT_TIER)
+    router = make_router([slow, fast, light])
+    warm_up(router, slow, 0.5)
+    warm_up(router, fast, 0.1)
+    warm_up(router, light, 0.01)
+
+    # 遅延の小さい軽量モデルよりも、指定したティアのプロバイダを優先する
+    assert router.rank(STANDARD_TIER) == [fast, slow, light]
+
+
+def test_providers_without_samples_are_tried_first():
+    warm = provider("warm")
+    cold = provider("cold")
+    router = make_router([warm, cold])
+    warm_up(router, warm, 0.01)
+
+    assert router.rank() == [cold, warm]
+
+
+def test_unhealthy_provider_is_ranked_last():
+    broken = provider("broken")
+    healthy = provider("healthy")
+    router = make_router([broken, healthy])
+    warm_up(router, broken, 0.01, ok=False)
+    warm_up(router, healthy, 0.5)
+
+    assert router.rank() == [healthy, broken]
+    assert generate(router) == "from healthy"
+    assert broken.calls == 0
+
+
+def test_provider_with_open_circuit_is_skipped():
+    primary = provider("primary")
+    secondary = provider("secondary")
+    router = make_router([primary, secondary])
+    router.resilience.breaker(primary.key).record_failure()
+
+    assert generate(router) == "from secondary"
+    assert primary.calls == 0
+
+
+def test_all_circuits_open_raises_without_calling():
+    only = provider("only")
+    router = make_router([only])
+    router.resilience.breaker(only.key).record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        generate(router)
+    assert only.calls == 0
+
+
+def test_falls_back_when_primary_raises():
+    primary = provider("primary", failure_rate=1.0)
+    secondary = provider("secondary")
+    router = make_router([primary, secondary])
+
+    assert generate(router) == "from secondary"
+    assert primary.calls == 1
+    assert router.stats_by_provider[primary.key].errors == 1
+    assert router.stats_by_provider[secondary.key].errors == 0
+
+
+def test_raises_last_error_when_all_providers_fail():
+    router = make_router([provider("a", failure_rate=1.0), provider("b", failure_rate=1.0)])
+
+    with pytest.raises(RuntimeError):
+        generate(router)
+    assert router.stats()["tiers"][STANDARD_TIER]["errors"] == 1
+
+
+def test_hedge_fires_after_delay_and_cancels_slower_call():
+    primary = provider("primary", latency=1.0)
+    secondary = provider("secondary", latency=0.01)
+    router = make_router([primary, secondary], hedge_enabled=True)
+    warm_up(router, primary, 0.05)
+    warm_up(router, secondary, 0.1)
+
+    started_at = time.monotonic()
+    assert generate(router) == "from secondary"
+
+    assert time.monotonic() - started_at < 0.5
+    assert primary.cancelled == 1
+    assert router.hedged_requests == 1
+    assert router.hedge_wins == 1
+    # ヘッジで負けてキャンセルされた呼び出しはエラーとして数えない
+    assert router.stats_by_provider[primary.key].errors == 0
+
+
+def test_hedge_does_not_fire_when_primary_is_fast():
+    primary = provider("primary", latency=0.0)
+    secondary = provider("secondary")
+    router = make_router([primary, secondary], hedge_enabled=True)
+    warm_up(router, primary, 0.2)
+    warm_up(router, secondary, 0.3)
+
+    assert generate(router) == "from primary"
+    assert secondary.calls == 0
+    assert router.hedged_requests == 0
+
+
+def test_hedge_falls_back_when_primary_fails_before_delay():
+    primary = provider("primary", failure_rate=1.0)
+    secondary = provider("secondary", latency=0.01)
+    router = make_router([primary, secondary], hedge_enabled=True, max_error_rate=1.0)
+    warm_up(router, primary, 0.2)
+    warm_up(router, secondary, 0.3)
+
+    assert generate(router) == "from secondary"
+    assert router.hedged_requests == 1
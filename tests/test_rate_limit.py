@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.models.models import AuthenticatedUser
+from app.utils import rate_limit
+from app.utils.jwt_verifier import InvalidTokenError
+
+
+def make_request(authorization: str = None, host: str = "203.0.113.7"):
+    """get_client_identity が参照する属性だけを持つリクエスト"""
+    headers = {"Authorization": authorization} if authorization else {}
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=host))
+
+
+def use_verifier(monkeypatch, users):
+    """トークン -> ユーザー（Noneの場合は検証できないトークン）で結果を返す検証処理に差し替える"""
+    async def verify(token: str):
+        if token not in users:
+            raise InvalidTokenError("Invalid token")
+        return users[token]
+
+    monkeypatch.setattr(rate_limit.jwt_verifier, "verify", verify)
+
+
+def identity(request) -> str:
+    return asyncio.run(rate_limit.get_client_identity(request))
+
+
+def test_verified_token_uses_subject(monkeypatch):
+    use_verifier(monkeypatch, {"good": AuthenticatedUser(id="user-1")})
+
+    assert identity(make_request("Bearer good")) == "user:user-1"
+
+
+def test_invalid_token_falls_back_to_ip(monkeypatch):
+    use_verifier(monkeypatch, {})
+
+    assert identity(make_request("Bearer forged")) == "ip:203.0.113.7"
+
+
+def test_unverifiable_token_falls_back_to_ip(monkeypatch):
+    use_verifier(monkeypatch, {"unknown": None})
+
+    assert identity(make_request("Bearer unknown")) == "ip:203.0.113.7"
+
+
+def test_changing_unverified_tokens_keeps_the_same_identity(monkeypatch):
+    use_verifier(monkeypatch, {})
+
+    identities = {identity(make_request(f"Bearer token-{i}")) for i in range(3)}
+
+    assert identities == {"ip:203.0.113.7"}
+
+
+def test_missing_client_is_unknown():
+    request = SimpleNamespace(headers={}, client=None)
+
+    assert identity(request) == "ip:unknown"
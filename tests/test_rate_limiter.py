@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.services import rate_limiter as rate_limiter_module
+from app.services.rate_limiter import InMemoryRateLimitStore, RateLimiter
+
+
+class FakeClock:
+    """time.monotonic の代わりに使う、手動で進める時計"""
+
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", clock)
+    return clock
+
+
+def consume(store: InMemoryRateLimitStore, key: str, capacity: float, refill_rate: float):
+    return asyncio.run(store.consume(key, capacity, refill_rate))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("30/60", (30.0, 60.0)),
+    ("5/1", (5.0, 1.0)),
+    ("10", (10.0, 60.0)),
+])
+def test_parse_budget(value, expected):
+    assert RateLimiter.parse_budget(value) == expected
+
+
+def test_bucket_allows_burst_up_to_capacity(clock):
+    store = InMemoryRateLimitStore()
+
+    results = [consume(store, "chat:user:1", 3, 1)[0] for _ in range(4)]
+
+    assert results == [True, True, True, False]
+
+
+def test_bucket_refills_over_time(clock):
+    store = InMemoryRateLimitStore()
+    for _ in range(2):
+        consume(store, "key", 2, 0.5)
+
+    allowed, retry_after, _ = consume(store, "key", 2, 0.5)
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+
+    clock.now += 2
+    assert consume(store, "key", 2, 0.5)[0]
+
+
+def test_refill_does_not_exceed_capacity(clock):
+    store = InMemoryRateLimitStore()
+    consume(store, "key", 2, 1)
+
+    clock.now += 100
+    _, _, tokens = consume(store, "key", 2, 1)
+
+    assert tokens == 1
+
+
+def test_least_recently_used_buckets_are_dropped(clock):
+    store = InMemoryRateLimitStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        consume(store, key, 1, 1)
+
+    assert len(store) == 2
+    # a のバケットは捨てられたため、満タンの状態から始まる
+    assert consume(store, "a", 1, 1)[0]
+    assert not consume(store, "c", 1, 1)[0]
+
+
+def test_limiter_budgets_are_per_scope_and_identity(clock):
+    limiter = RateLimiter(InMemoryRateLimitStore(), {"chat": (1, 60), "grammar": (2, 60)})
+
+    def check(scope: str, identity: str):
+        return asyncio.run(limiter.check(scope, identity))
+
+    assert check("chat", "user:1") == (True, 0.0, 1)
+    allowed, retry_after, limit = check("chat", "user:1")
+    assert not allowed
+    assert retry_after == pytest.approx(60.0)
+    assert limit == 1
+
+    assert check("chat", "user:2")[0]
+    assert check("grammar", "user:1")[0]
+    assert check("unknown", "user:1") == (True, 0.0, None)
+
+    stats = limiter.stats()
+    assert stats["chat"]["allowed"] == 2
+    assert stats["chat"]["limited"] == 1
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from app.services import resilience as resilience_module
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilienceManager,
+    RetryPolicy,
+    is_retryable,
+)
+
+
+class ServiceUnavailable(Exception):
+    """google.api_core の一時的な障害と同じ名前の例外"""
+
+
+class FakeClock:
+    """time.monotonic の代わりに使う、手動で進める時計"""
+
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Flaky:
+    """指定した回数だけ失敗してから成功する呼び出し"""
+
+    def __init__(self, failures: int, error: Exception = None):
+        self.failures = failures
+        self.error = error or ServiceUnavailable("unavailable")
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+    async def acall(self) -> str:
+        return self()
+
+
+def make_manager(max_attempts: int = 3, failure_threshold: int = 3) -> ResilienceManager:
+    return ResilienceManager(RetryPolicy(max_attempts=max_attempts, base_delay=0), failure_threshold, 30.0)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (ServiceUnavailable(), True),
+    (asyncio.TimeoutError(), True),
+    (ConnectionError(), True),
+    (type("HTTPError", (Exception,), {"status_code": 503})(), True),
+    (type("HTTPError", (Exception,), {"status_code": 400})(), False),
+    (ValueError("bad request"), False),
+    (CircuitOpenError("gemini", 1.0), False),
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_breaker_opens_after_threshold_and_recovers(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience_module.time, "monotonic", clock)
+    breaker = CircuitBreaker("gemini", failure_threshold=2, recovery_timeout=10)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 半開状態では試験的な呼び出しを1つだけ許可する
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_half_open_failure_reopens(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience_module.time, "monotonic", clock)
+    breaker = CircuitBreaker("gemini", failure_threshold=1, recovery_timeout=10)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == 10
+
+
+def test_release_returns_half_open_slot(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience_module.time, "monotonic", clock)
+    breaker = CircuitBreaker("gemini", failure_threshold=1, recovery_timeout=10)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 10
+
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_call_retries_transient_errors():
+    manager = make_manager()
+    func = Flaky(failures=2)
+
+    assert asyncio.run(manager.call("gemini", func.acall)) == "ok"
+    assert func.calls == 3
+    assert manager.retry_policy.retries == 2
+    assert manager.breaker("gemini").consecutive_failures == 0
+
+
+def test_call_does_not_retry_permanent_errors():
+    manager = make_manager()
+    func = Flaky(failures=1, error=ValueError("bad request"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(manager.call("gemini", func.acall))
+    assert func.calls == 1
+    assert manager.breaker("gemini").consecutive_failures == 0
+
+
+def test_breaker_counts_one_failure_per_logical_call():
+    manager = make_manager(max_attempts=3, failure_threshold=3)
+    func = Flaky(failures=100)
+
+    for expected_failures in (1, 2):
+        with pytest.raises(ServiceUnavailable):
+            asyncio.run(manager.call("gemini", func.acall))
+        assert manager.breaker("gemini").consecutive_failures == expected_failures
+        assert manager.breaker("gemini").state == CircuitBreaker.CLOSED
+    assert func.calls == 6
+
+    with pytest.raises(ServiceUnavailable):
+        asyncio.run(manager.call("gemini", func.acall))
+    assert manager.breaker("gemini").state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(manager.call("gemini", func.acall))
+    assert func.calls == 9
+
+
+def test_call_sync_counts_one_failure_per_logical_call():
+    manager = make_manager(max_attempts=2, failure_threshold=2)
+    func = Flaky(failures=100)
+
+    with pytest.raises(ServiceUnavailable):
+        manager.call_sync("anthropic", func)
+
+    assert func.calls == 2
+    assert manager.breaker("anthropic").consecutive_failures == 1
+
+
+def test_breakers_are_separate_per_name():
+    manager = make_manager(max_attempts=1, failure_threshold=1)
+
+    with pytest.raises(ServiceUnavailable):
+        manager.call_sync("gemini/flash", Flaky(failures=1))
+
+    assert manager.breaker("gemini/flash").state == CircuitBreaker.OPEN
+    assert manager.call_sync("gemini/pro", Flaky(failures=0)) == "ok"
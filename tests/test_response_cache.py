@@ -0,0 +1,162 @@
+import asyncio
+import os
+
+from app.services import response_cache
+from app.services.response_cache import ResponseCache
+
+
+class FakeClock:
+    """time.time の代わりに使う、手動で進める時計"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_make_key_normalizes_whitespace_and_case():
+    assert ResponseCache.make_key(" Travel  Words ", "Beginner", None) == "travel words|beginner|"
+    assert ResponseCache.make_key("a", 1) != ResponseCache.make_key("a", 2)
+
+
+def test_get_returns_none_for_missing_key():
+    cache = ResponseCache()
+
+    assert cache.get("missing") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    cache = ResponseCache(ttl_seconds=10)
+
+    cache.set("key", "value")
+    clock.now += 9
+    assert cache.get("key") == "value"
+
+    clock.now += 1
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_per_entry_ttl_overrides_default(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    cache = ResponseCache(ttl_seconds=10)
+
+    cache.set("short", 1, ttl_seconds=1)
+    cache.set("long", 2)
+    clock.now += 5
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # a を使うと b が最も古くなる
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_set_many_respects_max_size():
+    cache = ResponseCache(max_size=2)
+
+    cache.set_many({"a": 1, "b": 2, "c": 3})
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+
+
+def test_delete_and_clear_count_invalidations():
+    cache = ResponseCache()
+    cache.set_many({"a": 1, "b": 2, "c": 3})
+
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+
+    cache.clear()
+    assert cache.get("b") is None
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_writes_are_not_saved_until_flush(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(storage_path=path)
+
+    cache.set("key", {"words": ["apple"]})
+    assert not os.path.exists(path)
+    assert cache.stats()["unsaved_changes"]
+
+    cache.flush()
+    assert os.path.exists(path)
+    assert not cache.stats()["unsaved_changes"]
+    assert ResponseCache(storage_path=path).get("key") == {"words": ["apple"]}
+
+
+def test_flush_without_changes_does_not_rewrite(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(storage_path=path)
+    cache.set("key", "value")
+
+    cache.flush()
+    cache.flush()
+
+    assert cache.stats()["flushes"] == 1
+
+
+def test_expired_entries_are_not_loaded(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(ttl_seconds=10, storage_path=path)
+    cache.set("key", "value")
+    cache.flush()
+
+    clock.now += 10
+
+    assert ResponseCache(storage_path=path).get("key") is None
+
+
+def test_background_flush_saves_periodically_and_on_stop(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(storage_path=path)
+
+    async def scenario() -> None:
+        cache.start_flush(0.01)
+        cache.set("a", 1)
+        await asyncio.sleep(0.1)
+        assert ResponseCache(storage_path=path).get("a") == 1
+
+        cache.set("b", 2)
+        await cache.stop_flush()
+
+    asyncio.run(scenario())
+
+    assert ResponseCache(storage_path=path).get("b") == 2
+
+
+def test_failed_flush_keeps_changes_for_next_flush(tmp_path):
+    path = tmp_path / "cache.json"
+    # 保存先がディレクトリのため置き換えに失敗する
+    path.mkdir()
+    cache = ResponseCache(storage_path=str(path))
+    cache.set("key", "value")
+
+    cache.flush()
+
+    assert cache.stats()["unsaved_changes"]
+    assert cache.stats()["flushes"] == 0
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.models import ReviewCard
+from app.services.review_scheduler import DEFAULT_EASE_FACTOR, MIN_EASE_FACTOR, ReviewScheduler, schedule_next
+
+NOW = datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def new_card(**overrides) -> ReviewCard:
+    values = {"word_id": 1, "due_at": NOW}
+    values.update(overrides)
+    return ReviewCard(**values)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_first_passing_reviews_use_fixed_intervals():
+    card = schedule_next(new_card(), 4, NOW)
+    assert card.interval_days == 1
+    assert card.repetitions == 1
+    assert card.due_at == NOW + timedelta(days=1)
+    assert card.last_reviewed_at == NOW
+
+    card = schedule_next(card, 4, NOW)
+    assert card.interval_days == 6
+    assert card.repetitions == 2
+
+
+def test_later_intervals_grow_by_ease_factor():
+    card = new_card(repetitions=2, interval_days=6, ease_factor=2.5)
+
+    card = schedule_next(card, 5, NOW)
+
+    assert card.interval_days == 15
+    assert card.ease_factor == pytest.approx(2.6)
+    assert card.due_at == NOW + timedelta(days=15)
+
+
+@pytest.mark.parametrize("quality, delta", [(5, 0.1), (4, 0.0), (3, -0.14), (2, -0.32), (1, -0.54), (0, -0.8)])
+def test_ease_factor_changes_with_quality(quality, delta):
+    card = schedule_next(new_card(), quality, NOW)
+
+    assert card.ease_factor == pytest.approx(DEFAULT_EASE_FACTOR + delta)
+
+
+def test_failed_review_starts_over():
+    card = new_card(repetitions=5, interval_days=40, lapses=1)
+
+    card = schedule_next(card, 2, NOW)
+
+    assert card.interval_days == 1
+    assert card.repetitions == 0
+    assert card.lapses == 2
+
+
+def test_ease_factor_has_lower_bound():
+    card = new_card(ease_factor=1.4)
+
+    assert schedule_next(card, 0, NOW).ease_factor == MIN_EASE_FACTOR
+
+
+def test_schedule_next_does_not_modify_card():
+    card = new_card()
+
+    schedule_next(card, 5, NOW)
+
+    assert card.repetitions == 0
+    assert card.last_reviewed_at is None
+
+
+def test_enroll_and_due_order():
+    async def scenario():
+        scheduler = ReviewScheduler()
+        try:
+            assert await scheduler.enroll("user-1", [3, 1, 2, 1], now=NOW) == 3
+            assert await scheduler.enroll("user-1", [1, 4], now=NOW + timedelta(hours=1)) == 1
+            await scheduler.enroll("user-2", [1], now=NOW)
+
+            due = await scheduler.due("user-1", limit=10, now=NOW)
+            assert [card.word_id for card in due] == [1, 2, 3]
+
+            due = await scheduler.due("user-1", limit=2, now=NOW + timedelta(hours=1))
+            assert [card.word_id for card in due] == [1, 2]
+        finally:
+            await scheduler.close()
+
+    run(scenario())
+
+
+def test_record_review_moves_card_out_of_due_list():
+    async def scenario():
+        scheduler = ReviewScheduler()
+        try:
+            await scheduler.enroll("user-1", [1, 2], now=NOW)
+
+            card = await scheduler.record_review("user-1", 1, 4, now=NOW)
+            assert card.due_at == NOW + timedelta(days=1)
+            assert await scheduler.get("user-1", 1) == card
+
+            due = await scheduler.due("user-1", limit=10, now=NOW + timedelta(hours=1))
+            assert [card.word_id for card in due] == [2]
+            due = await scheduler.due("user-1", limit=10, now=NOW + timedelta(days=1))
+            assert [card.word_id for card in due] == [2, 1]
+
+            assert await scheduler.record_review("user-1", 99, 4, now=NOW) is None
+            assert await scheduler.record_review("user-2", 1, 4, now=NOW) is None
+        finally:
+            await scheduler.close()
+
+    run(scenario())
+
+
+def test_concurrent_reviews_are_not_lost():
+    async def scenario():
+        scheduler = ReviewScheduler()
+        try:
+            await scheduler.enroll("user-1", [1], now=NOW)
+            await asyncio.gather(*(scheduler.record_review("user-1", 1, 5, now=NOW) for _ in range(5)))
+            return await scheduler.get("user-1", 1)
+        finally:
+            await scheduler.close()
+
+    assert run(scenario()).repetitions == 5
+
+
+def test_remove():
+    async def scenario():
+        scheduler = ReviewScheduler()
+        try:
+            await scheduler.enroll("user-1", [1, 2], now=NOW)
+            assert await scheduler.remove("user-1", [1, 3]) == 1
+            assert await scheduler.get("user-1", 1) is None
+            assert scheduler.stats()["removed"] == 1
+        finally:
+            await scheduler.close()
+
+    run(scenario())
+
+
+def test_schedules_persist_in_storage_file(tmp_path):
+    path = str(tmp_path / "reviews.sqlite")
+
+    async def write():
+        scheduler = ReviewScheduler(path)
+        await scheduler.enroll("user-1", [1], now=NOW)
+        await scheduler.record_review("user-1", 1, 4, now=NOW)
+        await scheduler.close()
+
+    async def read():
+        scheduler = ReviewScheduler(path)
+        try:
+            return await scheduler.get("user-1", 1)
+        finally:
+            await scheduler.close()
+
+    run(write())
+    card = run(read())
+
+    assert card.repetitions == 1
+    assert card.due_at == NOW + timedelta(days=1)
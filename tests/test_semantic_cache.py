@@ -0,0 +1,98 @@
+import pytest
+
+from app.services.semantic_cache import MIN_THRESHOLD, SemanticResponseCache
+
+PARTITION = SemanticResponseCache.partition_key("beginner", "conversation")
+
+
+def filled_cache(message: str, **kwargs) -> SemanticResponseCache:
+    """message に対する応答のバリエーションが揃ったキャッシュを作成する"""
+    cache = SemanticResponseCache(max_variants=1, **kwargs)
+    cache.add(message, PARTITION, f"reply to {message}")
+    return cache
+
+
+def test_normalize_ignores_case_and_punctuation():
+    assert SemanticResponseCache.normalize("  Hello,   World!! ") == "hello world"
+    assert SemanticResponseCache.normalize("I'm fine.") == "i'm fine"
+
+
+def test_threshold_cannot_be_lowered_below_minimum():
+    assert SemanticResponseCache(threshold=0.5).threshold == MIN_THRESHOLD
+
+
+def test_same_normalized_message_hits():
+    cache = filled_cache("Hello!")
+
+    assert cache.get("hello", PARTITION) == "reply to Hello!"
+    assert cache.stats()["near_duplicate_hits"] == 0
+
+
+def test_exact_match_is_used_for_long_messages():
+    message = "I went to the park with my friends yesterday."
+    cache = filled_cache(message)
+
+    assert cache.get(message.upper(), PARTITION) == f"reply to {message}"
+
+
+@pytest.mark.parametrize("cached, message", [
+    ("I go to the park yesterday.", "I went to the park yesterday."),
+    ("My name is Kenta.", "My name is Kenji."),
+    ("I like playing soccer.", "I like playing tennis."),
+    ("I went to school.", "I went to schol."),
+])
+def test_different_long_messages_do_not_match(cached, message):
+    cache = filled_cache(cached)
+
+    assert cache.get(message, PARTITION) is None
+
+
+def test_short_messages_only_match_above_threshold():
+    cache = filled_cache("good morning")
+
+    assert cache.get("good mornings", PARTITION) is None
+    assert cache.get("Good morning!!", PARTITION) == "reply to good morning"
+
+
+def test_partitions_are_separate():
+    cache = filled_cache("Hello!")
+    other = SemanticResponseCache.partition_key("advanced", "conversation")
+
+    assert cache.get("Hello!", other) is None
+
+
+def test_partition_key_depends_on_history():
+    first = SemanticResponseCache.partition_key("beginner", "conversation", [("user", "Hi")])
+    second = SemanticResponseCache.partition_key("beginner", "conversation", [("user", "Bye")])
+
+    assert first != second
+    assert first == SemanticResponseCache.partition_key("beginner", "conversation", [("user", "hi!")])
+
+
+def test_misses_until_variants_are_collected():
+    cache = SemanticResponseCache(max_variants=2)
+    cache.add("Hello!", PARTITION, "Hi there!")
+    assert cache.get("Hello!", PARTITION) is None
+
+    cache.add("hello", PARTITION, "Hello! How are you?")
+    assert cache.get("Hello!", PARTITION) in {"Hi there!", "Hello! How are you?"}
+
+
+def test_oldest_entries_are_evicted():
+    cache = SemanticResponseCache(max_variants=1, max_entries=2)
+    for message in ("Hello!", "Good morning!", "How are you?"):
+        cache.add(message, PARTITION, message)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("Hello!", PARTITION) is None
+    assert cache.get("How are you?", PARTITION) == "How are you?"
+
+
+def test_entries_survive_flush_and_reload(tmp_path):
+    path = str(tmp_path / "semantic.json")
+    cache = filled_cache("Hello!", storage_path=path)
+
+    cache.flush()
+    reloaded = SemanticResponseCache(max_variants=1, storage_path=path)
+
+    assert reloaded.get("hello", PARTITION) == "reply to Hello!"
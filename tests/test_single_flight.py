@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class SlowCall:
+    """release されるまで完了しない呼び出し"""
+
+    def __init__(self, result="result", error: Exception = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_calls_with_same_key_share_one_execution():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def scenario():
+        call.release = asyncio.Event()
+        waiters = [asyncio.ensure_future(flight.do("prompt", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        call.release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(scenario()) == ["result"] * 3
+    assert call.calls == 1
+    assert flight.stats() == {"calls": 3, "executions": 1, "collapsed": 2, "in_flight": 0}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def scenario():
+        call.release = asyncio.Event()
+        call.release.set()
+        await asyncio.gather(flight.do("a", call), flight.do("b", call))
+
+    asyncio.run(scenario())
+
+    assert call.calls == 2
+
+
+def test_completed_calls_are_not_reused():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def scenario():
+        call.release = asyncio.Event()
+        call.release.set()
+        await flight.do("prompt", call)
+        await flight.do("prompt", call)
+
+    asyncio.run(scenario())
+
+    assert call.calls == 2
+
+
+def test_errors_are_shared_and_key_is_released():
+    flight = SingleFlight()
+    call = SlowCall(error=RuntimeError("unavailable"))
+
+    async def scenario():
+        call.release = asyncio.Event()
+        waiters = [asyncio.ensure_future(flight.do("prompt", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        call.release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert call.calls == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_other_waiters():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def scenario():
+        call.release = asyncio.Event()
+        first = asyncio.ensure_future(flight.do("prompt", call))
+        second = asyncio.ensure_future(flight.do("prompt", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        call.release.set()
+        return await second
+
+    assert asyncio.run(scenario()) == "result"
@@ -0,0 +1,162 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.word_import import CSV_FORMAT, NDJSON_FORMAT, WordImporter, iter_lines, iter_rows
+
+
+async def aiter(items):
+    for item in items:
+        yield item
+
+
+def parse(text: str, import_format: str, chunk_size: int = 7):
+    """テキストを chunk_size バイトずつ受信したものとして行を解析する"""
+    data = text.encode("utf-8")
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    async def collect():
+        return [row async for row in iter_rows(iter_lines(aiter(chunks)), import_format)]
+
+    return asyncio.run(collect())
+
+
+class FakeWordsTable:
+    """words テーブルへの upsert を記録し、既存の単語を除いた行を返すSupabaseの代わり"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, rows, on_conflict="", ignore_duplicates=False):
+        self.client.upserts.append({"rows": rows, "on_conflict": on_conflict, "ignore_duplicates": ignore_duplicates})
+        return self
+
+    async def execute(self):
+        rows = self.client.upserts[-1]["rows"]
+        if self.client.error is not None:
+            raise self.client.error
+        inserted = []
+        for row in rows:
+            if row["word"] not in self.client.existing:
+                self.client.existing.add(row["word"])
+                inserted.append({"id": len(self.client.existing), **row})
+        return SimpleNamespace(data=inserted)
+
+
+class FakeSupabase:
+    def __init__(self, existing=(), error: Exception = None):
+        self.existing = set(existing)
+        self.error = error
+        self.upserts = []
+
+    def table(self, name):
+        assert name == "words"
+        return FakeWordsTable(self)
+
+
+def run_import(rows, supabase, **kwargs):
+    importer = WordImporter(supabase, **kwargs)
+    return asyncio.run(importer.run(aiter(rows)))
+
+
+def test_iter_lines_decodes_across_chunk_boundaries():
+    # BOM付き・CRLF・マルチバイト文字がチャンクの境界をまたぐ
+    text = '\ufeff{"word": "りんご", "mean": "apple"}\r\n{"word": "みかん", "mean": "orange"}'
+
+    rows = parse(text, NDJSON_FORMAT, chunk_size=5)
+
+    assert rows == [
+        (1, {"word": "りんご", "mean": "apple"}, None),
+        (2, {"word": "みかん", "mean": "orange"}, None),
+    ]
+
+
+def test_ndjson_rows():
+    text = '{"word": "apple", "mean": "りんご"}\n\n[1, 2]\nnot json\n{"word": "run", "mean": "走る"}'
+
+    rows = parse(text, NDJSON_FORMAT)
+
+    assert rows[0] == (1, {"word": "apple", "mean": "りんご"}, None)
+    assert rows[1] == (3, None, "Each line must be a JSON object")
+    assert rows[2][0] == 4 and rows[2][2].startswith("Invalid JSON")
+    assert rows[3] == (5, {"word": "run", "mean": "走る"}, None)
+
+
+def test_csv_rows():
+    text = "word,mean,example_sentence\r\napple,りんご,\r\n\r\nrun,走る,I run.,extra\r\n\"a, b\",\"x \"\"y\"\"\",ok\r\n"
+
+    rows = parse(text, CSV_FORMAT)
+
+    assert rows == [
+        (2, {"word": "apple", "mean": "りんご"}, None),
+        (4, None, "Too many columns"),
+        (5, {"word": "a, b", "mean": 'x "y"', "example_sentence": "ok"}, None),
+    ]
+
+
+def test_csv_quoted_field_with_line_breaks():
+    text = (
+        "word,mean,example_sentence\n"
+        "apple,りんご,\"I ate an apple.\n\nIt was \"\"sweet\"\".\"\n"
+        "run,走る,I run.\n"
+    )
+
+    rows = parse(text, CSV_FORMAT, chunk_size=3)
+
+    assert rows == [
+        (2, {"word": "apple", "mean": "りんご", "example_sentence": 'I ate an apple.\n\nIt was "sweet".'}, None),
+        (5, {"word": "run", "mean": "走る", "example_sentence": "I run."}, None),
+    ]
+
+
+def test_csv_unterminated_quote_is_reported():
+    rows = parse("word,mean\napple,\"りんご\nrun,走る\n", CSV_FORMAT)
+
+    assert rows == [(2, None, "Unterminated quoted field")]
+
+
+def test_import_reports_invalid_rows():
+    rows = [
+        (1, {"word": "apple", "mean": "りんご"}, None),
+        (2, None, "Invalid JSON"),
+        (3, {"word": "run"}, None),
+    ]
+
+    report = run_import(rows, FakeSupabase())
+
+    assert report.total_rows == 3
+    assert report.inserted == 1
+    assert report.invalid == 2
+    assert [(error.line, error.word) for error in report.errors] == [(2, None), (3, "run")]
+
+
+def test_import_inserts_in_chunks_and_counts_duplicates():
+    supabase = FakeSupabase(existing={"run"})
+    inserted = []
+    rows = [
+        (i + 1, {"word": word, "mean": "意味"}, None)
+        for i, word in enumerate(["apple", "run", "apple", "go", "eat", "sit"])
+    ]
+
+    report = run_import(rows, supabase, chunk_size=2, on_inserted=inserted.extend)
+
+    # 取り込み内の重複（apple）は送らず、登録済みの単語（run）は一意制約で除外される
+    assert [[row["word"] for row in upsert["rows"]] for upsert in supabase.upserts] == [
+        ["apple", "run"], ["go", "eat"], ["sit"]
+    ]
+    assert all(upsert["on_conflict"] == "word" and upsert["ignore_duplicates"] for upsert in supabase.upserts)
+    assert report.inserted == 4
+    assert report.duplicates == 2
+    assert sorted(row["word"] for row in inserted) == ["apple", "eat", "go", "sit"]
+
+
+def test_import_records_failed_chunks():
+    supabase = FakeSupabase(error=RuntimeError("connection reset"))
+    rows = [(i + 1, {"word": f"word{i}", "mean": "意味"}, None) for i in range(3)]
+
+    report = run_import(rows, supabase, chunk_size=2, max_errors=2)
+
+    assert report.failed == 3
+    assert report.inserted == 0
+    assert len(report.errors) == 2
+    assert report.errors_truncated
+    assert "connection reset" in report.errors[0].error
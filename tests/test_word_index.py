@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.services.word_index import WordSearchIndex, normalize, trigrams
+
+WORDS = [
+    {"id": 1, "word": "apple", "mean": "りんご"},
+    {"id": 2, "word": "application", "mean": "応用、申し込み"},
+    {"id": 3, "word": "pineapple", "mean": "パイナップル"},
+    {"id": 4, "word": "apply", "mean": "申し込む"},
+    {"id": 5, "word": "happy", "mean": "幸せな"},
+    {"id": 6, "word": "necessary", "mean": "必要な"},
+]
+
+
+def make_index(words=WORDS) -> WordSearchIndex:
+    index = WordSearchIndex()
+    index.replace_all([dict(word) for word in words])
+    return index
+
+
+def ids(results):
+    return [word["id"] for word in results]
+
+
+def test_normalize():
+    assert normalize("  Hello   World ") == "hello world"
+    assert normalize(None) == ""
+
+
+def test_trigrams_include_boundaries():
+    assert trigrams("cat") == {"^ca", "cat", "at$"}
+    assert trigrams("") == set()
+
+
+def test_search_ranks_exact_then_prefix_then_substring():
+    index = make_index()
+
+    # 完全一致 > 部分一致 > 綴り間違いを許容した一致
+    assert ids(index.search("apple")) == [1, 3, 4]
+    # 前方一致は短い単語が先
+    assert ids(index.search("app")) == [1, 4, 2, 5, 3]
+
+
+def test_search_matches_meaning():
+    index = make_index()
+
+    assert ids(index.search("申し込")) == [4, 2]
+
+
+def test_search_tolerates_typos():
+    index = make_index()
+
+    assert ids(index.search("neccessary")) == [6]
+    assert ids(index.search("aplpe")) == []
+
+
+def test_search_is_case_insensitive_and_limited():
+    index = make_index()
+
+    assert ids(index.search("APP", limit=2)) == [1, 4]
+
+
+@pytest.mark.parametrize("query", ["", "   "])
+def test_empty_query_returns_nothing(query):
+    assert make_index().search(query) == []
+
+
+def test_short_queries_use_substring_match():
+    index = make_index()
+
+    assert set(ids(index.search("pp"))) == {1, 2, 3, 4, 5}
+
+
+def test_upsert_and_remove_update_results():
+    index = make_index()
+
+    index.upsert({"id": 1, "word": "banana", "mean": "バナナ"})
+    assert 1 not in ids(index.search("apple"))
+    assert ids(index.search("banana")) == [1]
+
+    index.remove(4)
+    assert 4 not in ids(index.search("app"))
+    assert index.stats()["words"] == len(WORDS) - 1
+
+
+def test_writes_during_rebuild_are_kept():
+    index = make_index()
+
+    async def load_all():
+        # 読み込み中の書き込みは、読み込んだ（古い）結果より優先される
+        index.upsert({"id": 7, "word": "grape", "mean": "ぶどう"})
+        index.remove(1)
+        return [dict(word) for word in WORDS]
+
+    asyncio.run(index.rebuild(load_all))
+
+    assert ids(index.search("grape")) == [7]
+    assert 1 not in ids(index.search("apple"))
+    assert index.stats()["rebuilds"] == 1
+
+
+def test_failed_rebuild_keeps_existing_index():
+    index = make_index()
+
+    async def load_all():
+        raise RuntimeError("database unavailable")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(index.rebuild(load_all))
+
+    assert ids(index.search("apple")) == [1, 3, 4]
+    assert index.stats()["rebuild_errors"] == 1
@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.routers import words
+
+APPLE = {"id": 1, "word": "apple", "mean": "りんご"}
+
+
+class FakeQuery:
+    """Supabaseのクエリビルダーの代わり（条件は無視して rows を返す）"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        # select / eq / range / order などはすべて自分自身を返す
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        self.client.queries += 1
+        if self.client.during_query is not None:
+            self.client.during_query()
+        return SimpleNamespace(data=list(self.client.rows))
+
+
+class FakeSupabase:
+    def __init__(self, rows, during_query=None):
+        self.rows = rows
+        self.during_query = during_query
+        self.queries = 0
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    words.word_cache.clear()
+    words.word_list_cache.clear()
+    yield
+    words.word_cache.clear()
+    words.word_list_cache.clear()
+
+
+def test_get_word_reads_through_cache():
+    supabase = FakeSupabase([APPLE])
+
+    async def scenario():
+        return [await words.get_word(1, supabase) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [APPLE, APPLE]
+    assert supabase.queries == 1
+
+
+def test_get_word_does_not_cache_missing_word():
+    supabase = FakeSupabase([])
+
+    for _ in range(2):
+        with pytest.raises(words.HTTPException) as error:
+            asyncio.run(words.get_word(1, supabase))
+        assert error.value.status_code == 404
+    assert supabase.queries == 2
+
+
+def test_write_during_read_is_not_overwritten_by_stale_row():
+    updated = {**APPLE, "mean": "リンゴ"}
+    # 読み込み中に同じ単語が更新された場合、読み込んだ古い値はキャッシュしない
+    supabase = FakeSupabase([APPLE], during_query=lambda: words._cache_words([updated]))
+
+    assert asyncio.run(words.get_word(1, supabase)) == APPLE
+    assert words.word_cache.get(words._word_key(1)) == updated
+
+
+def test_delete_during_read_is_not_undone():
+    supabase = FakeSupabase([APPLE], during_query=lambda: words._uncache_word(1))
+
+    asyncio.run(words.get_word(1, supabase))
+
+    assert words.word_cache.get(words._word_key(1)) is None
+
+
+def test_word_list_is_cached_until_a_write():
+    supabase = FakeSupabase([APPLE])
+
+    asyncio.run(words.get_words(0, 100, supabase))
+    asyncio.run(words.get_words(0, 100, supabase))
+    assert supabase.queries == 1
+
+    words._cache_words([{"id": 2, "word": "banana", "mean": "バナナ"}])
+    asyncio.run(words.get_words(0, 100, supabase))
+    assert supabase.queries == 2
+
+
+def test_uncache_word_invalidates_word_and_lists():
+    supabase = FakeSupabase([APPLE])
+    asyncio.run(words.get_word(1, supabase))
+    asyncio.run(words.get_words(0, 100, supabase))
+
+    words._uncache_word(1)
+
+    assert words.word_cache.get(words._word_key(1)) is None
+    assert words.word_list_cache.stats()["size"] == 0
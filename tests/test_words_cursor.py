@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.words import _decode_cursor, _encode_cursor, _parse_timestamp
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-05-01T12:00:00+00:00", datetime(2024, 5, 1, 12, tzinfo=timezone.utc)),
+    ("2024-05-01T12:00:00Z", datetime(2024, 5, 1, 12, tzinfo=timezone.utc)),
+    ("2024-05-01T12:00:00.5+00:00", datetime(2024, 5, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)),
+    ("2024-05-01T12:00:00.1234567+09:00",
+     datetime(2024, 5, 1, 12, 0, 0, 123456, tzinfo=timezone(timedelta(hours=9)))),
+])
+def test_parse_timestamp(value, expected):
+    assert _parse_timestamp(value) == expected
+
+
+def test_id_cursor_round_trip():
+    cursor = _encode_cursor("id", "asc", {"id": 42, "word": "apple"})
+
+    assert _decode_cursor(cursor, "id", "asc") == {"id": 42}
+
+
+def test_created_at_cursor_round_trip_normalizes_timestamp():
+    cursor = _encode_cursor("created_at", "desc", {"id": 7, "created_at": "2024-05-01T12:00:00.12345+00:00"})
+
+    assert _decode_cursor(cursor, "created_at", "desc") == {
+        "id": 7,
+        "created_at": "2024-05-01T12:00:00.123450+00:00"
+    }
+
+
+@pytest.mark.parametrize("sort, order", [("id", "desc"), ("created_at", "asc")])
+def test_cursor_for_other_order_is_rejected(sort, order):
+    cursor = _encode_cursor("id", "asc", {"id": 42})
+
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor, sort, order)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode("ascii"),
+    raw_cursor([1, 2]),
+    raw_cursor({"sort": "id", "order": "asc"}),
+    raw_cursor({"sort": "id", "order": "asc", "id": "42"}),
+    raw_cursor({"sort": "id", "order": "asc", "id": "1,id.gt.0"}),
+    raw_cursor({"sort": "id", "order": "asc", "id": True}),
+    raw_cursor({"sort": "id", "order": "asc", "id": 1.5}),
+])
+def test_malformed_id_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor, "id", "asc")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("created_at", [
+    None,
+    12345,
+    "yesterday",
+    '2024-05-01T12:00:00+00:00",id.gt.0)',
+])
+def test_malformed_created_at_cursor_is_rejected(created_at):
+    cursor = raw_cursor({"sort": "created_at", "order": "asc", "id": 1, "created_at": created_at})
+
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor, "created_at", "asc")
+    assert error.value.status_code == 400